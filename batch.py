@@ -0,0 +1,509 @@
+import array
+import collections
+import concurrent.futures
+import contextlib
+import itertools
+import math
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cache
+import main as engine
+import parser.parser as parser
+import prefix
+import stats
+import witness
+
+'''
+Runs eval_file over many programs using a pool of worker processes.
+
+Every program gets a wall-clock budget (enforced with SIGALRM inside the worker) and
+every worker gets an address space limit (RLIMIT_AS). A program that runs out of
+either comes back as "unknown" instead of stalling the whole batch, and so does a program whose
+worker dies (e.g. killed by the OOM killer), see _Pool.
+Results are returned in the same order as the input files.
+run_cached skips programs whose result is already in a cache.ResultCache.
+run_corpus does the same for programs given as (name, source text) pairs, e.g. read from one
+bulk file by parser.open_corpus; it only holds a window of programs in memory at a time.
+run_shared verifies all programs in this process and executes the prefixes of commands they have
+in common only once (prefix.py); the time limit then applies to every shared step on its own.
+'''
+
+VERDICT_TRUE = "true"
+VERDICT_FALSE = "false"
+VERDICT_UNKNOWN = "unknown"
+
+REASON_TIMEOUT = "Timeout"
+REASON_MEMORY = "Memory limit exceeded"
+REASON_INVALID = "Invalid program"
+
+# engine of results that come from a cache.ResultCache
+ENGINE_CACHE = "cache"
+
+# programs of a corpus read ahead per worker process
+WINDOW_PER_JOB = 64
+# programs submitted to the pool ahead per worker process, they are run again when a worker dies
+IN_FLIGHT_PER_JOB = 4
+
+
+class Result:
+    def __init__(self, file: str, verdict: str, reason: str = "", elapsed: float = 0.0) -> None:
+        self.file = file
+        self.verdict = verdict
+        self.reason = reason
+        self.elapsed = elapsed
+        # stats.Stats.as_dict() of the run, when statistics are collected
+        self.stats: Optional[Dict[str, Any]] = None
+        # what eval_file reported (main.ENGINE_*, or ENGINE_CACHE) and the number of paths it checked
+        self.engine: Optional[str] = None
+        self.paths: Optional[int] = None
+        # witness.Witness of a failing assert, when witnesses are searched for
+        self.witness: Optional[List] = None
+        # portfolio.Stage.as_dict() of every engine that ran, with the portfolio
+        self.stages: Optional[List[Dict[str, Any]]] = None
+
+    # same wording as the original results files
+    def message(self) -> str:
+        if self.verdict == VERDICT_TRUE:
+            return "Assert is true"
+        if self.verdict == VERDICT_FALSE:
+            return "Assert can be false"
+        return self.reason
+
+    def __str__(self) -> str:
+        return os.path.basename(self.file) + ": " + self.message()
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame) -> None:
+    raise _Timeout()
+
+
+_timeout: float = 0.0
+_eval_options: Dict[str, Any] = {}
+_collect_stats = False
+_witnesses = False
+# portfolio.Portfolio that decides the programs instead of eval_file, it learns from the programs of this worker
+_portfolio = None
+
+
+def init_worker(timeout: float, memory_limit: Optional[int], eval_options: Optional[Dict[str, Any]] = None,
+                collect_stats: bool = False, witnesses: bool = False, use_portfolio: bool = False) -> None:
+    global _timeout, _eval_options, _collect_stats, _witnesses, _portfolio
+    _timeout = timeout
+    _eval_options = eval_options or {}
+    _collect_stats = collect_stats
+    _witnesses = witnesses
+    _portfolio = None
+    if use_portfolio:
+        import portfolio
+        _portfolio = portfolio.Portfolio()
+    signal.signal(signal.SIGALRM, _on_alarm)
+    if memory_limit:
+        try:
+            import resource
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+        except (ImportError, ValueError, OSError):
+            pass
+
+
+# exceptions of the parser for a program that isn't valid
+PARSE_ERRORS = (RuntimeError, AssertionError, IndexError)
+
+
+def invalid_result(file: str, error: Exception, elapsed: float = 0.0) -> Result:
+    return Result(file, VERDICT_UNKNOWN, f"{REASON_INVALID}: {error}" if str(error) else REASON_INVALID, elapsed)
+
+
+def _verify(file: str, load: Callable[[], parser.Program]) -> Result:
+    start = time.perf_counter()
+    try:
+        parsed = load()
+    except PARSE_ERRORS as e:
+        return invalid_result(file, e, time.perf_counter() - start)
+    if _portfolio is not None:
+        return _verify_portfolio(file, parsed, start)
+    collected = None
+    details: Dict[str, Any] = {}
+    if _timeout > 0:
+        signal.setitimer(signal.ITIMER_REAL, _timeout)
+    try:
+        if _collect_stats:
+            with stats.collect() as collected:
+                false_assert = engine.eval_file(parsed, details=details, **_eval_options)
+        else:
+            false_assert = engine.eval_file(parsed, details=details, **_eval_options)
+        if false_assert:
+            result = Result(file, VERDICT_FALSE)
+            if _witnesses:
+                # a witness that isn't found in time is just missing, the verdict stands
+                try:
+                    result.witness = witness.find_witness(parsed)
+                except ERRORS:
+                    pass
+        else:
+            result = Result(file, VERDICT_TRUE)
+    except ERRORS as e:
+        result = outcome_result(file, e, 0.0)
+    finally:
+        if _timeout > 0:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result.elapsed = time.perf_counter() - start
+    result.engine = details.get("engine")
+    result.paths = details.get("paths")
+    if collected is not None:
+        result.stats = collected.as_dict()
+    return result
+
+
+# the portfolio splits the time limit between its engines itself
+def _verify_portfolio(file: str, parsed: parser.Program, start: float) -> Result:
+    try:
+        report = _portfolio.verify(parsed, _timeout)
+    except ERRORS as e:
+        return outcome_result(file, e, time.perf_counter() - start)
+    if report.result is None:
+        result = Result(file, VERDICT_UNKNOWN, report.reason)
+    else:
+        result = Result(file, VERDICT_FALSE if report.result else VERDICT_TRUE)
+    result.engine = report.engine
+    result.stages = [stage.as_dict() for stage in report.stages]
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def outcome_result(file: str, outcome: prefix.Outcome, elapsed: float) -> Result:
+    if outcome is True:
+        return Result(file, VERDICT_FALSE, elapsed=elapsed)
+    if outcome is False:
+        return Result(file, VERDICT_TRUE, elapsed=elapsed)
+    if isinstance(outcome, _Timeout):
+        return Result(file, VERDICT_UNKNOWN, REASON_TIMEOUT, elapsed)
+    if isinstance(outcome, (MemoryError, RecursionError)):
+        return Result(file, VERDICT_UNKNOWN, REASON_MEMORY, elapsed)
+    if isinstance(outcome, KeyError):
+        return Result(file, VERDICT_UNKNOWN, f"Variable {outcome.args[0]} is undefined", elapsed)
+    if isinstance(outcome, AssertionError):
+        return Result(file, VERDICT_UNKNOWN, str(outcome), elapsed)
+    return Result(file, VERDICT_UNKNOWN, f"{type(outcome).__name__}: {outcome}", elapsed)
+
+
+# exceptions that make the result of a program unknown: the engine gives up (AssertionError), runs
+# out of time or memory, or the program reads a variable that is never assigned (KeyError);
+# anything else is a bug of the engine and isn't caught
+ERRORS = (AssertionError, _Timeout, MemoryError, RecursionError, KeyError)
+
+
+# the time limit of run_batch etc. (or seconds) for one computation in this process, see in_process
+@contextlib.contextmanager
+def time_limit(seconds: Optional[float] = None) -> Iterator[None]:
+    seconds = _timeout if seconds is None else seconds
+    if seconds > 0:
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        if seconds > 0:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# sets up this process like a worker without the address space limit, so time_limit can be used
+@contextlib.contextmanager
+def in_process(timeout: float) -> Iterator[None]:
+    previous = signal.getsignal(signal.SIGALRM)
+    init_worker(timeout, None)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
+
+def verify_file(file: str) -> Result:
+    return _verify(file, lambda: parser.parse_file(file))
+
+
+def verify_source(source: parser.Source) -> Result:
+    name, text = source
+    return _verify(name, lambda: parser.parse_string(text))
+
+
+# yields results in the order of files, computing them in `jobs` processes
+# eval_options are passed to eval_file, with collect_stats every result gets its statistics
+def run_batch(files: Iterable[str], jobs: int = 0, timeout: float = 10.0,
+              memory_limit: Optional[int] = None, eval_options: Optional[Dict[str, Any]] = None,
+              collect_stats: bool = False, witnesses: bool = False, use_portfolio: bool = False) -> Iterator[Result]:
+    files = list(files)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, max(len(files), 1))
+
+    if jobs == 1:
+        # in-process: the address space limit would apply to the caller as well, so skip it
+        previous = signal.getsignal(signal.SIGALRM)
+        init_worker(timeout, None, eval_options, collect_stats, witnesses, use_portfolio)
+        try:
+            for file in files:
+                yield verify_file(file)
+        finally:
+            signal.signal(signal.SIGALRM, previous)
+        return
+
+    pool = _Pool(jobs, (timeout, memory_limit, eval_options, collect_stats, witnesses, use_portfolio))
+    try:
+        yield from pool.map(verify_file, files, lambda file: file)
+    finally:
+        pool.close()
+
+
+class _Pool:
+    """Worker processes that survive the death of a worker.
+
+    A worker killed by the address space limit, the OOM killer or a signal breaks the whole
+    concurrent.futures pool, and the programs it had in flight fail with BrokenProcessPool. They
+    are run again one at a time in a pool of their own, so the program that kills its worker
+    again is found; it is "unknown" with REASON_MEMORY and the rest of the batch goes on."""
+
+    def __init__(self, jobs: int, initargs: Tuple) -> None:
+        self.jobs = jobs
+        self.initargs = initargs
+        self.executor = self._new(jobs)
+
+    def _new(self, jobs: int) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(jobs, initializer=init_worker, initargs=self.initargs)
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    # function(item) of every item, in order; name(item) is the file of a result made here
+    def map(self, function: Callable[[Any], Result], items: Iterable, name: Callable[[Any], str]) -> Iterator[Result]:
+        items = iter(items)
+        pending: "collections.deque[Tuple[Any, concurrent.futures.Future]]" = collections.deque()
+
+        def submit(count: int) -> None:
+            for item in itertools.islice(items, count):
+                pending.append((item, self.executor.submit(function, item)))
+
+        submit(self.jobs * IN_FLIGHT_PER_JOB)
+        while pending:
+            item, future = pending[0]
+            try:
+                result = future.result()
+            except concurrent.futures.BrokenExecutor:
+                self.executor.shutdown(cancel_futures=True)
+                yield from self._retry(function, list(pending), name)
+                pending.clear()
+                self.executor = self._new(self.jobs)
+                submit(self.jobs * IN_FLIGHT_PER_JOB)
+                continue
+            pending.popleft()
+            yield result
+            submit(1)
+
+    def _retry(self, function: Callable[[Any], Result], pending: List[Tuple[Any, concurrent.futures.Future]],
+               name: Callable[[Any], str]) -> Iterator[Result]:
+        single = self._new(1)
+        try:
+            for item, future in pending:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    # finished before the worker died
+                    yield future.result()
+                    continue
+                try:
+                    yield single.submit(function, item).result()
+                except concurrent.futures.BrokenExecutor:
+                    # this program kills its worker
+                    yield Result(name(item), VERDICT_UNKNOWN, REASON_MEMORY)
+                    single.shutdown(cancel_futures=True)
+                    single = self._new(1)
+        finally:
+            single.shutdown(cancel_futures=True)
+
+
+def _content_key(data: bytes, load: Callable[[], parser.Program], results: "cache.ResultCache") -> Optional[str]:
+    content = cache.content_hash(data)
+    key = results.resolve(content)
+    if key is None:
+        try:
+            key = cache.program_hash(load())
+        except PARSE_ERRORS:
+            return None
+        results.alias(content, key)
+    return key
+
+
+def _cached_result(file: str, entry: Tuple[str, str], elapsed: float) -> Result:
+    result = Result(file, entry[0], entry[1], elapsed)
+    result.engine = ENGINE_CACHE
+    return result
+
+
+def _cache_key(file: str, results: "cache.ResultCache") -> Optional[str]:
+    with open(file, "rb") as f:
+        data = f.read()
+    return _content_key(data, lambda: parser.parse_file(file), results)
+
+
+# like run_batch, but programs whose result is in the cache are not verified again
+def run_cached(files: Iterable[str], results: "cache.ResultCache", jobs: int = 0, timeout: float = 10.0,
+               memory_limit: Optional[int] = None, eval_options: Optional[Dict[str, Any]] = None,
+               use_portfolio: bool = False) -> Iterator[Result]:
+    files = list(files)
+    keys = []
+    cached = []
+    for file in files:
+        start = time.perf_counter()
+        key = _cache_key(file, results)
+        entry = results.get(key) if key is not None else None
+        keys.append(key)
+        cached.append(None if entry is None else _cached_result(file, entry, time.perf_counter() - start))
+
+    misses = [file for file, result in zip(files, cached) if result is None]
+    verified = run_batch(misses, jobs, timeout, memory_limit, eval_options, use_portfolio=use_portfolio)
+    for key, result in zip(keys, cached):
+        if result is None:
+            result = next(verified)
+            # running out of time or memory depends on the budget, not on the program
+            if key is not None and result.reason not in (REASON_TIMEOUT, REASON_MEMORY):
+                results.put(key, result.verdict, result.reason)
+        yield result
+    results.save()
+
+
+def _windows(sources: Iterable[parser.Source], size: int) -> Iterator[List[parser.Source]]:
+    window = []
+    for source in sources:
+        window.append(source)
+        if len(window) == size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+# like run_cached (or run_batch without results) for (name, source text) pairs, read lazily
+def run_corpus(sources: Iterable[parser.Source], results: Optional["cache.ResultCache"] = None, jobs: int = 0,
+               timeout: float = 10.0, memory_limit: Optional[int] = None,
+               eval_options: Optional[Dict[str, Any]] = None, collect_stats: bool = False,
+               witnesses: bool = False, use_portfolio: bool = False) -> Iterator[Result]:
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    pool = None
+    if jobs == 1:
+        previous = signal.getsignal(signal.SIGALRM)
+        init_worker(timeout, None, eval_options, collect_stats, witnesses, use_portfolio)
+    else:
+        pool = _Pool(jobs, (timeout, memory_limit, eval_options, collect_stats, witnesses, use_portfolio))
+    try:
+        for window in _windows(sources, jobs * WINDOW_PER_JOB):
+            keys: List[Optional[str]] = []
+            cached: List[Optional[Result]] = []
+            for name, text in window:
+                start = time.perf_counter()
+                key = None
+                if results is not None:
+                    key = _content_key(text.encode(), lambda: parser.parse_string(text), results)
+                entry = results.get(key) if key is not None else None
+                keys.append(key)
+                cached.append(None if entry is None else _cached_result(name, entry, time.perf_counter() - start))
+
+            misses = [source for source, result in zip(window, cached) if result is None]
+            if pool is None:
+                verified = map(verify_source, misses)
+            else:
+                verified = pool.map(verify_source, misses, lambda source: source[0])
+            for key, result in zip(keys, cached):
+                if result is None:
+                    result = next(verified)
+                    if key is not None and result.reason not in (REASON_TIMEOUT, REASON_MEMORY):
+                        results.put(key, result.verdict, result.reason)
+                yield result
+    finally:
+        if pool is None:
+            signal.signal(signal.SIGALRM, previous)
+        else:
+            pool.close()
+        if results is not None:
+            results.save()
+
+
+def file_sources(files: Iterable[str]) -> Iterator[parser.Source]:
+    for file in files:
+        with open(file) as f:
+            yield file, f.read()
+
+
+# like run_corpus with jobs=1, but prefixes of commands shared by the programs are executed once
+# eval_options are those of eval_file except depth_first and ssa, which don't keep state sets
+def run_shared(sources: Iterable[parser.Source], results: Optional["cache.ResultCache"] = None,
+               timeout: float = 10.0, eval_options: Optional[Dict[str, Any]] = None) -> Iterator[Result]:
+    options = dict(eval_options or {})
+    if options.pop("depth_first", False) or options.pop("ssa", False):
+        raise ValueError("shared prefixes need the breadth-first engine")
+    sources = list(sources)
+    keys: List[Optional[str]] = []
+    done: List[Optional[Result]] = []
+    programs = []
+    positions = []
+    for name, text in sources:
+        start = time.perf_counter()
+        key = None
+        if results is not None:
+            key = _content_key(text.encode(), lambda: parser.parse_string(text), results)
+        entry = results.get(key) if key is not None else None
+        keys.append(key)
+        if entry is not None:
+            done.append(_cached_result(name, entry, time.perf_counter() - start))
+            continue
+        try:
+            programs.append(parser.parse_string(text))
+            positions.append(len(done))
+            done.append(None)
+        except PARSE_ERRORS as e:
+            done.append(invalid_result(name, e, time.perf_counter() - start))
+
+    try:
+        with in_process(timeout):
+            for index, outcome, elapsed in prefix.eval_shared(programs, guard=time_limit, errors=ERRORS, **options):
+                position = positions[index]
+                result = done[position] = outcome_result(sources[position][0], outcome, elapsed)
+                if keys[position] is not None and result.reason not in (REASON_TIMEOUT, REASON_MEMORY):
+                    results.put(keys[position], result.verdict, result.reason)
+    finally:
+        if results is not None:
+            results.save()
+    yield from done
+
+
+# nearest-rank percentile, values must be sorted
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Summary:
+    """Counts and latencies of results, without keeping the results."""
+
+    def __init__(self) -> None:
+        self.latencies = array.array("d")
+        self.counts = {VERDICT_TRUE: 0, VERDICT_FALSE: 0, VERDICT_UNKNOWN: 0}
+
+    def add(self, result: Result) -> None:
+        self.latencies.append(result.elapsed)
+        self.counts[result.verdict] += 1
+
+    def format(self, wall_time: float) -> str:
+        latencies = sorted(self.latencies)
+        per_second = len(latencies) / wall_time if wall_time > 0 else math.inf
+        return ("{} programs in {:.3f}s ({:.1f} programs/s), p50 {:.2f}ms, p99 {:.2f}ms, "
+                "true: {}, false: {}, unknown: {}").format(
+            len(latencies), wall_time, per_second,
+            percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+            self.counts[VERDICT_TRUE], self.counts[VERDICT_FALSE], self.counts[VERDICT_UNKNOWN])
@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+import compiler
+import concrete
+import parser.parser as parser
+from benchmarks.state_copy import generate
+
+'''
+Concrete evaluations per second: the compiled function (compiler.py) against walking the parsed
+program (concrete.execute), on the example programs and on generated ones with many ifs.
+
+Run from the repository root: python -m benchmarks.compiled [directory]
+'''
+
+RUNS = 20000
+
+
+def rate(run: Callable[[List[int]], object], vectors: List[List[int]]) -> float:
+    start = time.perf_counter()
+    for values in vectors:
+        run(values)
+    return len(vectors) / (time.perf_counter() - start)
+
+
+def bench(label: str, program: parser.Program, runs: int = RUNS) -> float:
+    rng = random.Random(0)
+    slots = len(concrete.input_slots(program))
+    vectors = [[rng.randint(-50, 50) for _ in range(slots)] for _ in range(runs)]
+    start = time.perf_counter()
+    compiled = compiler.compile_program(program)
+    compile_time = time.perf_counter() - start
+    naive = rate(lambda values: concrete.execute(program, values), vectors)
+    fast = rate(compiled, vectors)
+    print(f"{label:>12}   {naive:14.0f}   {fast:14.0f}   {fast / naive:7.1f}x   {compile_time * 1e3:8.2f}")
+    return fast / naive
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "programs/other"
+    print("     program   interpreted/s     compiled/s   speedup   compile [ms]")
+    speedups = []
+    for file in sorted(os.listdir(directory)):
+        speedups.append(bench(file, parser.parse_file(os.path.join(directory, file))))
+    for variables, ifs in ((10, 50), (50, 200)):
+        speedups.append(bench(f"gen {variables}/{ifs}", generate(variables, ifs), RUNS // 10))
+    speedups.sort()
+    print(f"median speedup {speedups[len(speedups) // 2]:.1f}x, minimum {speedups[0]:.1f}x")
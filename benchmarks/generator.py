@@ -0,0 +1,139 @@
+import random
+import sys
+from typing import List, Optional, Tuple
+
+import compiler
+import concrete
+import parser.parser as parser
+
+'''
+Seeded generator of random programs in the grammar parser.Parser accepts.
+
+Every program reads `variables` inputs v0, v1, ... and copies v0 into a shadow variable s.
+Then come `ifs` ifs with `body` assignments each, separated by `assignments` top-level
+assignments. A fraction `multiplication` of the right-hand sides multiplies by a constant
+(or, with var_by_var, by another variable). Some of the assignments update v0 and s together,
+and the assert is v0 <= s:
+ - for an assert that is true, s always grows at least as much as v0 (true by construction),
+ - for one that can be false (probability false_ratio), one pair lets v0 grow more. That is
+   only a failing assert if the pair can be reached, so such programs are run on random inputs
+   and get the expected verdict "false" only when a failing input was found (None otherwise).
+
+Run from the repository root to print one: python -m benchmarks.generator [seed]
+'''
+
+SAMPLES = 2000
+
+
+class Knobs:
+    def __init__(self, variables: int = 4, ifs: int = 4, body: int = 2, assignments: int = 1,
+                 multiplication: float = 0.1, var_by_var: bool = False, false_ratio: float = 0.5) -> None:
+        self.variables = variables
+        self.ifs = ifs
+        self.body = body
+        self.assignments = assignments
+        self.multiplication = multiplication
+        self.var_by_var = var_by_var
+        self.false_ratio = false_ratio
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class _Generator:
+    def __init__(self, knobs: Knobs, rng: random.Random) -> None:
+        self.knobs = knobs
+        self.rng = rng
+        # variables other than v0 and s
+        self.names = [f"v{i}" for i in range(1, max(knobs.variables, 2))]
+        self.broken = False
+
+    def value(self) -> str:
+        if self.rng.random() < 0.7:
+            return self.rng.choice(self.names + ["v0"])
+        return str(self.rng.randint(-10, 10))
+
+    def assignment(self) -> str:
+        rng = self.rng
+        lhs = rng.choice(self.names)
+        if rng.random() < self.knobs.multiplication:
+            if self.knobs.var_by_var:
+                return f"{lhs} = {rng.choice(self.names)} * {self.value()}"
+            return f"{lhs} = {rng.randint(-3, 3)} * {rng.choice(self.names)}"
+        if rng.random() < 0.2:
+            return f"{lhs} = {self.value()}"
+        return f"{lhs} = {self.value()} {rng.choice('+-')} {self.value()}"
+
+    # v0 and s updated together, s grows at least as much unless this is the broken pair
+    def paired(self, can_break: bool) -> List[str]:
+        rng = self.rng
+        breaks = can_break and not self.broken
+        if not breaks and rng.random() < 0.5:
+            other = rng.choice(self.names)
+            return [f"v0 = v0 + {other}", f"s = s + {other}"]
+        step = rng.randint(-5, 5)
+        shadow = step + rng.randint(0, 3)
+        if breaks:
+            self.broken = True
+            shadow = step - rng.randint(1, 3)
+        return [f"v0 = v0 + {step}", f"s = s + {shadow}"]
+
+    def condition(self) -> str:
+        op = self.rng.choice(["==", "!=", "<", "<=", ">", ">="])
+        return f"{self.rng.choice(self.names + ['v0'])} {op} {self.value()}"
+
+    def program(self, can_break: bool) -> List[str]:
+        knobs = self.knobs
+        rng = self.rng
+        lines = [f"v{i} = input()" for i in range(max(knobs.variables, 2))]
+        lines.append("s = v0")
+        # where the broken pair goes, if there is one
+        broken_at = rng.randrange(knobs.ifs + 1)
+        for index in range(knobs.ifs + 1):
+            for _ in range(knobs.assignments):
+                lines.append(self.assignment())
+            if index == knobs.ifs:
+                break
+            lines.append(f"if {self.condition()} then")
+            body = [self.assignment() for _ in range(max(knobs.body, 1))]
+            if rng.random() < 0.5 or index == broken_at:
+                pair = self.paired(can_break and index == broken_at)
+                position = rng.randrange(len(body) + 1)
+                body[position:position] = pair
+            lines.extend("    " + line for line in body)
+            lines.append("end")
+        if can_break and not self.broken:
+            lines.extend(self.paired(True))
+        lines.append("assert v0 <= s")
+        return lines
+
+
+# None if no input for which the assert fails was found
+def find_failing_input(program: parser.Program, rng: random.Random, samples: int = SAMPLES) -> Optional[List[int]]:
+    run = compiler.compile_program(program)
+    slots = len(concrete.input_slots(program))
+    for index in range(samples):
+        bound = 10 if index < samples // 2 else 1000
+        values = [rng.randint(-bound, bound) for _ in range(slots)]
+        if not run(values)[1]:
+            return values
+    return None
+
+
+def generate(knobs: Knobs, seed: int) -> Tuple[str, Optional[str]]:
+    """Program text and the expected verdict: "true", "false" or None when it isn't known."""
+    rng = random.Random(seed)
+    can_break = rng.random() < knobs.false_ratio
+    lines = _Generator(knobs, rng).program(can_break)
+    text = "\n".join(lines) + "\n"
+    if not can_break:
+        return text, "true"
+    program = parser.parse_string(text)
+    if find_failing_input(program, random.Random(seed)) is None:
+        return text, None
+    return text, "false"
+
+
+if __name__ == "__main__":
+    text, expected = generate(Knobs(), int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    print(text + f"# expected: {expected}")
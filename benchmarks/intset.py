@@ -0,0 +1,113 @@
+import itertools
+import math
+import time
+from typing import Callable, Set
+
+import main
+import parser.parser as parser
+from intset import FULL
+
+'''
+The values of an input as an intset.IntervalSet against the range with a set of excluded numbers
+that Input_value used to have:
+ - a chain of k "x != c" splits, each on a copy of the value (the old value copied its set of
+   excluded numbers on every split, the interval set is shared and only the split interval is
+   rebuilt),
+ - membership and the emptiness test after k exclusions (the old test only compared the bounds,
+   an exact one has to count the excluded numbers in the range),
+ - eval_file on programs that test one input against k constants with == and !=, where the
+   emptied value of a state now makes the state invalid right away.
+
+Run from the repository root: python -m benchmarks.intset
+'''
+
+
+class RangeExcluded:
+    def __init__(self) -> None:
+        self.min_val = -math.inf
+        self.max_val = math.inf
+        self.excluded: Set[int] = set()
+
+    def copy(self) -> "RangeExcluded":
+        result = RangeExcluded()
+        result.min_val = self.min_val
+        result.max_val = self.max_val
+        result.excluded = self.excluded.copy()
+        return result
+
+    def remove(self, point: int) -> "RangeExcluded":
+        result = self.copy()
+        if point == result.min_val:
+            result.min_val += 1
+        elif point == result.max_val:
+            result.max_val -= 1
+        elif result.min_val < point < result.max_val:
+            result.excluded.add(point)
+        return result
+
+    def __contains__(self, number: int) -> bool:
+        return self.min_val <= number <= self.max_val and number not in self.excluded
+
+    def is_empty(self) -> bool:
+        if self.min_val > self.max_val:
+            return True
+        return self.max_val - self.min_val + 1 == sum(self.min_val <= number <= self.max_val for number in self.excluded)
+
+
+def timed(function: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def chain(value, points: int):
+    for point in range(1, 2 * points, 2):
+        value = value.remove(point)
+    return value
+
+
+def bench_operations(sizes) -> None:
+    print("excluded   chain old [us]   chain new [us]   lookup old [ns]   lookup new [ns]   empty old [us]   empty new [ns]")
+    for size in sizes:
+        repeat = max(2, 20000 // size)
+        old_chain = timed(lambda: chain(RangeExcluded(), size), repeat)
+        new_chain = timed(lambda: chain(FULL, size), repeat)
+        old = chain(RangeExcluded(), size)
+        new = chain(FULL, size)
+        lookups = range(0, 2 * size, max(1, size // 50))
+        old_lookup = timed(lambda: [number in old for number in lookups], repeat) / len(lookups)
+        new_lookup = timed(lambda: [number in new for number in lookups], repeat) / len(lookups)
+        old_bounded = chain(RangeExcluded(), size)
+        old_bounded.min_val, old_bounded.max_val = 0, 2 * size
+        new_bounded = new.intersect_range(0, 2 * size)
+        old_empty = timed(old_bounded.is_empty, repeat)
+        new_empty = timed(new_bounded.is_empty, repeat * 100)
+        print(f"{size:8}   {old_chain * 1e6:14.2f}   {new_chain * 1e6:14.2f}   {old_lookup * 1e9:15.1f}"
+              f"   {new_lookup * 1e9:15.1f}   {old_empty * 1e6:14.2f}   {new_empty * 1e9:14.1f}")
+
+
+# k ifs comparing x with 0 .. k - 1, then x is one of them (== chain) or none of them (!= chain)
+def generate(constants: int, op: str) -> parser.Program:
+    lines = ["x = input()", "y = 0"]
+    for constant in range(constants):
+        lines += [f"if x {op} {constant} then", "    y = y + 1", "end"]
+    lines.append("assert y >= 0")
+    return parser.Parser().parse_program(iter(lines))
+
+
+def bench_eval(sizes) -> None:
+    print("constants   op   time [ms]   paths")
+    for size in sizes:
+        for op in ("==", "!="):
+            program = generate(size, op)
+            start = time.perf_counter()
+            main.eval_file(program, intervals=False, slicing_pass=False)
+            elapsed = time.perf_counter() - start
+            paths = sum(1 for _ in itertools.islice(main.explore_paths(program), 100000))
+            print(f"{size:9}   {op}   {elapsed * 1000:9.2f}   {paths:5}")
+
+
+if __name__ == "__main__":
+    bench_operations([10, 100, 1000])
+    bench_eval([8, 32, 128])
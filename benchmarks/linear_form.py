@@ -0,0 +1,127 @@
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import main
+
+'''
+Interned tuple-based Variable against the previous representation (a dict of
+Input_value_times_x objects per variable, rebuilt by sum_variable_input_values for every + and -,
+and compared through Variable.eval dicts).
+
+Reports time per assignment, blocks still allocated after the run and peak traced memory.
+
+Run from the repository root: python -m benchmarks.linear_form
+'''
+
+
+# previous representation, kept here only for comparison
+class OldInputTimesX:
+    def __init__(self, name: str, times: int = 1) -> None:
+        self.name = name
+        self.times = times
+
+
+class OldVariable:
+    def __init__(self) -> None:
+        self.value = 0
+        self.values: Dict[str, OldInputTimesX] = {}
+
+    def eval(self) -> Dict[str, int]:
+        result = {"constant": self.value}
+        for key, value in self.values.items():
+            result[key] = value.times
+        return result
+
+
+def old_sum(var1: OldVariable, var2: OldVariable, multiply_by: int, possible: List[str]) -> Dict[str, OldInputTimesX]:
+    result = {}
+    for variable in possible:
+        total = 0
+        if variable in var1.values:
+            total += var1.values[variable].times
+        if variable in var2.values:
+            total += var2.values[variable].times * multiply_by
+        if total != 0:
+            result[variable] = OldInputTimesX(variable, total)
+    return result
+
+
+def old_equals(left: Dict[str, int], right: Dict[str, int]) -> bool:
+    if left["constant"] != right["constant"]:
+        return False
+    for key in (list(left.keys()) + list(right.keys())):
+        if left.get(key, None) != right.get(key, None):
+            return False
+    return True
+
+
+# random program: (op, left, right) over `size` variables, which all start as distinct inputs
+def workload(size: int, steps: int, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    return [(rng.choice("+-*"), rng.randrange(size), rng.randrange(size), rng.choice((-1, 1))) for _ in range(steps)]
+
+
+def run_old(size: int, steps: List[tuple], names: List[str]) -> list:
+    variables = []
+    for name in names:
+        variable = OldVariable()
+        variable.values[name] = OldInputTimesX(name)
+        variables.append(variable)
+    equal = 0
+    for op, left, right, times in steps:
+        result = OldVariable()
+        a, b = variables[left], variables[right]
+        if op == "*":
+            result.value = b.value * times
+            result.values = {k: OldInputTimesX(k, v.times * times) for k, v in b.values.items()}
+        else:
+            sign = 1 if op == "+" else -1
+            result.value = a.value + sign * b.value
+            result.values = old_sum(a, b, sign, names)
+        equal += old_equals(result.eval(), a.eval())
+        variables[left] = result
+    return variables
+
+
+def run_new(size: int, steps: List[tuple], names: List[str]) -> list:
+    variables = [main.Variable.input(name) for name in names]
+    equal = 0
+    for op, left, right, times in steps:
+        a, b = variables[left], variables[right]
+        if op == "*":
+            result = b.scale(times)
+        elif op == "+":
+            result = a + b
+        else:
+            result = a - b
+        equal += result is a
+        variables[left] = result
+    return variables
+
+
+def measure(run, size: int, steps: List[tuple]) -> tuple:
+    names = [f"i{k}" for k in range(size)]
+    start = time.perf_counter()
+    run(size, steps, names)
+    elapsed = time.perf_counter() - start
+
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    kept = run(size, steps, names)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = sys.getallocatedblocks() - blocks
+    del kept
+    return elapsed / len(steps), retained, peak
+
+
+if __name__ == "__main__":
+    print("variables   representation   time/assignment [us]   retained blocks   peak [KiB]")
+    for size in (4, 32, 256):
+        steps = workload(size, 20000)
+        for label, run in (("dict (old)", run_old), ("interned", run_new)):
+            per_step, retained, peak = measure(run, size, steps)
+            print(f"{size:9}   {label:>14}   {per_step * 1e6:20.2f}   {retained:15}   {peak / 1024:10.1f}")
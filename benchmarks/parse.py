@@ -0,0 +1,139 @@
+import random
+import sys
+import time
+from typing import Iterator, List, Optional, Set
+
+import parser.parser as parser
+
+'''
+Parsing throughput (lines/s and programs/s) of parser.Parser against the previous parser
+(split + int() in try/except for every value, recursion through get_next_line), on a large
+synthetic corpus of small programs. Both have to produce the same programs.
+
+Run from the repository root: python -m benchmarks.parse [programs]
+'''
+
+
+# previous parser, kept here only for comparison
+class OldParser:
+    def __init__(self):
+        self.lineStream = []
+        self.postCondition = None
+        self.variables: Set[str] = set()
+
+    def parse_value(self, token: str) -> parser.Value:
+        if token == "input()":
+            return parser.Input()
+        try:
+            return parser.Constant(int(token))
+        except:
+            return parser.Var(token)
+
+    def parse_expr(self, tokens: List[str]):
+        if len(tokens) == 1:
+            return self.parse_value(tokens[0])
+        elif len(tokens) == 3:
+            if tokens[1] not in ("+", "-", "*"):
+                raise RuntimeError(f"Unsupported operation {tokens[1]}")
+            return parser.Expr(tokens[1], self.parse_value(tokens[0]), self.parse_value(tokens[2]))
+        raise RuntimeError()
+
+    def parse_cond(self, tokens: List[str]) -> parser.Comp:
+        if len(tokens) == 3:
+            if tokens[1] not in ("==", "<", ">", "<=", ">=", "!="):
+                raise RuntimeError(f"Unsupported comparison {tokens[1]}")
+            return parser.Comp(tokens[1], self.parse_value(tokens[0]), self.parse_value(tokens[2]))
+        raise RuntimeError(f"Invalid condition {tokens}")
+
+    def parse_command(self, line: str):
+        tokens = line.split()
+        if tokens[0] == "assert":
+            if self.postCondition is not None:
+                raise RuntimeError("Only one assertion can be defined")
+            self.postCondition = self.parse_cond(tokens[1:])
+            return None
+        if tokens[0] == "if":
+            if len(tokens) != 5:
+                raise RuntimeError("Unexpected end of line")
+            body = self.parse_commands(True)
+            return parser.If(self.parse_cond(tokens[1:4]), body)
+        if tokens[1] == "=":
+            self.variables.add(tokens[0])
+            return parser.Assignment(tokens[0], self.parse_expr(tokens[2:]))
+        raise RuntimeError(f"Unexpected line {tokens}")
+
+    def get_next_line(self) -> Optional[str]:
+        try:
+            return next(self.lineStream)
+        except StopIteration:
+            return None
+
+    def parse_commands(self, innerBlock=False) -> list:
+        commands = []
+        line = self.get_next_line()
+        while line is not None:
+            if line.strip() == "end":
+                return commands
+            command = self.parse_command(line)
+            if isinstance(command, parser.If) and innerBlock:
+                raise RuntimeError("Nested if-then blocks are not allowed")
+            if command is not None:
+                if self.postCondition:
+                    raise RuntimeError("No further commands are allowed after a postcondition")
+                commands.append(command)
+            line = self.get_next_line()
+        if innerBlock:
+            raise RuntimeError("Unexpected end of file")
+        return commands
+
+    def parse_program(self, lineIterator: Iterator[str]) -> parser.Program:
+        self.lineStream = lineIterator
+        commands = self.parse_commands()
+        assert self.postCondition is not None
+        return parser.Program(commands, self.postCondition, self.variables)
+
+
+def random_program(rng: random.Random) -> List[str]:
+    names = ["x", "y", "z", "counter", "total"]
+
+    def value() -> str:
+        return rng.choice(names) if rng.random() < 0.6 else str(rng.randint(-100, 100))
+
+    def assignment(indent: str) -> str:
+        rhs = value() if rng.random() < 0.3 else f"{value()} {rng.choice('+-*')} {value()}"
+        return f"{indent}{rng.choice(names)} = {rhs}"
+
+    lines = [f"{name} = input()" for name in names]
+    for _ in range(rng.randint(2, 10)):
+        if rng.random() < 0.4:
+            lines.append(f"if {value()} {rng.choice(['==', '!=', '<', '<=', '>', '>='])} {value()} then")
+            lines.extend(assignment("    ") for _ in range(rng.randint(1, 3)))
+            lines.append("end")
+        else:
+            lines.append(assignment(""))
+    lines.append(f"assert {rng.choice(names)} >= {value()}")
+    return lines
+
+
+def measure(make, corpus: List[List[str]]) -> tuple:
+    start = time.perf_counter()
+    programs = [make().parse_program(iter(lines)) for lines in corpus]
+    elapsed = time.perf_counter() - start
+    return elapsed, programs
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    corpus = [random_program(rng) for _ in range(count)]
+    lines = sum(len(program) for program in corpus)
+
+    old_time, old_programs = measure(OldParser, corpus)
+    new_time, new_programs = measure(parser.Parser, corpus)
+    assert all(str(a) == str(b) for a, b in zip(old_programs, new_programs))
+
+    print(f"{count} programs, {lines} lines")
+    print("parser      lines/s      programs/s")
+    for label, elapsed in (("previous", old_time), ("current", new_time)):
+        print(f"{label:>8}   {lines / elapsed:10.0f}   {count / elapsed:12.0f}")
+    print(f"speedup {old_time / new_time:.2f}x")
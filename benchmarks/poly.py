@@ -0,0 +1,64 @@
+import time
+from typing import List
+
+import main
+import parser.parser as parser
+import poly
+from benchmarks.generator import Knobs, generate
+
+'''
+Cost of the polynomial normal form of main.Variable (poly.py):
+ - (x1 + ... + xn + 1) ** degree built by repeated Variable.multiply: number of terms and
+   monomials, time of the first product and of the same product again (interned Variables,
+   cached product),
+ - eval_file on generated programs where a growing share of the assignments multiplies two
+   variables (Knobs.var_by_var): time per program and how many were decided.
+
+Run from the repository root: python -m benchmarks.poly
+'''
+
+REPEAT = 100
+
+
+def bench_products(sizes: List[int], degrees: List[int]) -> None:
+    print("inputs   degree   terms   monomials   first [ms]   again [us]")
+    for size in sizes:
+        base = main.Variable(tuple((f"x{i:02}", 1) for i in range(size)), 1)
+        for degree in degrees:
+            main._product.cache_clear()
+            result = main.Variable((), 1)
+            start = time.perf_counter()
+            for _ in range(degree):
+                result = result.multiply(base)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                again = base
+                for _ in range(degree - 1):
+                    again = again.multiply(base)
+            repeated = (time.perf_counter() - start) / REPEAT
+            assert again is result
+            monomials = sum(isinstance(name, poly.Monomial) for name, _ in result.terms)
+            print(f"{size:6}   {degree:6}   {len(result.terms):5}   {monomials:9}   {first * 1000:10.2f}"
+                  f"   {repeated / max(degree - 1, 1) * 1e6:10.2f}")
+
+
+def bench_programs(densities: List[float], count: int = 20) -> None:
+    print("density   time [ms]   decided   unknown")
+    for density in densities:
+        decided = unknown = 0
+        start = time.perf_counter()
+        for seed in range(count):
+            text, _ = generate(Knobs(multiplication=density, var_by_var=True), seed)
+            try:
+                main.eval_file(parser.parse_string(text))
+                decided += 1
+            except AssertionError:
+                unknown += 1
+        elapsed = (time.perf_counter() - start) / count
+        print(f"{density:7}   {elapsed * 1000:9.2f}   {decided:7}   {unknown:7}")
+
+
+if __name__ == "__main__":
+    bench_products([2, 4, 8], [2, 3, 4, 6])
+    bench_programs([0.1, 0.3, 0.5, 0.8])
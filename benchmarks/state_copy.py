@@ -0,0 +1,144 @@
+import math
+import time
+import tracemalloc
+from typing import Dict, List
+
+import main
+import parser.parser as parser
+
+'''
+Cost of splitting a state: State.copy() (shared scopes) against the copy of every
+input value and variable the state used to make (OldState, the copy code of that
+time), and the time and peak memory of eval_file on programs with many variables
+and ifs.
+
+Run from the repository root: python -m benchmarks.state_copy
+'''
+
+
+# lowercase names that can't clash with keywords
+def name(index: int) -> str:
+    result = ""
+    index += 1
+    while index > 0:
+        index, rest = divmod(index - 1, 26)
+        result = chr(ord("a") + rest) + result
+    return "v" + result
+
+
+# `variables` inputs, then `ifs` ifs each assigning one variable
+def generate(variables: int, ifs: int) -> parser.Program:
+    lines = [f"{name(i)} = input()" for i in range(variables)]
+    for i in range(ifs):
+        lines += [f"if {name(i % variables)} > {i} then",
+                  f"    {name((i + 1) % variables)} = {name((i + 1) % variables)} + 1",
+                  "end"]
+    lines.append(f"assert {name(0)} > 0")
+    return parser.Parser().parse_program(iter(lines))
+
+
+# the state as it was before State.copy() shared scopes, with its copy code unchanged
+class OldInputValue:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.min_val = -math.inf
+        self.max_val = math.inf
+        self.excluded = set()
+
+    def copy(self) -> "OldInputValue":
+        result = OldInputValue(self.name)
+        result.min_val = self.min_val
+        result.max_val = self.max_val
+        result.excluded = self.excluded.copy()
+        return result
+
+
+class OldInputValueTimesX:
+    def __init__(self, value: OldInputValue, times: int = 1) -> None:
+        self.value = value
+        self.name = value.name
+        self.times = times
+
+    def copy(self, values: Dict[str, OldInputValue]) -> "OldInputValueTimesX":
+        result = OldInputValueTimesX(values[self.value.name], self.times)
+        result.name = self.name
+        return result
+
+
+class OldVariable:
+    def __init__(self) -> None:
+        self.value = 0
+        self.values: Dict[str, OldInputValueTimesX] = {}
+
+    def copy(self, values: Dict[str, OldInputValue]) -> "OldVariable":
+        result = OldVariable()
+        result.value = self.value
+        result.values = {name: value.copy(values) for name, value in self.values.items()}
+        return result
+
+
+class OldState:
+    def __init__(self) -> None:
+        self.variables: Dict[str, OldVariable] = {}
+        self.values: Dict[str, OldInputValue] = {}
+
+    def copy(self) -> "OldState":
+        result = OldState()
+        result.values = {name: value.copy() for name, value in self.values.items()}
+        result.variables = {name: variable.copy(result.values) for name, variable in self.variables.items()}
+        return result
+
+
+# the same variables and input values as state, in the old representation
+def old_state(state: main.State) -> OldState:
+    result = OldState()
+    for key, _ in state.values.items():
+        result.values[key] = OldInputValue(key)
+    for key, variable in state.variables.items():
+        old = result.variables[key] = OldVariable()
+        old.value = variable.constant
+        for value, times in variable.terms:
+            old.values[value] = OldInputValueTimesX(result.values[value], times)
+    return result
+
+
+def final_state(variables: int) -> main.State:
+    state = main.State()
+    for command in generate(variables, 0).commands:
+        main.eval_command(command, state)
+    return state
+
+
+def bench_copy(sizes: List[int], repeat: int = 2000) -> None:
+    print("variables   State.copy [us]   old copy [us]")
+    for size in sizes:
+        state = final_state(size)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            copy = state.copy()
+            copy.variables[name(0)] = main.Variable()
+        shared = (time.perf_counter() - start) / repeat
+        old = old_state(state)
+        start = time.perf_counter()
+        for _ in range(repeat // 10):
+            old.copy()
+        copied = (time.perf_counter() - start) / (repeat // 10)
+        print(f"{size:9}   {shared * 1e6:15.2f}   {copied * 1e6:13.2f}")
+
+
+def bench_eval(cases: List[tuple]) -> None:
+    print("variables   ifs   time [ms]   peak memory [KiB]")
+    for variables, ifs in cases:
+        program = generate(variables, ifs)
+        tracemalloc.start()
+        start = time.perf_counter()
+        main.eval_file(program, merge=False, slicing_pass=False, intervals=False)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{variables:9}   {ifs:3}   {elapsed * 1000:9.2f}   {peak / 1024:17.1f}")
+
+
+if __name__ == "__main__":
+    bench_copy([10, 100, 1000, 10000])
+    bench_eval([(10, 10), (100, 10), (1000, 10), (100, 14), (1000, 14)])
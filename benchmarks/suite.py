@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import batch
+import main
+import parser.parser as parser
+from benchmarks.generator import Knobs, generate
+
+'''
+Scaling benchmark of eval_file on generated programs (benchmarks/generator.py).
+
+Every knob is grown on its own from the defaults of Knobs. For each setting, `count` seeded
+programs are verified, and the harness records:
+ - time per program (mean, p99), with a timeout per program,
+ - peak traced memory of one eval_file run,
+ - the number of finished paths (main.explore_paths, capped at MAX_PATHS),
+ - the verdicts against the expected ones from the generator (wrong = a decided verdict
+   that contradicts a known expected one).
+
+The results are written as JSON. With --baseline, the run is compared to a saved one and
+settings that got slower (or used more memory) by more than --tolerance are reported, along
+with any new wrong verdicts.
+
+Run from the repository root:
+    python -m benchmarks.suite -o benchmarks/baselines/default.json
+    python -m benchmarks.suite --baseline benchmarks/baselines/default.json
+'''
+
+MAX_PATHS = 100000
+
+# knob -> values it takes, the other knobs stay at their defaults
+GRID: Dict[str, list] = {
+    "ifs": [2, 4, 8, 12],
+    "variables": [2, 4, 8, 16],
+    "body": [1, 2, 4, 8],
+    "multiplication": [0.0, 0.2, 0.5],
+    "false_ratio": [0.0, 0.5, 1.0],
+    "var_by_var": [True],
+}
+
+
+# None if the engine can't execute the program
+def count_paths(parsed: parser.Program) -> Optional[int]:
+    count = 0
+    try:
+        for _ in main.explore_paths(parsed):
+            count += 1
+            if count >= MAX_PATHS:
+                break
+    except AssertionError:
+        return None
+    return count
+
+
+def peak_memory(parsed: parser.Program, eval_options: dict) -> int:
+    tracemalloc.start()
+    try:
+        main.eval_file(parsed, **eval_options)
+    except AssertionError:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_setting(knobs: Knobs, count: int, timeout: float, eval_options: dict) -> dict:
+    programs = [generate(knobs, seed) for seed in range(count)]
+    sources = [(str(seed), text) for seed, (text, _) in enumerate(programs)]
+    results = list(batch.run_corpus(sources, None, 1, timeout, None, eval_options))
+
+    accuracy = {"correct": 0, "wrong": 0, "unknown": 0, "unchecked": 0}
+    peaks = []
+    paths = []
+    for (text, expected), result in zip(programs, results):
+        if result.verdict == batch.VERDICT_UNKNOWN:
+            accuracy["unknown"] += 1
+        elif expected is None:
+            accuracy["unchecked"] += 1
+        else:
+            accuracy["correct" if result.verdict == expected else "wrong"] += 1
+        if result.reason != batch.REASON_TIMEOUT:
+            parsed = parser.parse_string(text)
+            peaks.append(peak_memory(parsed, eval_options))
+            count_of_paths = count_paths(parsed)
+            if count_of_paths is not None:
+                paths.append(count_of_paths)
+
+    times = sorted(result.elapsed for result in results)
+    return {
+        "knobs": knobs.as_dict(),
+        "programs": count,
+        "timeouts": sum(result.reason == batch.REASON_TIMEOUT for result in results),
+        "time_mean_ms": sum(times) / len(times) * 1000,
+        "time_p99_ms": batch.percentile(times, 99) * 1000,
+        "peak_memory_kib": max(peaks, default=0) / 1024,
+        "paths_mean": sum(paths) / len(paths) if paths else 0,
+        "paths_max": max(paths, default=0),
+        "accuracy": accuracy,
+    }
+
+
+def run_suite(count: int, timeout: float, eval_options: dict, grid: Dict[str, list] = GRID) -> List[dict]:
+    settings = []
+    for knob, values in grid.items():
+        for value in values:
+            knobs = Knobs()
+            setattr(knobs, knob, value)
+            setting = run_setting(knobs, count, timeout, eval_options)
+            setting["knob"] = knob
+            settings.append(setting)
+            print(f"{knob:>15} = {str(value):<5} {setting['time_mean_ms']:9.2f}ms {setting['time_p99_ms']:9.2f}ms "
+                  f"{setting['peak_memory_kib']:9.1f}KiB {setting['paths_mean']:9.1f} paths  {setting['accuracy']}")
+    return settings
+
+
+def compare(settings: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    previous = {json.dumps(setting["knobs"], sort_keys=True): setting for setting in baseline["settings"]}
+    problems = []
+    for setting in settings:
+        old = previous.get(json.dumps(setting["knobs"], sort_keys=True))
+        if old is None:
+            continue
+        label = f"{setting['knob']} = {setting['knobs'][setting['knob']]}"
+        for metric in ("time_mean_ms", "peak_memory_kib"):
+            # ignore differences below the timer / allocator noise
+            if setting[metric] > old[metric] * tolerance and setting[metric] - old[metric] > 0.5:
+                problems.append(f"{label}: {metric} {old[metric]:.2f} -> {setting[metric]:.2f}")
+        if setting["accuracy"]["wrong"] > old["accuracy"]["wrong"]:
+            problems.append(f"{label}: wrong verdicts {old['accuracy']['wrong']} -> {setting['accuracy']['wrong']}")
+    return problems
+
+
+def main_suite() -> int:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--count", type=int, default=30, help="programs per setting")
+    arg_parser.add_argument("--timeout", type=float, default=5.0, help="seconds per program")
+    arg_parser.add_argument("--depth-first", action="store_true")
+    arg_parser.add_argument("-o", "--output", help="write the results as JSON")
+    arg_parser.add_argument("--baseline", help="JSON of an earlier run to compare with")
+    arg_parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor")
+    args = arg_parser.parse_args()
+
+    eval_options = {"depth_first": args.depth_first}
+    start = time.perf_counter()
+    settings = run_suite(args.count, args.timeout, eval_options)
+    data = {"count": args.count, "timeout": args.timeout, "eval_options": eval_options,
+            "wall_time_s": time.perf_counter() - start, "settings": settings}
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(settings, json.load(f), args.tolerance)
+        for problem in problems:
+            print("regression:", problem)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_suite())
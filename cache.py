@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import parser.parser as parser
+
+'''
+Persistent cache of verification results.
+
+Results are stored under a hash of the canonical form of the program: variables are renamed
+in the order they are first used and the text is rebuilt from the parsed program, so programs
+that differ only in variable names or whitespace share one entry. The reason of an unknown
+result may name variables (e.g. "Variable y is undefined"), so it is only returned for a program with the
+same names: a key is "<hash of the canonical form>/<hash of the variable names>" and an entry
+remembers the names of the program it was computed for. The hash of the raw file content is
+remembered as an alias, so an unchanged file is found without parsing it.
+
+The cache keeps at most max_entries results and drops the least recently used ones. It is
+stamped with the version of the engine - a hash of every source file of the repository that
+batch.py imports, directly or not, since any of them can change a result - and a cache written
+by another version is ignored.
+'''
+
+# the module that computes the cached results, engine_files follows its imports
+ENGINE_ROOT = "batch.py"
+
+
+def engine_files() -> List[str]:
+    """Paths (relative to the repository) of ENGINE_ROOT and the modules of the repository it imports,
+    also inside functions and indirectly."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    files = set()
+    pending = [ENGINE_ROOT]
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        files.add(name)
+        with open(os.path.join(root, name)) as f:
+            lines = f.read().splitlines()
+        for line in lines:
+            words = line.split()
+            if len(words) >= 4 and words[0] == "from" and words[2] == "import":
+                modules = [words[1]]
+            elif len(words) >= 2 and words[0] == "import":
+                modules = [part.split()[0] for part in line.strip()[len("import"):].split(",") if part.strip()]
+            else:
+                continue
+            for module in modules:
+                path = os.path.join(*module.split(".")) + ".py"
+                if os.path.isfile(os.path.join(root, path)):
+                    pending.append(path)
+    return sorted(files)
+
+
+def engine_version() -> str:
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in engine_files():
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def canonical_form(program: parser.Program) -> str:
+    return _canonical(program)[0]
+
+
+# the canonical form and the variables of the program in the order of their new names
+def _canonical(program: parser.Program) -> Tuple[str, List[str]]:
+    names: Dict[str, str] = {}
+
+    def value(v) -> str:
+        if isinstance(v, parser.Input):
+            return "input()"
+        if isinstance(v, parser.Constant):
+            return str(int(v))
+        if v not in names:
+            names[v] = "v" + str(len(names))
+        return names[v]
+
+    def expression(e) -> str:
+        if isinstance(e, parser.Expr):
+            left = value(e.l)
+            return f"{left} {e.op} {value(e.r)}"
+        return value(e)
+
+    def condition(c: parser.Comp) -> str:
+        left = value(c.l)
+        return f"{left} {c.op} {value(c.r)}"
+
+    def assignment(a: parser.Assignment) -> str:
+        lhs = value(a.lhs)
+        return f"{lhs} = {expression(a.rhs)}"
+
+    lines: List[str] = []
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            lines.append(f"if {condition(command.condition)} then")
+            lines.extend(assignment(body_command) for body_command in command.body)
+            lines.append("end")
+        else:
+            lines.append(assignment(command))
+    lines.append("assert " + condition(program.postCondition))
+    return "\n".join(lines), list(names)
+
+
+def program_hash(program: parser.Program) -> str:
+    text, names = _canonical(program)
+    return hashlib.sha256(text.encode()).hexdigest() + "/" + hashlib.sha256(" ".join(names).encode()).hexdigest()[:16]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: str, max_entries: int = 100000, version: Optional[str] = None) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version if version is not None else engine_version()
+        # hash of the canonical form -> (verdict, reason, hash of the variable names), least recently used first
+        self.entries: "OrderedDict[str, Tuple[str, str, str]]" = OrderedDict()
+        # content hash -> program hash
+        self.aliases: "OrderedDict[str, str]" = OrderedDict()
+        self.changed = False
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return
+        for key, entry in data.get("entries", []):
+            if len(entry) == 3:
+                self.entries[key] = (entry[0], entry[1], entry[2])
+        for key, target in data.get("aliases", []):
+            self.aliases[key] = target
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+        data = {
+            "version": self.version,
+            "entries": [[key, list(entry)] for key, entry in self.entries.items()],
+            "aliases": [[key, target] for key, target in self.aliases.items()],
+        }
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+        os.replace(temporary, self.path)
+        self.changed = False
+
+    # (verdict, reason) of a program_hash key
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        program, _, names = key.partition("/")
+        entry = self.entries.get(program)
+        if entry is None:
+            return None
+        self._touch(self.entries, program)
+        verdict, reason, entry_names = entry
+        if reason and entry_names != names:
+            # computed for a renaming of the program, the reason would name other variables
+            return None
+        return verdict, reason
+
+    def put(self, key: str, verdict: str, reason: str = "") -> None:
+        program, _, names = key.partition("/")
+        self.entries[program] = (verdict, reason, names)
+        self.entries.move_to_end(program)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.changed = True
+
+    def resolve(self, content: str) -> Optional[str]:
+        key = self.aliases.get(content)
+        if key is not None:
+            self._touch(self.aliases, content)
+        return key
+
+    # a read makes the key the most recently used, and the new order has to be saved with it
+    def _touch(self, entries: OrderedDict, key: str) -> None:
+        if next(reversed(entries)) != key:
+            entries.move_to_end(key)
+            self.changed = True
+
+    def alias(self, content: str, key: str) -> None:
+        if self.aliases.get(content) == key:
+            return
+        self.aliases[content] = key
+        self.aliases.move_to_end(content)
+        while len(self.aliases) > self.max_entries:
+            self.aliases.popitem(last=False)
+        self.changed = True
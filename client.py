@@ -0,0 +1,104 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, Optional
+
+'''
+Client of the verification service (service.py). Only uses the standard library and doesn't import
+the engine, so a call costs a Python start-up without the engine plus one round trip.
+
+    python client.py programs/other/5.txt programs/other/6.txt
+    python client.py - < program.txt
+    python client.py --metrics
+
+Prints one "name: message" line per program (like the results file), with the witness of a failing
+assert. Exits with 0 if every assert holds, 1 if one can be false, 2 if a result is unknown or the
+service can't be reached.
+'''
+
+DEFAULT_URL = "127.0.0.1:8765"
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def connect(address: str = DEFAULT_URL, socket_path: Optional[str] = None,
+            timeout: Optional[float] = None) -> http.client.HTTPConnection:
+    if socket_path is not None:
+        return _UnixConnection(socket_path, timeout)
+    return http.client.HTTPConnection(address.split("://", 1)[-1].rstrip("/"), timeout=timeout)
+
+
+def request(connection: http.client.HTTPConnection, method: str, path: str,
+            body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    data = None if body is None else json.dumps(body).encode()
+    headers = {} if data is None else {"Content-Type": "application/json"}
+    connection.request(method, path, data, headers)
+    response = connection.getresponse()
+    reply = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"{response.status}: {reply.get('error', '')}")
+    return reply
+
+
+def verify(connection: http.client.HTTPConnection, name: str, program: str,
+           deadline: Optional[float] = None) -> Dict[str, Any]:
+    body: Dict[str, Any] = {"name": name, "program": program}
+    if deadline is not None:
+        body["deadline"] = deadline
+    return request(connection, "POST", "/verify", body)
+
+
+def main_client() -> int:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("files", nargs="*", help="programs to verify, - for stdin")
+    arg_parser.add_argument("--url", default=DEFAULT_URL, help="host:port of the service")
+    arg_parser.add_argument("--socket", help="Unix socket of the service")
+    arg_parser.add_argument("--deadline", type=float, help="seconds per program")
+    arg_parser.add_argument("--health", action="store_true")
+    arg_parser.add_argument("--metrics", action="store_true")
+    args = arg_parser.parse_args()
+
+    # the deadline is enforced by the service, the socket only waits a bit longer
+    timeout = None if args.deadline is None else args.deadline + 5
+    connection = connect(args.url, args.socket, timeout)
+    status = 0
+    try:
+        for path in [path for path, wanted in (("/health", args.health), ("/metrics", args.metrics)) if wanted]:
+            print(json.dumps(request(connection, "GET", path), indent=1))
+        for file in args.files:
+            if file == "-":
+                program = sys.stdin.read()
+            else:
+                with open(file) as f:
+                    program = f.read()
+            reply = verify(connection, os.path.basename(file), program, args.deadline)
+            line = f"{reply['name']}: {reply['message']}"
+            if reply["witness"] is not None:
+                line += "  (" + ", ".join(f"{label} = {value}" for label, value in reply["witness"]) + ")"
+            print(line)
+            if reply["verdict"] == "false":
+                status = max(status, 1)
+            elif reply["verdict"] != "true":
+                status = 2
+    except (OSError, RuntimeError, http.client.HTTPException) as e:
+        print("service:", e, file=sys.stderr)
+        return 2
+    finally:
+        connection.close()
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_client())
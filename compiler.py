@@ -0,0 +1,111 @@
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+
+import concrete
+import parser.parser as parser
+
+'''
+Compiles a parsed program into one Python function, which runs it concretely much faster than
+walking the parsed objects (concrete.execute).
+
+The generated function takes the input values (one per input slot, numbered as in
+concrete.input_slots) and returns the same (variables, assert holds) pair as concrete.execute.
+Every program variable becomes a local variable of the function, every if an if statement.
+Variables that are only assigned inside an if start as None and are left out of the result
+when the if wasn't executed; reading such a variable raises (TypeError instead of KeyError).
+
+Compiled functions are cached per Program object and per generated source, so equal programs
+parsed twice share one code object.
+'''
+
+Compiled = Callable[[Sequence[int]], Tuple[Dict[str, int], bool]]
+
+SOURCE_CACHE_SIZE = 1024
+
+
+class _Generator:
+    def __init__(self, program: parser.Program) -> None:
+        self.slots = {id(node): index for index, (node, _) in enumerate(concrete.input_slots(program))}
+        self.names: Dict[str, str] = {}
+
+    def local(self, name: str) -> str:
+        if name not in self.names:
+            self.names[name] = "v" + str(len(self.names))
+        return self.names[name]
+
+    def value(self, v) -> str:
+        if isinstance(v, parser.Input):
+            return f"inputs[{self.slots[id(v)]}]"
+        if isinstance(v, parser.Constant):
+            return f"({int(v)})"
+        return self.local(v)
+
+    def expression(self, e) -> str:
+        if isinstance(e, parser.Expr):
+            left = self.value(e.l)
+            return f"{left} {e.op} {self.value(e.r)}"
+        return self.value(e)
+
+    def condition(self, c: parser.Comp) -> str:
+        left = self.value(c.l)
+        return f"{left} {c.op} {self.value(c.r)}"
+
+    def source(self, program: parser.Program) -> str:
+        assigned: Set[str] = set()
+        maybe: List[str] = []
+        body: List[str] = []
+        for command in program.commands:
+            if isinstance(command, parser.If):
+                body.append(f"    if {self.condition(command.condition)}:")
+                for assignment in command.body:
+                    rhs = self.expression(assignment.rhs)
+                    body.append(f"        {self.local(assignment.lhs)} = {rhs}")
+                    if assignment.lhs not in maybe:
+                        maybe.append(assignment.lhs)
+            else:
+                rhs = self.expression(command.rhs)
+                body.append(f"    {self.local(command.lhs)} = {rhs}")
+                assigned.add(command.lhs)
+        holds = self.condition(program.postCondition)
+
+        # only assigned inside ifs, may be unset at the end
+        maybe = [name for name in maybe if name not in assigned]
+        lines = ["def program(inputs):"]
+        lines.extend(f"    {self.local(name)} = None" for name in maybe)
+        lines.extend(body)
+        lines.append(f"    holds = {holds}")
+        definite = [name for name in self.names if name in assigned]
+        lines.append("    env = {" + ", ".join(f"{name!r}: {self.local(name)}" for name in definite) + "}")
+        for name in maybe:
+            lines.append(f"    if {self.local(name)} is not None:")
+            lines.append(f"        env[{name!r}] = {self.local(name)}")
+        lines.append("    return env, holds")
+        return "\n".join(lines) + "\n"
+
+
+def program_source(program: parser.Program) -> str:
+    return _Generator(program).source(program)
+
+
+_by_program: "weakref.WeakKeyDictionary[parser.Program, Compiled]" = weakref.WeakKeyDictionary()
+_by_source: "OrderedDict[str, Compiled]" = OrderedDict()
+
+
+def compile_program(program: parser.Program) -> Compiled:
+    function = _by_program.get(program)
+    if function is not None:
+        return function
+    source = program_source(program)
+    function = _by_source.get(source)
+    if function is None:
+        namespace: Dict[str, Compiled] = {}
+        exec(compile(source, "<program>", "exec"), namespace)
+        function = namespace["program"]
+        _by_source[source] = function
+        if len(_by_source) > SOURCE_CACHE_SIZE:
+            _by_source.popitem(last=False)
+    else:
+        _by_source.move_to_end(source)
+    _by_program[program] = function
+    return function
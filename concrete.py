@@ -0,0 +1,73 @@
+import operator
+from typing import Dict, List, Sequence, Tuple
+
+import parser.parser as parser
+
+'''
+Concrete execution of a parsed program.
+
+Every call of input() in the program text is an input slot, numbered in the order the calls
+appear in the text (the condition of an if before its body). A run gets one value per slot;
+a slot inside an if body is only read when the body is executed.
+'''
+
+OPERATIONS = {"+": operator.add, "-": operator.sub, "*": operator.mul}
+COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge,
+}
+
+
+def _inputs_of(node) -> List[parser.Input]:
+    if isinstance(node, (parser.Expr, parser.Comp)):
+        return _inputs_of(node.l) + _inputs_of(node.r)
+    if isinstance(node, parser.Input):
+        return [node]
+    return []
+
+
+# (input object, label) for every slot, the label is the assigned variable when there is one
+def input_slots(program: parser.Program) -> List[Tuple[parser.Input, str]]:
+    result = []
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            result.extend((node, "input") for node in _inputs_of(command.condition))
+            assignments = command.body
+        else:
+            assignments = [command]
+        for assignment in assignments:
+            label = assignment.lhs if isinstance(assignment.rhs, parser.Input) else "input"
+            result.extend((node, label) for node in _inputs_of(assignment.rhs))
+    result.extend((node, "input") for node in _inputs_of(program.postCondition))
+    return result
+
+
+# walks the parsed program, returns the final variables and whether the assert holds
+def execute(program: parser.Program, inputs: Sequence[int]) -> Tuple[Dict[str, int], bool]:
+    slots = {id(node): index for index, (node, _) in enumerate(input_slots(program))}
+    env: Dict[str, int] = {}
+
+    def value(v) -> int:
+        if isinstance(v, parser.Input):
+            return inputs[slots[id(v)]]
+        if isinstance(v, parser.Constant):
+            return v
+        return env[v]
+
+    def expression(e) -> int:
+        if isinstance(e, parser.Expr):
+            return OPERATIONS[e.op](value(e.l), value(e.r))
+        return value(e)
+
+    def condition(c: parser.Comp) -> bool:
+        return COMPARISONS[c.op](value(c.l), value(c.r))
+
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            if condition(command.condition):
+                for assignment in command.body:
+                    env[assignment.lhs] = expression(assignment.rhs)
+        else:
+            env[command.lhs] = expression(command.rhs)
+    return env, condition(program.postCondition)
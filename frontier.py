@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import math
+import pickle
+import tempfile
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import intset
+import main
+import parser.parser as parser
+
+'''
+Best-first path exploration with a bounded frontier.
+
+A state runs until its next if splits it, then both halves go back to the frontier, a priority
+queue ranked by how close the assert is to failing in the state: the bounds of "left - right" of
+the postCondition over the ranges of the input values (path constraints are ignored) give the
+distance to the nearest violating value, 0 if one is within the bounds. Ties go to the state that
+got further in the program. The first finished path where the assert can be false decides the
+program, so programs with a failing assert are usually decided long before every path is seen.
+
+At most max_live states are kept in memory. When the frontier grows beyond that, its worse half
+is pickled as one batch to a temporary file - flattened scopes, the bounds of the input values
+and the path constraints, plain tuples whose shared parts pickle only once - and a batch is
+loaded back when its best state is better than every state in memory.
+
+Every path has a share of the execution tree (each split halves it). With a path budget, the
+exploration stops after that many finished paths and the program is "unknown", with the share
+of the tree that was explored (finished or cut off as unreachable).
+'''
+
+MAX_LIVE = 4096
+
+Priority = Tuple[float, int, int]
+# (priority, index of the next command, share of the tree, state)
+Entry = Tuple[Priority, int, float, main.State]
+
+
+# how far "left - right" of cond is from a value for which cond doesn't hold, inf if unknown
+def distance(cond: parser.Comp, state: main.State) -> float:
+    try:
+        terms, constant = main.condition_difference(cond, state)
+    except (KeyError, AssertionError):
+        # a variable of the assert isn't assigned yet
+        return math.inf
+    low = high = constant
+    for name, times in terms.items():
+        value_low, value_high = state.value_range(name)
+        bounds = (times * value_low, times * value_high)
+        low += min(bounds)
+        high += max(bounds)
+    if cond.op == "<":
+        return max(0, -high)
+    if cond.op == "<=":
+        return max(0, 1 - high)
+    if cond.op == ">":
+        return max(0, low)
+    if cond.op == ">=":
+        return max(0, low + 1)
+    if cond.op == "==":
+        return 1 if low == high == 0 else 0
+    return 0 if low <= 0 <= high else min(abs(low), abs(high))
+
+
+def snapshot(state: main.State) -> Tuple:
+    return ({name: (variable.terms, variable.constant) for name, variable in state.variables.items()},
+            {name: (value.values.lows, value.values.highs) for name, value in state.values.items()},
+            state.path_constraints(), state.valid, state.feasible)
+
+
+def restore(data: Tuple) -> main.State:
+    variables, values, path, valid, feasible = data
+    state = main.State()
+    state.variables = main.Scope(None, {name: main.Variable(terms, constant)
+                                        for name, (terms, constant) in variables.items()})
+    state.values = main.Scope(None, {name: main.Input_value(name, intset.IntervalSet(lows, highs))
+                                     for name, (lows, highs) in values.items()})
+    for constraint in reversed(path):
+        state.path = (constraint, state.path)
+    state.valid = valid
+    state.feasible = feasible
+    return state
+
+
+class Frontier:
+    def __init__(self, max_live: int = MAX_LIVE) -> None:
+        self.max_live = max(2, max_live)
+        self.heap: List[Entry] = []
+        # (best priority of the batch, offset, size in bytes, number of states)
+        self.batches: List[Tuple[Priority, int, int, int]] = []
+        self.file: Optional[IO[bytes]] = None
+        self.size = 0
+        self.spilled = 0
+        self.reloaded = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self, entry: Entry) -> None:
+        heapq.heappush(self.heap, entry)
+        self.size += 1
+        if len(self.heap) > self.max_live:
+            self._spill()
+
+    def pop(self) -> Entry:
+        if self.batches and (not self.heap or self.batches[0][0] < self.heap[0][0]):
+            self._reload()
+        self.size -= 1
+        return heapq.heappop(self.heap)
+
+    def _spill(self) -> None:
+        entries = sorted(self.heap)
+        keep = self.max_live // 2
+        # a sorted list is a heap
+        self.heap = entries[:keep]
+        worse = entries[keep:]
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix="frontier-")
+        data = pickle.dumps([(priority, index, share, snapshot(state)) for priority, index, share, state in worse],
+                            pickle.HIGHEST_PROTOCOL)
+        offset = self.file.seek(0, 2)
+        self.file.write(data)
+        heapq.heappush(self.batches, (worse[0][0], offset, len(data), len(worse)))
+        self.spilled += len(worse)
+
+    def _reload(self) -> None:
+        _, offset, size, count = heapq.heappop(self.batches)
+        self.file.seek(offset)
+        for priority, index, share, data in pickle.loads(self.file.read(size)):
+            heapq.heappush(self.heap, (priority, index, share, restore(data)))
+        self.reloaded += count
+        if len(self.heap) > self.max_live:
+            self._spill()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def best_first_check(parsed: parser.Program, max_live: int = MAX_LIVE, path_budget: int = 0,
+                     details: Optional[Dict[str, Any]] = None) -> bool:
+    """True if the assert can be false; raises AssertionError when path_budget (0 = none) finished
+    paths didn't decide it."""
+    details = {} if details is None else details
+    commands = parsed.commands
+    cond = parsed.postCondition
+    counter = itertools.count()
+    frontier = Frontier(max_live)
+    state = main.State()
+    frontier.push(((distance(cond, state), 0, next(counter)), 0, 1.0, state))
+    paths = 0
+    explored = 0.0
+    try:
+        while len(frontier):
+            if path_budget and paths >= path_budget:
+                raise AssertionError(f"Path budget of {path_budget} paths exhausted, "
+                                     f"{explored:.1%} of the paths explored")
+            _, index, share, state = frontier.pop()
+            while index < len(commands) and state.is_valid():
+                new_state = main.eval_command(commands[index], state)
+                index += 1
+                if new_state is not None:
+                    share /= 2
+                    for split in (new_state, state):
+                        frontier.push(((distance(cond, split), -index, next(counter)), index, share, split))
+                    break
+            else:
+                explored += share
+                if state.is_valid():
+                    paths += 1
+                    if main.can_be_false(cond, state):
+                        return True
+        return False
+    finally:
+        details["paths"] = paths
+        details["spilled"] = frontier.spilled
+        frontier.close()
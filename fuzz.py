@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+import compiler
+import concrete
+import parser.parser as parser
+import slicing
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Vectorized random testing: finds inputs for which the assert fails.
+
+The program is run on a whole batch of input vectors at once with NumPy - every assignment is
+one elementwise operation on arrays, every if computes a mask and updates the assigned variables
+with np.where. Values are drawn around the constants used in the program (where the behaviour of
+conditions changes) and uniformly from a wider range. Lanes where the assert fails are checked
+again with exact integers by the compiled program (compiler.py) (int64 can overflow), so a reported witness is
+always real. Works for x * x too. A program that may read a variable before it is assigned is
+skipped (reads_unassigned): NumPy has no value for it in some lanes, while the compiled program
+fails on it.
+
+Needs NumPy, find_witness returns None when it isn't installed.
+'''
+
+BATCH_SIZE = 1_000_000
+# lanes with a failing assert that are checked with exact integers
+MAX_CANDIDATES = 16
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _constants(node, result: Set[int]) -> None:
+    if isinstance(node, (parser.Expr, parser.Comp)):
+        _constants(node.l, result)
+        _constants(node.r, result)
+    elif isinstance(node, parser.Constant):
+        result.add(node)
+
+
+def program_constants(program: parser.Program) -> Set[int]:
+    result: Set[int] = set()
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            _constants(command.condition, result)
+            for assignment in command.body:
+                _constants(assignment.rhs, result)
+        else:
+            _constants(command.rhs, result)
+    _constants(program.postCondition, result)
+    return result
+
+
+# values next to every constant (and its negation), where conditions switch
+def boundary_values(program: parser.Program) -> "np.ndarray":
+    values = {-2, -1, 0, 1, 2}
+    for constant in program_constants(program):
+        for base in (constant, -constant):
+            values.update(base + delta for delta in range(-2, 3))
+    return np.array(sorted(values), dtype=np.int64)
+
+
+def sample(program: parser.Program, slots: int, size: int, rng: "np.random.Generator") -> "np.ndarray":
+    boundary = boundary_values(program)
+    limit = max(int(abs(boundary).max()) * 2, 16)
+    uniform = rng.integers(-limit, limit + 1, size=(slots, size), dtype=np.int64)
+    picked = boundary[rng.integers(0, len(boundary), size=(slots, size))]
+    return np.where(rng.random((slots, size)) < 0.5, picked, uniform)
+
+
+# whether a variable may be read before it is assigned, e.g. one assigned only in the body of an if
+def reads_unassigned(program: parser.Program) -> bool:
+    assigned: Set[str] = set()
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            if slicing.value_uses(command.condition) - assigned:
+                return True
+            body_assigned = set(assigned)
+            for assignment in command.body:
+                if slicing.value_uses(assignment.rhs) - body_assigned:
+                    return True
+                body_assigned.add(assignment.lhs)
+        else:
+            if slicing.value_uses(command.rhs) - assigned:
+                return True
+            assigned.add(command.lhs)
+    return bool(slicing.value_uses(program.postCondition) - assigned)
+
+
+# whether the assert holds in every lane, for a program that doesn't read unassigned variables
+def evaluate(program: parser.Program, inputs: "np.ndarray") -> "np.ndarray":
+    slots = {id(node): index for index, (node, _) in enumerate(concrete.input_slots(program))}
+    size = inputs.shape[1]
+    env: Dict[str, "np.ndarray"] = {}
+
+    def value(v, env: Dict[str, "np.ndarray"]):
+        if isinstance(v, parser.Input):
+            return inputs[slots[id(v)]]
+        if isinstance(v, parser.Constant):
+            return np.int64(v)
+        return env[v]
+
+    def expression(e, env: Dict[str, "np.ndarray"]):
+        if isinstance(e, parser.Expr):
+            return concrete.OPERATIONS[e.op](value(e.l, env), value(e.r, env))
+        return value(e, env)
+
+    def condition(c: parser.Comp, env: Dict[str, "np.ndarray"]) -> "np.ndarray":
+        return np.broadcast_to(concrete.COMPARISONS[c.op](value(c.l, env), value(c.r, env)), (size,))
+
+    with np.errstate(over="ignore"):
+        for command in program.commands:
+            if isinstance(command, parser.If):
+                mask = condition(command.condition, env)
+                if not mask.any():
+                    continue
+                body_env = dict(env)
+                for assignment in command.body:
+                    body_env[assignment.lhs] = expression(assignment.rhs, body_env)
+                for name in {assignment.lhs for assignment in command.body}:
+                    # 0 in the lanes where it stays unassigned, it isn't read there
+                    env[name] = np.where(mask, body_env[name], env.get(name, np.int64(0)))
+            else:
+                env[command.lhs] = expression(command.rhs, env)
+        return condition(program.postCondition, env)
+
+
+# input values (label, value) for which the assert fails, None if none was found
+def find_witness(program: parser.Program, samples: int = BATCH_SIZE, seed: int = 0) -> Optional[List[Tuple[str, int]]]:
+    if np is None or reads_unassigned(program):
+        return None
+    labels = [label for _, label in concrete.input_slots(program)]
+    rng = np.random.default_rng(seed)
+    inputs = sample(program, len(labels), samples, rng)
+    holds = evaluate(program, inputs)
+    run = compiler.compile_program(program)
+    for lane in np.flatnonzero(~holds)[:MAX_CANDIDATES]:
+        values = [int(v) for v in inputs[:, lane]]
+        if not run(values)[1]:
+            return list(zip(labels, values))
+    return None
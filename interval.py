@@ -0,0 +1,173 @@
+import math
+from typing import Dict, Optional
+
+import parser.parser as parser
+
+'''
+Interval analysis of a whole program without splitting it into paths.
+
+Every variable gets an interval of values it can have. At an if, the condition narrows the
+intervals for the body (and its negation for the other branch) and both outcomes are joined
+afterwards. The result over-approximates every execution, so it can prove the postCondition,
+and when the postCondition only depends on single values (no input involved) it can also
+show that it fails.
+'''
+
+
+class Interval:
+    def __init__(self, lo: float = -math.inf, hi: float = math.inf) -> None:
+        self.lo = lo
+        self.hi = hi
+
+    def is_empty(self) -> bool:
+        return self.lo > self.hi
+
+    def is_constant(self) -> bool:
+        return self.lo == self.hi
+
+    def join(self, other: "Interval") -> "Interval":
+        return Interval(min(self.lo, other.lo), max(self.hi, other.hi))
+
+    def meet(self, other: "Interval") -> "Interval":
+        return Interval(max(self.lo, other.lo), min(self.hi, other.hi))
+
+    def __add__(self, other: "Interval") -> "Interval":
+        return Interval(self.lo + other.lo, self.hi + other.hi)
+
+    def __sub__(self, other: "Interval") -> "Interval":
+        return Interval(self.lo - other.hi, self.hi - other.lo)
+
+    def __mul__(self, other: "Interval") -> "Interval":
+        products = [_times(a, b) for a in (self.lo, self.hi) for b in (other.lo, other.hi)]
+        return Interval(min(products), max(products))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Interval) and self.lo == other.lo and self.hi == other.hi
+
+    def __str__(self) -> str:
+        return f"[{self.lo}, {self.hi}]"
+
+
+# 0 * inf is 0 here - bounds are limits of integers, not real infinities
+def _times(a: float, b: float) -> float:
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+Env = Dict[parser.Var, Interval]
+
+NEGATED = {"==": "!=", "!=": "==", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}
+SWAPPED = {"==": "==", "!=": "!=", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+def eval_value(value: parser.Value, env: Env) -> Interval:
+    if isinstance(value, parser.Constant):
+        return Interval(value, value)
+    if isinstance(value, parser.Var):
+        return env.get(value, Interval())
+    return Interval()
+
+
+def eval_expression(expr, env: Env) -> Interval:
+    if not isinstance(expr, parser.Expr):
+        return eval_value(expr, env)
+    left = eval_value(expr.l, env)
+    right = eval_value(expr.r, env)
+    if expr.op == "+":
+        return left + right
+    if expr.op == "-":
+        if isinstance(expr.l, parser.Var) and expr.l == expr.r:
+            return Interval(0, 0)
+        return left - right
+    if isinstance(expr.l, parser.Var) and expr.l == expr.r:
+        # a square is never negative
+        square = left * right
+        return Interval(max(square.lo, 0), square.hi)
+    return left * right
+
+
+# interval of `left` values for which "left op right" can hold
+def narrow(left: Interval, op: str, right: Interval) -> Interval:
+    if op == "<":
+        return Interval(left.lo, min(left.hi, right.hi - 1))
+    if op == "<=":
+        return Interval(left.lo, min(left.hi, right.hi))
+    if op == ">":
+        return Interval(max(left.lo, right.lo + 1), left.hi)
+    if op == ">=":
+        return Interval(max(left.lo, right.lo), left.hi)
+    if op == "==":
+        return left.meet(right)
+    # !=, only an end point that equals a constant right side can be removed
+    if right.is_constant():
+        if left.lo == right.lo:
+            return Interval(left.lo + 1, left.hi)
+        if left.hi == right.lo:
+            return Interval(left.lo, left.hi - 1)
+    return left
+
+
+# environment in which cond holds, None if it can never hold
+def assume(cond: parser.Comp, op: str, env: Env) -> Optional[Env]:
+    left = eval_value(cond.l, env)
+    right = eval_value(cond.r, env)
+    new_left = narrow(left, op, right)
+    new_right = narrow(right, SWAPPED[op], left)
+    if new_left.is_empty() or new_right.is_empty():
+        return None
+    result = dict(env)
+    if isinstance(cond.l, parser.Var):
+        result[cond.l] = new_left
+    if isinstance(cond.r, parser.Var):
+        result[cond.r] = new_right if cond.l != cond.r else new_left.meet(new_right)
+    return result
+
+
+def join(left: Optional[Env], right: Optional[Env]) -> Optional[Env]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return {name: left[name].join(right[name]) for name in left.keys() & right.keys()}
+
+
+def eval_assignment(command: parser.Assignment, env: Env) -> None:
+    env[command.lhs] = eval_expression(command.rhs, env)
+
+
+def eval_command(command: parser.Command, env: Env) -> Optional[Env]:
+    if isinstance(command, parser.Assignment):
+        eval_assignment(command, env)
+        return env
+    then_env = assume(command.condition, command.condition.op, env)
+    if then_env is not None:
+        for body_command in command.body:
+            eval_assignment(body_command, then_env)
+    else_env = assume(command.condition, NEGATED[command.condition.op], env)
+    return join(then_env, else_env)
+
+
+# True if the postCondition always holds, False if it can fail, None if the intervals can't tell
+def is_always_true(cond: parser.Comp, env: Env) -> Optional[bool]:
+    if assume(cond, NEGATED[cond.op], env) is None:
+        return True
+    left = eval_value(cond.l, env)
+    right = eval_value(cond.r, env)
+    # single values are exact, every execution ends with them
+    if left.is_constant() and right.is_constant():
+        return assume(cond, cond.op, env) is not None
+    return None
+
+
+# same meaning as main.eval_file (True when the assert can be false), None if undecided
+def interval_check(parsed: parser.Program) -> Optional[bool]:
+    env: Optional[Env] = {}
+    for command in parsed.commands:
+        env = eval_command(command, env)
+        if env is None:
+            return False
+    always_true = is_always_true(parsed.postCondition, env)
+    if always_true is None:
+        return None
+    return not always_true
@@ -0,0 +1,131 @@
+import math
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Tuple
+
+'''
+Sets of integers as sorted, disjoint, non-adjacent closed intervals [lows[i], highs[i]].
+
+The bounds are kept in two parallel Python lists (not arrays: -inf / inf are allowed as the outer
+bounds and the numbers are unbounded). Membership, min / max and the emptiness test are O(1) or
+O(log n) with bisect. Intersecting with a range or removing a single point finds the affected
+intervals by bisection, but copies the lists, so a split is O(n), not O(log n). A set is never
+changed after it is created, so input values can share it between states without copying.
+'''
+
+Bound = float
+
+
+class IntervalSet:
+    __slots__ = ("lows", "highs")
+
+    def __init__(self, lows: List[Bound], highs: List[Bound]) -> None:
+        self.lows = lows
+        self.highs = highs
+
+    @classmethod
+    def range(cls, low: Bound = -math.inf, high: Bound = math.inf) -> "IntervalSet":
+        if low > high:
+            return EMPTY
+        return cls([low], [high])
+
+    @classmethod
+    def point(cls, number: int) -> "IntervalSet":
+        return cls([number], [number])
+
+    def is_empty(self) -> bool:
+        return not self.lows
+
+    def min(self) -> Bound:
+        return self.lows[0] if self.lows else math.inf
+
+    def max(self) -> Bound:
+        return self.highs[-1] if self.highs else -math.inf
+
+    def is_point(self) -> bool:
+        return len(self.lows) == 1 and self.lows[0] == self.highs[0]
+
+    def __contains__(self, number: int) -> bool:
+        index = bisect_right(self.lows, number) - 1
+        return index >= 0 and number <= self.highs[index]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IntervalSet) and self.lows == other.lows and self.highs == other.highs
+
+    def __hash__(self) -> int:
+        return hash((tuple(self.lows), tuple(self.highs)))
+
+    def __iter__(self) -> Iterator[Tuple[Bound, Bound]]:
+        return zip(self.lows, self.highs)
+
+    def __len__(self) -> int:
+        return len(self.lows)
+
+    def __repr__(self) -> str:
+        return " | ".join(f"[{low}, {high}]" for low, high in self) or "{}"
+
+    # the numbers between two intervals as (first, last)
+    def gaps(self) -> Iterator[Tuple[int, int]]:
+        for index in range(len(self.lows) - 1):
+            yield self.highs[index] + 1, self.lows[index + 1] - 1
+
+    def intersect_range(self, low: Bound, high: Bound) -> "IntervalSet":
+        # the intervals that end at or after low and start at or before high
+        start = bisect_left(self.highs, low)
+        end = bisect_right(self.lows, high)
+        if start >= end or low > high:
+            return EMPTY
+        if start == 0 and end == len(self.lows) and self.lows[0] >= low and self.highs[-1] <= high:
+            return self
+        lows = self.lows[start:end]
+        highs = self.highs[start:end]
+        lows[0] = max(lows[0], low)
+        highs[-1] = min(highs[-1], high)
+        return IntervalSet(lows, highs)
+
+    def remove(self, number: int) -> "IntervalSet":
+        index = bisect_right(self.lows, number) - 1
+        if index < 0 or number > self.highs[index]:
+            return self
+        low, high = self.lows[index], self.highs[index]
+        lows = self.lows.copy()
+        highs = self.highs.copy()
+        if low == high:
+            del lows[index], highs[index]
+        elif number == low:
+            lows[index] = number + 1
+        elif number == high:
+            highs[index] = number - 1
+        else:
+            lows.insert(index + 1, number + 1)
+            highs.insert(index, number - 1)
+        return IntervalSet(lows, highs)
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        lows: List[Bound] = []
+        highs: List[Bound] = []
+        for low, high in sorted(list(self) + list(other)):
+            # adjacent intervals are joined as well, the set holds integers
+            if lows and low <= highs[-1] + 1:
+                highs[-1] = max(highs[-1], high)
+            else:
+                lows.append(low)
+                highs.append(high)
+        return IntervalSet(lows, highs)
+
+    # the member closest to number (the smaller one on a tie), None for the empty set
+    def nearest(self, number: int):
+        if not self.lows:
+            return None
+        index = bisect_right(self.lows, number) - 1
+        if index >= 0 and number <= self.highs[index]:
+            return number
+        candidates = []
+        if index >= 0:
+            candidates.append(self.highs[index])
+        if index + 1 < len(self.lows):
+            candidates.append(self.lows[index + 1])
+        return min(candidates, key=lambda candidate: (abs(candidate - number), candidate))
+
+
+EMPTY = IntervalSet([], [])
+FULL = IntervalSet([-math.inf], [math.inf])
@@ -0,0 +1,300 @@
+import math
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+'''
+Linear integer arithmetic over input values, without external dependencies.
+
+A constraint (terms, constant, op) means  sum(coefficient * input) + constant  op  0, where op is
+one of "<=", "==", "!=". Constraints are normalized when created (strict inequalities become "<="
+on integers, coefficients are divided by their gcd and the constant is tightened), so equal
+constraints are equal tuples.
+
+Feasibility: equalities are substituted away (after a change of variables when no coefficient is +-1),
+the remaining inequalities
+are eliminated by Fourier-Motzkin and a model is built back from the eliminated levels.
+Disequalities are only split (into < and >) when the model violates them.
+If an elimination wasn't exact on integers and no integer model can be built, the answer is None.
+Results are cached per set of constraints.
+'''
+
+Terms = Tuple[Tuple[str, int], ...]
+Constraint = Tuple[Terms, int, str]
+Model = Dict[str, int]
+
+LE = "<="
+EQ = "=="
+NE = "!="
+
+# give up (answer None) when elimination produces more constraints than this
+MAX_CONSTRAINTS = 2000
+# and when disequalities need more branches than this
+MAX_BRANCHES = 64
+# values tried while building a model back after an inexact elimination
+MAX_TRIES = 256
+CACHE_SIZE = 4096
+
+
+def make(terms: Dict[str, int], constant: int, op: str) -> Union[Constraint, bool]:
+    """Normalized constraint "terms + constant op 0", or True/False if it doesn't depend on any input."""
+    if op == "<":
+        constant += 1
+    elif op == ">":
+        terms = {name: -times for name, times in terms.items()}
+        constant = 1 - constant
+    elif op == ">=":
+        terms = {name: -times for name, times in terms.items()}
+        constant = -constant
+    if op in ("<", ">", ">="):
+        op = LE
+    return _normalize(tuple(sorted((name, times) for name, times in terms.items() if times != 0)), constant, op)
+
+
+def _normalize(terms: Terms, constant: int, op: str) -> Union[Constraint, bool]:
+    if not terms:
+        if op == LE:
+            return constant <= 0
+        if op == EQ:
+            return constant == 0
+        return constant != 0
+    divisor = 0
+    for _, times in terms:
+        divisor = math.gcd(divisor, times)
+    if op == LE:
+        # sum(times / divisor * x) <= floor(-constant / divisor)
+        constant = -((-constant) // divisor)
+    else:
+        if constant % divisor != 0:
+            return op == NE
+        constant //= divisor
+        if terms[0][1] < 0:
+            divisor = -divisor
+            constant = -constant
+    if divisor != 1:
+        terms = tuple((name, times // divisor) for name, times in terms)
+    return terms, constant, op
+
+
+def negate(constraint: Constraint) -> Constraint:
+    terms, constant, op = constraint
+    if op == LE:
+        return _normalize(tuple((name, -times) for name, times in terms), 1 - constant, LE)
+    return terms, constant, NE if op == EQ else EQ
+
+
+def evaluate(constraint: Constraint, model: Model) -> int:
+    terms, constant, _ = constraint
+    return sum(times * model.get(name, 0) for name, times in terms) + constant
+
+
+def satisfies(constraint: Constraint, model: Model) -> bool:
+    value = evaluate(constraint, model)
+    op = constraint[2]
+    if op == LE:
+        return value <= 0
+    if op == EQ:
+        return value == 0
+    return value != 0
+
+
+def _substitute(constraint: Constraint, name: str, terms: Dict[str, int], constant: int) -> Union[Constraint, bool]:
+    times = dict(constraint[0]).get(name, 0)
+    if times == 0:
+        return constraint
+    result = {other: value for other, value in constraint[0] if other != name}
+    for other, value in terms.items():
+        result[other] = result.get(other, 0) + times * value
+    return _normalize(tuple(sorted((other, value) for other, value in result.items() if value != 0)),
+                      constraint[1] + times * constant, constraint[2])
+
+
+# candidate values for one level, the one closest to 0 first
+def _candidates(low: float, high: float) -> List[int]:
+    if low > high:
+        return []
+    if low <= 0 <= high:
+        first = 0
+    else:
+        first = int(low) if low > 0 else int(high)
+    result = [first]
+    for step in range(1, 4):
+        for value in (first - step, first + step):
+            if low <= value <= high:
+                result.append(value)
+    return result
+
+
+# assign levels[index:] so that every bound holds, trying other values of earlier levels when
+# a later one has no integer left (happens only when an elimination wasn't exact)
+def _assign(levels: List[Tuple[str, List[Constraint]]], index: int, model: Model, tries: List[int]) -> bool:
+    if index == len(levels):
+        return True
+    name, bounds = levels[index]
+    low, high = -math.inf, math.inf
+    for terms, constant, _ in bounds:
+        times = 0
+        rest = constant
+        for other, value in terms:
+            if other == name:
+                times = value
+            else:
+                rest += value * model.get(other, 0)
+        if times > 0:
+            high = min(high, (-rest) // times)
+        else:
+            low = max(low, -((-rest) // -times))
+    for value in _candidates(low, high):
+        tries[0] -= 1
+        if tries[0] < 0:
+            return False
+        model[name] = value
+        if _assign(levels, index + 1, model, tries):
+            return True
+    model.pop(name, None)
+    return False
+
+
+# one conjunction without disequalities, returns (feasible, model)
+def _solve(constraints: List[Constraint]) -> Tuple[Optional[bool], Optional[Model]]:
+    equalities = [c for c in constraints if c[2] == EQ]
+    inequalities = {c for c in constraints if c[2] == LE}
+
+    # x = terms + constant, in the order they were found
+    substitutions: List[Tuple[str, Dict[str, int], int]] = []
+    fresh = 0
+    while equalities:
+        equality = equalities.pop()
+        terms, constant, _ = equality
+        unit = next(((name, times) for name, times in terms if abs(times) == 1), None)
+        if unit is None:
+            # change of variables x = x' - sum(a_i // a * x_i) for the smallest coefficient a, which leaves
+            # only the remainders a_i % a as the other coefficients, until one of them is +-1 (Omega test)
+            name, times = min(terms, key=lambda term: abs(term[1]))
+            fresh += 1
+            expression = {f"#{fresh}": 1}
+            for other, value in terms:
+                if other != name:
+                    expression[other] = -(value // times)
+            shift = 0
+            equalities.append(equality)
+        else:
+            name, times = unit
+            expression = {other: -times * value for other, value in terms if other != name}
+            shift = -times * constant
+        substitutions.append((name, expression, shift))
+
+        new_equalities = []
+        for equality in equalities:
+            equality = _substitute(equality, name, expression, shift)
+            if equality is False:
+                return False, None
+            if equality is not True:
+                new_equalities.append(equality)
+        equalities = new_equalities
+        new_inequalities = set()
+        for inequality in inequalities:
+            inequality = _substitute(inequality, name, expression, shift)
+            if inequality is False:
+                return False, None
+            if inequality is not True:
+                new_inequalities.add(inequality)
+        inequalities = new_inequalities
+
+    # Fourier-Motzkin, levels[i] = (eliminated input, constraints that bounded it)
+    levels: List[Tuple[str, List[Constraint]]] = []
+    while inequalities:
+        lower: Dict[str, List[Constraint]] = {}
+        upper: Dict[str, List[Constraint]] = {}
+        for inequality in inequalities:
+            for name, times in inequality[0]:
+                (upper if times > 0 else lower).setdefault(name, []).append(inequality)
+        names = lower.keys() | upper.keys()
+        name = min(names, key=lambda n: (len(lower.get(n, [])) * len(upper.get(n, [])), n))
+        lows = lower.get(name, [])
+        highs = upper.get(name, [])
+        levels.append((name, lows + highs))
+
+        new_inequalities = {c for c in inequalities if dict(c[0]).get(name, 0) == 0}
+        for low in lows:
+            low_times = -dict(low[0])[name]
+            for high in highs:
+                high_times = dict(high[0])[name]
+                combined: Dict[str, int] = {}
+                for other, value in low[0]:
+                    combined[other] = combined.get(other, 0) + value * high_times
+                for other, value in high[0]:
+                    combined[other] = combined.get(other, 0) + value * low_times
+                result = _normalize(tuple(sorted((o, v) for o, v in combined.items() if v != 0)),
+                                    low[1] * high_times + high[1] * low_times, LE)
+                if result is False:
+                    return False, None
+                if result is not True:
+                    new_inequalities.add(result)
+        if len(new_inequalities) > MAX_CONSTRAINTS:
+            return None, None
+        inequalities = new_inequalities
+
+    # build the model back, each level only depends on inputs eliminated after it
+    model: Model = {}
+    if not _assign(list(reversed(levels)), 0, model, [MAX_TRIES]):
+        # the elimination wasn't exact and no integer solution was found
+        return None, None
+    for name, expression, constant in reversed(substitutions):
+        model[name] = sum(value * model.setdefault(other, 0) for other, value in expression.items()) + constant
+    return True, model
+
+
+def _check(constraints: FrozenSet[Constraint], branches: List[int]) -> Tuple[Optional[bool], Optional[Model]]:
+    cached = _cache.get(constraints)
+    if cached is not None:
+        _cache.move_to_end(constraints)
+        return cached
+
+    feasible, model = _solve([c for c in constraints if c[2] != NE])
+    if feasible:
+        violated = next((c for c in constraints if c[2] == NE and not satisfies(c, model)), None)
+        if violated is not None:
+            # x != 0 is x < 0 or x > 0
+            branches[0] += 1
+            if branches[0] > MAX_BRANCHES:
+                return None, None
+            rest = constraints - {violated}
+            unknown = False
+            for half in ((violated[0], violated[1], "<"), (violated[0], violated[1], ">")):
+                half = make(dict(half[0]), half[1], half[2])
+                feasible, model = _check(rest | {half}, branches)
+                if feasible:
+                    break
+                unknown = unknown or feasible is None
+            else:
+                feasible, model = (None if unknown else False), None
+
+    _cache[constraints] = (feasible, model)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return feasible, model
+
+
+_cache: "OrderedDict[FrozenSet[Constraint], Tuple[Optional[bool], Optional[Model]]]" = OrderedDict()
+
+
+def check(constraints: Iterable[Union[Constraint, bool]], hint: Optional[Model] = None) -> Tuple[Optional[bool], Optional[Model]]:
+    """(True, model) if the constraints have an integer solution, (False, None) if they don't,
+    (None, None) if it couldn't be decided. A hint (e.g. the model of a subset) is tried first."""
+    result = set()
+    for constraint in constraints:
+        if constraint is False:
+            return False, None
+        if constraint is not True:
+            result.add(constraint)
+    if hint is not None and all(satisfies(c, hint) for c in result):
+        return True, hint
+    return _check(frozenset(result), [0])
+
+
+def entails(constraints: Iterable[Union[Constraint, bool]], constraint: Union[Constraint, bool]) -> bool:
+    """True only if every solution of constraints satisfies constraint."""
+    if constraint is True:
+        return True
+    negation = True if constraint is False else negate(constraint)
+    return check(list(constraints) + [negation])[0] is False
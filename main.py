@@ -1,277 +1,471 @@
+import argparse
+import functools
 import os
+import sys
+import time
 import parser.parser as parser
+import fuzz
+import interval
+import intset
+import lia
 import math
-from typing import Dict, List, Optional
+import poly
+import slicing
+import weakref
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 '''
 Works by storing states that can happen during execution.
 New state can be created by encountering if statement - there can be 2 states created - one that satisfies the condition and one that doesn't.
-Each state has a list of Input_values and remembers what values they can have.
-Each state has a list of Variables - each consists of a constant value and a list of Input_values with their coefficient.
+Each state has a list of Input_values and remembers what values they can have (a set of intervals, intset.py),
+    so a chain of == / != on one input needs no solver and an emptied input ends the state.
+Conditions with more input values are stored in the state as linear constraints and lia.py decides
+    whether the state can still be reached and whether a condition always holds in it.
+Each state has a list of Variables - each consists of a constant value and a list of Input_values with their coefficient
+    (an immutable, interned tuple of (input value name, coefficient) pairs). x * y makes a polynomial: its terms of
+    degree 2 or more are named by interned poly.Monomials, which lia.py sees as variables of their own
+    (bounded by the ranges of their factors) and poly.check confirms a solution with real products.
+Copying a state is O(1) - both copies share the scopes written so far and only write into their own new scope.
+After every command, states that agree on all variables that can still be read and whose input ranges
+    can be joined into one set (with single missing numbers) are merged, so converging branches don't double the number of states.
+
+With depth_first, paths are explored one at a time and the postCondition is checked as soon as a path ends,
+    so only one pending state per if is kept and the first failing path ends the search.
+With best_first, frontier.py explores the paths closest to failing the assert first, keeps at most max_live
+    states in memory (the rest is spilled to a temporary file) and gives up after path_budget paths.
+
+Before that, interval.py runs an interval analysis that doesn't split paths, and when it can decide
+    the postCondition on its own, no states are created at all.
+Commands that can't change the variables of the postCondition are removed first (slicing.py).
+With partition, partition.py decides programs whose conditions each read one input by running them
+    once per region between the breakpoints of the conditions.
+With ssa, ssa.py decides the assert on one term per variable (ifs become if-then-else terms)
+    instead of creating states for paths.
+With fuzz (needs NumPy), fuzz.py then runs the program on many random inputs at once, and an input
+    for which the assert fails decides the program without symbolic execution (also for x * x).
 
 In the postCondition it goes through each state and checks whether the condition can be false in any of them.
 It decides if it can be false in the state by evaluating the postCondition and checking if it's not always true
     (pretty naively, could be improved by computing the possible range of left side and right side and comparing).
 
 Cases that don't work:
- - can't multiply variable by variable
- - some operations need specific order (x * 2 is invalid)
- - can't have if with more than one input value in condition
+ - an assert that can fail only for products outside the values poly.check tries is "Cant decide the condition"
  - does not compute range when deciding if it's always true
+    (only the interval pre-pass in interval.py does, before any paths are split)
 '''
 
 
+# the values an input can have, as an intset.IntervalSet whose gaps are single numbers
 class Input_value:
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, values: intset.IntervalSet = intset.FULL) -> None:
         self.name = name
-        self.min_val: int = -math.inf
-        self.max_val: int = math.inf
-        self.excluded = set()
+        self.values = values
+
+    @property
+    def min_val(self) -> int:
+        return self.values.min()
+
+    @property
+    def max_val(self) -> int:
+        return self.values.max()
 
     def is_constant(self) -> bool:
-        return self.min_val == self.max_val
+        return self.values.is_point()
 
     def get_constant(self) -> int:
-        return self.min_val
+        return self.values.min()
 
     def copy(self) -> "Input_value":
-        result = Input_value(self.name)
-        result.min_val = self.min_val
-        result.max_val = self.max_val
-        result.excluded = self.excluded.copy()
-        return result
+        # the set is never changed, so the copy shares it
+        return Input_value(self.name, self.values)
 
     def is_correct(self) -> bool:
-        return self.min_val <= self.max_val
+        return not self.values.is_empty()
 
 
-class Input_value_times_x:
-    def __init__(self, value: Input_value, times: int = 1) -> None:
-        self.value = value
-        self.name = value.name
-        self.times = times
-
-    def copy(self, values: Dict[str, Input_value]) -> "Input_value_times_x":
-        result = Input_value_times_x(values[self.value.name], self.times)
-        result.name = self.name
-        return result
+Terms = Tuple[Tuple[str, int], ...]
 
 
+# Value of a variable: constant + sum(times * input value), terms sorted by the name of the input value.
+# Variables are immutable and interned, so equal variables are the same object and can be compared by identity.
 class Variable:
-    def __init__(self, name: str = "") -> None:
-        self.name = name
-        self.value = 0
-        self.values: Dict[str, Input_value_times_x] = {}
-
-    def eval(self) -> Dict[str, int]:
-        result = {"constant": self.value}
-        for key, value in self.values.items():
-            if value.value.is_constant():
-                result["constant"] += value.value.get_constant() * value.times
-            else:
-                result[key] = value.times
+    __slots__ = ("terms", "constant", "__weakref__")
+    _table: "weakref.WeakValueDictionary[Tuple[Terms, int], Variable]" = weakref.WeakValueDictionary()
+
+    def __new__(cls, terms: Terms = (), constant: int = 0) -> "Variable":
+        key = (terms, constant)
+        result = cls._table.get(key)
+        if result is None:
+            result = object.__new__(cls)
+            result.terms = terms
+            result.constant = constant
+            cls._table[key] = result
         return result
 
-    def copy(self, values: Dict[str, Input_value]) -> "Variable":
-        result = Variable()
-        result.value = self.value
-        result.values = {name: value.copy(values) for name, value in self.values.items()}
+    @classmethod
+    def input(cls, name: str) -> "Variable":
+        return cls(((name, 1),), 0)
+
+    # self + times * other, merging the sorted terms
+    def combine(self, other: "Variable", times: int) -> "Variable":
+        left, right = self.terms, other.terms
+        terms = []
+        i = j = 0
+        while i < len(left) and j < len(right):
+            if left[i][0] < right[j][0]:
+                terms.append(left[i])
+                i += 1
+            elif left[i][0] > right[j][0]:
+                terms.append((right[j][0], right[j][1] * times))
+                j += 1
+            else:
+                total = left[i][1] + right[j][1] * times
+                if total != 0:
+                    terms.append((left[i][0], total))
+                i += 1
+                j += 1
+        terms.extend(left[i:])
+        terms.extend((name, value * times) for name, value in right[j:])
+        return Variable(tuple(terms), self.constant + other.constant * times)
+
+    def __add__(self, other: "Variable") -> "Variable":
+        return self.combine(other, 1)
+
+    def __sub__(self, other: "Variable") -> "Variable":
+        return self.combine(other, -1)
+
+    def scale(self, times: int) -> "Variable":
+        if times == 0:
+            return Variable()
+        return Variable(tuple((name, value * times) for name, value in self.terms), self.constant * times)
+
+    def multiply(self, other: "Variable") -> "Variable":
+        if self.is_constant():
+            return other.scale(self.constant)
+        if other.is_constant():
+            return self.scale(other.constant)
+        return _product(self, other)
+
+    def is_constant(self) -> bool:
+        return not self.terms
+
+    # ({input value or monomial: times}, constant) with the input values that are constant in the state folded in
+    def fold(self, state: "State") -> Tuple[Dict[str, int], int]:
+        terms: Dict[str, int] = {}
+        constant = self.constant
+        for name, times in self.terms:
+            exponents = {}
+            for factor, exponent in poly.factors(name):
+                input_value = state.values[factor]
+                if input_value.is_constant():
+                    times *= input_value.get_constant() ** exponent
+                else:
+                    exponents[factor] = exponent
+            name = poly.of(exponents)
+            if name is None:
+                constant += times
+            elif times != 0:
+                terms[name] = terms.get(name, 0) + times
+        return {name: times for name, times in terms.items() if times != 0}, constant
+
+
+# the product of two polynomials, Variables are interned, so equal products are computed once
+@functools.lru_cache(maxsize=4096)
+def _product(left: Variable, right: Variable) -> Variable:
+    terms: Dict[str, int] = {}
+    for name, times in left.terms:
+        for other, other_times in right.terms:
+            monomial = poly.product(name, other)
+            terms[monomial] = terms.get(monomial, 0) + times * other_times
+        terms[name] = terms.get(name, 0) + times * right.constant
+    for other, other_times in right.terms:
+        terms[other] = terms.get(other, 0) + left.constant * other_times
+    return Variable(tuple(sorted((name, times) for name, times in terms.items() if times != 0)),
+                    left.constant * right.constant)
+
+
+# flatten the chain of scopes once it gets this long, so lookups stay cheap
+MAX_SCOPE_DEPTH = 16
+
+_missing = object()
+
+
+# Persistent map - reads fall through to the parent scopes, writes go only to the local dict.
+# Only the newest scope of a chain is written to, the parents are shared and never change.
+class Scope:
+    __slots__ = ("parent", "local", "depth")
+
+    def __init__(self, parent: Optional["Scope"] = None, local: Optional[dict] = None) -> None:
+        self.parent = parent
+        self.local = {} if local is None else local
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def get(self, key, default=None):
+        scope = self
+        while scope is not None:
+            value = scope.local.get(key, _missing)
+            if value is not _missing:
+                return value
+            scope = scope.parent
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self.local[key] = value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _missing) is not _missing
+
+    def flatten(self) -> dict:
+        if self.parent is None:
+            return self.local
+        result = dict(self.parent.flatten())
+        result.update(self.local)
         return result
 
-    def number_of_input_values(self) -> int:
-        sum = 0
-        for _, value_times_x in self.values.items():
-            if value_times_x.times != 0:
-                sum += 1
-        return sum
+    def keys(self):
+        return self.flatten().keys()
 
+    def values(self):
+        return self.flatten().values()
 
-# Return True only if they are exactly same
-def compare_variable_equals(left: Dict[str, int], right: Dict[str, int]) -> bool:
-    if left["constant"] != right["constant"]:
-        return False
-    for key in (list(left.keys()) + list(right.keys())):
-        if left.get(key, None) != right.get(key, None):
-            return False
-    return True
+    def items(self):
+        return self.flatten().items()
+
+    def __len__(self) -> int:
+        return len(self.flatten())
+
+    # two independent scopes with the current content, self must not be written to afterwards
+    def fork(self) -> Tuple["Scope", "Scope"]:
+        if not self.local and self.parent is not None:
+            return self, Scope(self.parent)
+        base = self
+        if self.depth >= MAX_SCOPE_DEPTH:
+            base = Scope(None, self.flatten())
+        return Scope(base), Scope(base)
 
 
 class State:
     def __init__(self) -> None:
-        self.variables: Dict[str, Variable] = {}
-        self.values: Dict[str, Input_value] = {}
-
+        self.variables: Scope = Scope()
+        self.values: Scope = Scope()
+        self.valid = True
+        # conditions over more input values, as a linked list (constraint, rest) shared with copies
+        self.path: Optional[Tuple] = None
+        # None when the path constraints have to be checked again, model of the last check
+        self.feasible: Optional[bool] = True
+        self.model: Optional[lia.Model] = None
+
+    # O(1), both states share everything written so far
     def copy(self) -> "State":
         result = State()
-        result.values = {name: value.copy() for name, value in self.values.items()}
-        result.variables = {name: variable.copy(result.values) for name, variable in self.variables.items()}
+        self.variables, result.variables = self.variables.fork()
+        self.values, result.values = self.values.fork()
+        result.valid = self.valid
+        result.path = self.path
+        result.feasible = self.feasible
+        result.model = self.model
+        return result
+
+    # Input_values can be shared by several states, so they are replaced instead of changed
+    def set_value(self, value: Input_value) -> None:
+        self.values[value.name] = value
+        if not value.is_correct():
+            self.valid = False
+        if self.path is not None:
+            self.feasible = None
+
+    def add_constraint(self, constraint) -> None:
+        if constraint is False:
+            self.valid = False
+        elif constraint is not True:
+            self.path = (constraint, self.path)
+            self.feasible = None
+
+    def path_constraints(self) -> List[lia.Constraint]:
+        result = []
+        node = self.path
+        while node is not None:
+            result.append(node[0])
+            node = node[1]
         return result
 
+    # (min, max) of an input value or a monomial (from the ranges of its factors)
+    def value_range(self, name: str) -> Tuple[float, float]:
+        if isinstance(name, poly.Monomial):
+            return poly.bounds(name, self.value_range)
+        value = self.values[name]
+        return value.min_val, value.max_val
+
+    # path constraints and the ranges of all input values they (or `names`) use,
+    # a monomial is bounded by the ranges of its factors, which are used as well
+    def constraints(self, names: Iterable[str] = ()) -> List:
+        result = self.path_constraints()
+        used = set(names)
+        for terms, _, _ in result:
+            used.update(name for name, _ in terms)
+        for monomial in [name for name in used if isinstance(name, poly.Monomial)]:
+            used.discard(monomial)
+            used.update(poly.inputs(monomial))
+            low, high = self.value_range(monomial)
+            if low != -math.inf:
+                result.append(lia.make({monomial: -1}, low, lia.LE))
+            if high != math.inf:
+                result.append(lia.make({monomial: 1}, -high, lia.LE))
+        for name in used:
+            value = self.values[name]
+            if value.min_val != -math.inf:
+                result.append(lia.make({name: -1}, value.min_val, lia.LE))
+            if value.max_val != math.inf:
+                result.append(lia.make({name: 1}, -value.max_val, lia.LE))
+            for number, _ in value.values.gaps():
+                result.append(lia.make({name: 1}, -number, lia.NE))
+        return result
+
+    # states that can't be reached are invalid, if the solver can't tell, the state is kept
     def is_valid(self) -> bool:
-        for value in self.values.values():
-            if not value.is_correct():
-                return False
-        return True
+        if not self.valid:
+            return False
+        if self.feasible is None:
+            self.feasible, model = lia.check(self.constraints(), self.model)
+            if model is not None:
+                self.model = model
+        return self.feasible is not False
 
 
 def eval_value(value: parser.Value, state: State, new_name="") -> Variable:
-    var = Variable()
     if isinstance(value, parser.Constant):
-        var.value = value
-    elif isinstance(value, parser.Input):
-        new_val = Input_value(new_name)
-        state.values[new_name] = new_val
-        var.values[new_name] = Input_value_times_x(new_val)
-    elif isinstance(value, parser.Var):
-        var.value = state.variables[value].value
-        var.values = state.variables[value].values
-    return var
+        return Variable((), value)
+    if isinstance(value, parser.Input):
+        # every call of input() gets its own name
+        while new_name in state.values:
+            new_name += "'"
+        state.set_value(Input_value(new_name))
+        return Variable.input(new_name)
+    return state.variables[value]
+
+
+OPERATIONS = {
+    "==": lambda left, right: left == right,
+    "!=": lambda left, right: left != right,
+    "<": lambda left, right: left < right,
+    "<=": lambda left, right: left <= right,
+    ">": lambda left, right: left > right,
+    ">=": lambda left, right: left >= right,
+}
+
+
+# left - right of the condition as ({input value: coefficient}, constant), constant input values are folded in
+def condition_difference(cond: parser.Comp, state: State) -> Tuple[Dict[str, int], int]:
+    terms: Dict[str, int] = {}
+    constant = 0
+    for value, sign in ((cond.l, 1), (cond.r, -1)):
+        if isinstance(value, parser.Constant):
+            constant += sign * value
+        elif isinstance(value, parser.Var):
+            folded, folded_constant = state.variables[value].fold(state)
+            constant += sign * folded_constant
+            for name, times in folded.items():
+                terms[name] = terms.get(name, 0) + sign * times
+        else:
+            raise AssertionError("Cant compare")
+    return {name: times for name, times in terms.items() if times != 0}, constant
+
+
+# is "times * value + constant op 0" true for every value the input can have
+def range_always_true(value: Input_value, times: int, constant: int, op: str) -> bool:
+    return restrict(value, times, constant, interval.NEGATED[op]) is None
+
+
+# can the condition be false in this state, None if the solver can't tell
+def can_be_negated(cond: parser.Comp, state: State) -> Optional[bool]:
+    terms, constant = condition_difference(cond, state)
+    negation = lia.make(terms, constant, interval.NEGATED[cond.op])
+    if negation is False:
+        return False
+    if negation is True and not poly.is_nonlinear(state.path_constraints()):
+        return True
+    if len(terms) == 1 and state.path is None and not isinstance(next(iter(terms)), poly.Monomial):
+        name, times = next(iter(terms.items()))
+        value = state.values[name]
+        # the set of values is exact, so no solver is needed
+        return not range_always_true(value, times, constant, cond.op)
+    constraints = state.constraints(terms) + ([] if negation is True else [negation])
+    result, model = lia.check(constraints, state.model)
+    if result and poly.is_nonlinear(constraints):
+        # lia solved the relaxation, its monomials may not be the products of its input values
+        return poly.check(constraints, state.value_range, model)
+    return result
 
 
 def is_always_true(cond: parser.Comp, state: State) -> bool:
-    left = state.variables[cond.l]
-    left_eval = left.eval()
-    right = cond.r
-    if not isinstance(cond.l, parser.Var):
-        raise AssertionError("Cant compare")
+    return can_be_negated(cond, state) is False
 
-    right_eval = {"constant": right}
-    if isinstance(right, parser.Var):
-        right_eval = state.variables[right].eval()
 
-    if len(left_eval.keys()) == 2:
-        the_only_variable = list(left.values.values())[0]
+def can_be_false(cond: parser.Comp, state: State) -> bool:
+    result = can_be_negated(cond, state)
+    if result is None:
+        raise AssertionError("Cant decide the condition")
+    return result
 
-    if cond.op == "==":
-        if compare_variable_equals(left_eval, right_eval):
-            return True
-    elif cond.op == "!=":
-        if left_eval["constant"] != right_eval["constant"]:
-            if len(left_eval.keys()) == 1 and len(right_eval.keys()) == 1:
-                return True
-    elif cond.op == ">":
-        if len(left_eval.keys()) == 1 and len(right_eval.keys()) == 1:
-            return left_eval["constant"] > right_eval["constant"]
-        if len(left_eval.keys()) == 2 and len(right_eval.keys()) == 1:
-            return the_only_variable.value.min_val * the_only_variable.times > right_eval["constant"] - left_eval["constant"]
-    elif cond.op == ">=":
-        if compare_variable_equals(left_eval, right_eval):
-            return True
-        if len(left_eval.keys()) == 1 and len(right_eval.keys()) == 1:
-            return left_eval["constant"] >= right_eval["constant"]
-        if len(left_eval.keys()) == 2 and len(right_eval.keys()) == 1:
-            return the_only_variable.value.min_val * the_only_variable.times >= right_eval["constant"] - left_eval["constant"]
-    elif cond.op == "<":
-        if len(left_eval.keys()) == 1 and len(right_eval.keys()) == 1:
-            return left_eval["constant"] < right_eval["constant"]
-        if len(left_eval.keys()) == 2 and len(right_eval.keys()) == 1:
-            return the_only_variable.value.max_val * the_only_variable.times < right_eval["constant"] - left_eval["constant"]
-    elif cond.op == "<=":
-        if compare_variable_equals(left_eval, right_eval):
-            return True
-        if len(left_eval.keys()) == 1 and len(right_eval.keys()) == 1:
-            return left_eval["constant"] <= right_eval["constant"]
-        if len(left_eval.keys()) == 2 and len(right_eval.keys()) == 1:
-            return the_only_variable.value.max_val * the_only_variable.times <= right_eval["constant"] - left_eval["constant"]
-    return False
+
+# the values for which "times * value + constant op 0" holds, None if there are none
+def restrict(value: Input_value, times: int, constant: int, op: str) -> Optional[Input_value]:
+    bound = -constant
+    if times < 0:
+        times, bound, op = -times, constant, interval.SWAPPED[op]
+    # times * value op bound, times > 0
+    values = value.values
+    if op == "==" or op == "!=":
+        if bound % times != 0:
+            return value if op == "!=" else None
+        point = bound // times
+        if op == "==":
+            values = values.intersect_range(point, point)
+        else:
+            values = values.remove(point)
+    elif op == "<":
+        values = values.intersect_range(-math.inf, -((-bound) // times) - 1)
+    elif op == "<=":
+        values = values.intersect_range(-math.inf, bound // times)
+    elif op == ">":
+        values = values.intersect_range(bound // times + 1, math.inf)
+    elif op == ">=":
+        values = values.intersect_range(-((-bound) // times), math.inf)
+    if values.is_empty():
+        return None
+    return Input_value(value.name, values)
 
 
 # make 2 states from state and cond -> 2 possible outcomes
-# returns False if cant do it, True if can be done
+# state is changed to satisfy cond, original to not satisfy it
+# returns False if state can't satisfy cond
 def split_by_cond(cond: parser.Comp, state: State, original: State) -> bool:
-    # only support a < constant
-    if not isinstance(cond.l, parser.Var):
-        raise AssertionError("Unsupported if condition #1")
-    left = state.variables[cond.l]
-    left_original = original.variables[cond.l]
-    right = cond.r
-
-    right_value = cond.r
-    right_values = {}
-    if isinstance(right, parser.Var):
-        right_value = state.variables[cond.r].value
-        right_values = state.variables[cond.r].values
-
-    # if theres only one input value on the left var
-    if left.number_of_input_values() == 1:
-        value_with_x = list(left.values.values())[0]
-        original_value_with_x = list(left_original.values.values())[0]
-        # input values to be changed to split by condition
-        # new value satisfies if condition, original value are all other values
-        new_input_value = value_with_x.value
-        original_input_value = original_value_with_x.value
-
-    if right_values != {} or len(left.values) > 1:
-        raise AssertionError("Unsupported if condition #2")
-    if cond.op == "==":
-        if left.values == {}:
-            return left.value == right_value
-        if len(left.values) == 1:
-            should_be = right_value // value_with_x.times
-            new_input_value.min_val = should_be
-            new_input_value.max_val = should_be
-            original_input_value.excluded.add(should_be)
-    elif cond.op == "!=":
-        if left.values == {}:
-            return left.value != right_value
-        if len(left.values) == 1:
-            should_be = right_value // value_with_x.times
-            new_input_value.excluded.add(should_be)
-            original_input_value.min_val = should_be
-            original_input_value.max_val = should_be
-    elif cond.op == ">" or cond.op == ">=":
-        with_equal = cond.op == ">="
-        if left.values == {}:
-            if with_equal:
-                return left.value >= right_value
-            return left.value > right_value
-        if len(left.values) == 1:
-            should_be = right_value // value_with_x.times
-
-            # choose direction in which it remains true to set bounds
-            if (should_be + 1) * value_with_x.times > right_value:
-                new_bound = should_be + 1
-                if with_equal:
-                    new_bound -= 1
-                # if it moved to bound to the wrong direction, it can never be true
-                if new_bound < new_input_value.min_val:
-                    return False
-                new_input_value.min_val = new_bound
-                original_input_value.max_val = new_bound - 1
-            else:
-                new_bound = should_be - 1
-                if with_equal:
-                    new_bound += 1
-                if new_bound > new_input_value.max_val:
-                    return False
-                new_input_value.max_val = new_bound
-                original_input_value.min_val = new_bound + 1
-
-    elif cond.op == "<" or cond.op == "<=":
-        with_equal = cond.op == "<="
-        if left.values == {}:
-            if with_equal:
-                return left.value <= right_value
-            return left.value < right_value
-        if len(left.values) == 1:
-            should_be = right_value // value_with_x.times
-
-            if (should_be + 1) * value_with_x.times < right_value:
-                new_bound = should_be + 1
-                if with_equal:
-                    new_bound -= 1
-                if new_bound < new_input_value.min_val:
-                    return False
-                new_input_value.min_val = new_bound
-                original_input_value.max_val = new_bound - 1
-            else:
-                new_bound = should_be - 1
-                if with_equal:
-                    new_bound += 1
-                if new_bound > new_input_value.max_val:
-                    return False
-                new_input_value.max_val = new_bound
-                original_input_value.min_val = new_bound + 1
+    terms, constant = condition_difference(cond, state)
+    if not terms:
+        return OPERATIONS[cond.op](constant, 0)
+
+    # one input value - only its range changes
+    if len(terms) == 1 and not isinstance(next(iter(terms)), poly.Monomial):
+        name, times = next(iter(terms.items()))
+        satisfying = restrict(state.values[name], times, constant, cond.op)
+        if satisfying is None:
+            return False
+        other = restrict(original.values[name], times, constant, interval.NEGATED[cond.op])
+        state.set_value(satisfying)
+        if other is None:
+            original.valid = False
+        else:
+            original.set_value(other)
+        return True
+
+    state.add_constraint(lia.make(terms, constant, cond.op))
+    original.add_constraint(lia.make(terms, constant, interval.NEGATED[cond.op]))
     return True
 
 
@@ -281,7 +475,7 @@ def eval_if(command: parser.If, state: State) -> Optional[State]:
     if not always_true:
         new_state = state.copy()
         result = split_by_cond(command.condition, new_state, state)
-        if not result or not state.is_valid():
+        if not result or not new_state.is_valid():
             return None
         state = new_state
     for body_command in command.body:
@@ -290,54 +484,22 @@ def eval_if(command: parser.If, state: State) -> Optional[State]:
         return state
 
 
-def sum_variable_input_values(var1: Variable, var2: Variable, multiply_by: int, possible_variables: List[str]) -> Dict[str, Input_value_times_x]:
-    result: Dict[str, Input_value_times_x] = {}
-    for variable in possible_variables:
-        total = 0
-        value_obj = None
-        if variable in var1.values:
-            total += var1.values[variable].times
-            value_obj = var1.values[variable].value
-        if variable in var2.values:
-            total += var2.values[variable].times * multiply_by
-            value_obj = var2.values[variable].value
-        if total != 0:
-            result[variable] = Input_value_times_x(value_obj, total)
-    return result
-
-
 def eval_expression(expr: parser.Expr, state: State) -> Variable:
-    new_var = Variable()
     left_value = eval_value(expr.l, state)
     right_value = eval_value(expr.r, state)
     if expr.op == "+":
-        new_var.value = left_value.value + right_value.value
-        new_var.values = sum_variable_input_values(left_value, right_value, 1, list(state.variables.keys()))
-    elif expr.op == "-":
-        new_var.value = left_value.value - right_value.value
-        new_var.values = sum_variable_input_values(left_value, right_value, -1, list(state.variables.keys()))
-    elif expr.op == "*":
-        # Only accepts format 2 * x, not x * 2
-        if left_value.values != {}:
-            raise AssertionError("Cant multiply variable by variable")
-        new_var.value *= left_value.value
-        for key, value_times_x in right_value.values.items():
-            new_var.values[key] = Input_value_times_x(value_times_x.value, value_times_x.times * left_value.value)
-    return new_var
+        return left_value + right_value
+    if expr.op == "-":
+        return left_value - right_value
+    return left_value.multiply(right_value)
 
 
 def eval_assignment(command: parser.Assignment, state: State) -> None:
-    left = command.lhs
     right = command.rhs
-    if isinstance(right, parser.Value):
-        new_var = eval_value(right, state, left)
-    elif isinstance(right, parser.Expr):
-        new_var = eval_expression(right, state)
-    if new_var is None:
-        new_var = Variable()
-        new_var.value = 0
-    new_var.name = left
-    state.variables[left] = new_var
+    if isinstance(right, parser.Expr):
+        state.variables[command.lhs] = eval_expression(right, state)
+    else:
+        state.variables[command.lhs] = eval_value(right, state, command.lhs)
 
 
 def eval_command(command: parser.Command, state: State) -> Optional[State]:
@@ -350,32 +512,266 @@ def eval_command(command: parser.Command, state: State) -> Optional[State]:
     return None
 
 
-def eval_file(parsed: parser.Program) -> bool:
-    state = State()
-    for var in parsed.variables:
-        state.values[var] = Input_value(var)
-    states = [state]
+# live_after[i] = variables that can still be read after commands[i] is executed
+def live_variables(parsed: parser.Program) -> List[Set[str]]:
+    live = slicing.value_uses(parsed.postCondition)
+    live_after: List[Set[str]] = [set() for _ in parsed.commands]
+    for index in range(len(parsed.commands) - 1, -1, -1):
+        live_after[index] = live
+        command = parsed.commands[index]
+        if isinstance(command, parser.If):
+            # the body does not have to be executed, so it does not kill anything
+            body_live = set(live)
+            for body_command in reversed(command.body):
+                body_live = (body_live - {body_command.lhs}) | slicing.value_uses(body_command.rhs)
+            live = live | body_live | slicing.value_uses(command.condition)
+        else:
+            live = (live - {command.lhs}) | slicing.value_uses(command.rhs)
+    return live_after
+
+
+# variables are interned, so they can be compared by identity
+def state_signature(state: State, live: Set[str]) -> Tuple:
+    return tuple(sorted(((name, id(state.variables[name])) for name in live if name in state.variables)))
+
+
+def referenced_values(state: State, live: Set[str]) -> Set[str]:
+    result = set()
+    for name in live:
+        if name in state.variables:
+            for key, _ in state.variables[name].terms:
+                result.update(poly.inputs(key))
+    for terms, _, _ in state.path_constraints():
+        for name, _ in terms:
+            result.update(poly.inputs(name))
+    return result
+
+
+def same_range(left: Input_value, right: Input_value) -> bool:
+    return left.values == right.values
+
+
+# union of two sets of values if its gaps are single numbers (constraints() can describe it), otherwise None
+def join_values(left: Input_value, right: Input_value) -> Optional[Input_value]:
+    values = left.values.union(right.values)
+    if any(first != last for first, last in values.gaps()):
+        return None
+    return Input_value(left.name, values)
+
+
+# merge `state` into `into` if the union of both is exactly describable by one state
+def try_merge(into: State, state: State, live: Set[str]) -> bool:
+    if into.path is not state.path and set(into.path_constraints()) != set(state.path_constraints()):
+        return False
+    referenced = referenced_values(into, live)
+    different = [name for name in referenced if not same_range(into.values[name], state.values[name])]
+    if len(different) > 1:
+        return False
+    if len(different) == 1:
+        joined = join_values(into.values[different[0]], state.values[different[0]])
+        if joined is None:
+            return False
+        into.set_value(joined)
+    return True
+
 
-    for command in parsed.commands:
-        new_states = []
-        for state in states:
-            new_state = eval_command(command, state)
+# combine states that agree on every live variable and whose input ranges can be joined
+def merge_states(states: List[State], live: Set[str]) -> List[State]:
+    buckets: Dict[Tuple, List[State]] = {}
+    result = []
+    for state in states:
+        if not state.is_valid():
+            continue
+        bucket = buckets.setdefault(state_signature(state, live), [])
+        for other in bucket:
+            if try_merge(other, state, live):
+                break
+        else:
+            bucket.append(state)
+            result.append(state)
+    return result
+
+
+# depth-first over the if-split tree, yields every finished valid state as soon as it is reached
+# only the states waiting for the other branch of an if on the current path are kept alive
+def explore_paths(parsed: parser.Program) -> Iterator[State]:
+    pending = [(0, State())]
+    while pending:
+        index, state = pending.pop()
+        while index < len(parsed.commands) and state.is_valid():
+            new_state = eval_command(parsed.commands[index], state)
+            index += 1
             if new_state is not None:
-                new_states.append(new_state)
-        states.extend(new_states)
+                # state now continues as the branch where the condition doesn't hold
+                pending.append((index, state))
+                state = new_state
+        if state.is_valid():
+            yield state
+
 
+# executes command in every state, the states where an if split off are added to the list
+# with live (the variables live after the command), states that can be merged are merged
+def execute_command(command: parser.Command, states: List[State], live: Optional[Set[str]]) -> List[State]:
+    new_states = []
+    for state in states:
+        new_state = eval_command(command, state)
+        if new_state is not None:
+            new_states.append(new_state)
+    states.extend(new_states)
+    if live is not None and len(states) > 1:
+        states = merge_states(states, live)
+    return states
+
+
+def assert_can_fail(cond: parser.Comp, states: List[State]) -> bool:
     for state in states:
         if not state.is_valid():
             continue
-        if not is_always_true(parsed.postCondition, state):
+        if can_be_false(cond, state):
             return True
     return False
 
 
+# engines that can decide a program, reported in the details of eval_file
+ENGINE_INTERVALS = "intervals"
+ENGINE_FUZZ = "fuzz"
+ENGINE_PARTITION = "partition"
+ENGINE_SSA = "ssa"
+ENGINE_DEPTH_FIRST = "depth_first"
+ENGINE_BEST_FIRST = "best_first"
+ENGINE_STATES = "states"
+
+
+# the program that is left to execute and the result, if the pre-passes already decided it
+# details (when given) gets the engine that decided it
+def pre_passes(parsed: parser.Program, intervals: bool = True, fuzz_samples: int = 0,
+               slicing_pass: bool = True, details: Optional[Dict[str, Any]] = None,
+               partition: bool = False) -> Tuple[parser.Program, Optional[bool]]:
+    details = {} if details is None else details
+    # commands that can't influence the assert are not executed at all
+    if slicing_pass:
+        parsed = slicing.slice_program(parsed)
+
+    # cheap cases are decided by the intervals alone, without splitting into paths
+    if intervals:
+        decided = interval.interval_check(parsed)
+        if decided is not None:
+            details["engine"] = ENGINE_INTERVALS
+            return parsed, decided
+
+    # conditions over one input each: one run per region between the constants decides it
+    if partition:
+        import partition as partition_engine
+        decided = partition_engine.partition_check(parsed)
+        if decided is not None:
+            details["engine"] = ENGINE_PARTITION
+            return parsed, decided
+
+    # a concrete input for which the assert fails is enough
+    if fuzz_samples and fuzz.find_witness(parsed, fuzz_samples) is not None:
+        details["engine"] = ENGINE_FUZZ
+        return parsed, True
+    return parsed, None
+
+
+# details (when given) gets the engine that decided the program and, for the engines with states,
+# the number of paths that were checked against the assert (after merging)
+def eval_file(parsed: parser.Program, merge: bool = True, depth_first: bool = False, intervals: bool = True,
+              fuzz_samples: int = 0, slicing_pass: bool = True, ssa: bool = False, best_first: bool = False,
+              max_live: int = 0, path_budget: int = 0, partition: bool = False,
+              details: Optional[Dict[str, Any]] = None) -> bool:
+    details = {} if details is None else details
+    parsed, decided = pre_passes(parsed, intervals, fuzz_samples, slicing_pass, details, partition)
+    if decided is not None:
+        return decided
+
+    if ssa:
+        import ssa as ssa_engine
+        details["engine"] = ENGINE_SSA
+        return ssa_engine.ssa_check(parsed)
+
+    if best_first:
+        import frontier
+        details["engine"] = ENGINE_BEST_FIRST
+        return frontier.best_first_check(parsed, max_live or frontier.MAX_LIVE, path_budget, details)
+
+    if depth_first:
+        details["engine"] = ENGINE_DEPTH_FIRST
+        details["paths"] = 0
+        for state in explore_paths(parsed):
+            details["paths"] += 1
+            if can_be_false(parsed.postCondition, state):
+                return True
+        return False
+
+    details["engine"] = ENGINE_STATES
+    states = [State()]
+    live_after = live_variables(parsed) if merge else []
+    for index, command in enumerate(parsed.commands):
+        states = execute_command(command, states, live_after[index] if merge else None)
+    details["paths"] = len(states)
+    return assert_can_fail(parsed.postCondition, states)
+
+
 def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("directory", nargs="?", default="programs/other",
+                            help="directory with one program per file, a bulk file (### name lines "
+                                 "between programs, or .jsonl), or - for stdin")
+    arg_parser.add_argument("-o", "--output", default="results2.txt",
+                            help="results file, written as the results come (.gz is compressed, - is stdout)")
+    arg_parser.add_argument("--format", choices=["text", "jsonl"], default="text",
+                            help="text lines like results.txt or one JSON record per program")
+    arg_parser.add_argument("--witness", action="store_true",
+                            help="find inputs for which the assert fails, written by --format jsonl (skips the cache)")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes, 0 = cpu count")
+    arg_parser.add_argument("--timeout", type=float, default=10.0, help="seconds per program")
+    arg_parser.add_argument("--memory", type=int, default=1024, help="MiB per worker")
+    arg_parser.add_argument("--depth-first", action="store_true",
+                            help="explore paths one by one and stop at the first one where the assert fails")
+    arg_parser.add_argument("--best-first", action="store_true",
+                            help="explore the paths closest to failing the assert first, with a bounded frontier")
+    arg_parser.add_argument("--max-live", type=int, default=0, metavar="STATES",
+                            help="with --best-first, states kept in memory, the rest goes to a temporary file")
+    arg_parser.add_argument("--path-budget", type=int, default=0, metavar="PATHS",
+                            help="with --best-first, give up after this many paths (0 = no limit)")
+    arg_parser.add_argument("--ssa", action="store_true",
+                            help="encode ifs as if-then-else terms instead of exploring paths")
+    arg_parser.add_argument("--portfolio", action="store_true",
+                            help="try the engines from cheap to expensive within the time limit of each program")
+    arg_parser.add_argument("--share-prefixes", action="store_true",
+                            help="execute commands that programs start with in common only once (in this process)")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="keep running and verify changed files of the directory again (in this process)")
+    arg_parser.add_argument("--partition", action="store_true",
+                            help="decide programs whose conditions each read one input by one run per region")
+    arg_parser.add_argument("--no-slice", action="store_true",
+                            help="execute commands that can't influence the assert as well")
+    arg_parser.add_argument("--fuzz", type=int, default=0, metavar="SAMPLES",
+                            help="run the program on this many random inputs first (needs NumPy)")
+    arg_parser.add_argument("--stats", metavar="FILE",
+                            help="write statistics of the executor for every program as JSON (skips the cache)")
+    arg_parser.add_argument("--profile", metavar="FILE",
+                            help="run in this process under cProfile and write the profile "
+                                 "(pstats format, for snakeviz / flameprof / gprof2dot)")
+    arg_parser.add_argument("--cache", default=".verify_cache.json", help="file with cached results")
+    arg_parser.add_argument("--no-cache", action="store_true")
+    args = arg_parser.parse_args()
+    if args.portfolio and (args.depth_first or args.ssa or args.share_prefixes or args.watch or args.stats):
+        arg_parser.error("--portfolio chooses the engines itself and can't be combined with --depth-first, --ssa, "
+                         "--share-prefixes, --watch or --stats")
+    if args.best_first and (args.depth_first or args.ssa or args.portfolio or args.share_prefixes or args.watch):
+        arg_parser.error("--best-first can't be combined with --depth-first, --ssa, --portfolio, "
+                         "--share-prefixes or --watch")
+    if args.share_prefixes and (args.depth_first or args.ssa or args.stats):
+        arg_parser.error("--share-prefixes can't be combined with --depth-first, --ssa or --stats")
+    if args.watch and (args.depth_first or args.ssa or not os.path.isdir(args.directory)):
+        arg_parser.error("--watch needs a directory and can't be combined with --depth-first or --ssa")
+
     files = []
-    for file in os.listdir("programs/other"):
-        files.append(file)
+    if os.path.isdir(args.directory):
+        for file in sorted(os.listdir(args.directory)):
+            files.append(os.path.join(args.directory, file))
 
     # with open("results.txt", "w") as f:
     #     for file in files:
@@ -391,18 +787,85 @@ def main() -> None:
     #         f.write(str(parsed) + "\n\n" + result + "\n")
     #         f.write("--------------------------------------------------------\n")
 
-    with open("results2.txt", "w") as f:
-        for file in files:
-            parsed = parser.parse_file("programs/other/" + file)
-            result = "Assert is true"
-            try:
-                false_assert = eval_file(parsed)
-                if false_assert:
-                    result = "Assert can be false"
-            except AssertionError as e:
-                print(e)
-                result = str(e)
-            f.write(file + ": " + result + "\n")
+    import batch
+    import cache
+    import output
+
+    start = time.perf_counter()
+    eval_options = {"depth_first": args.depth_first}
+    if args.ssa:
+        eval_options["ssa"] = True
+    if args.best_first:
+        eval_options.update(best_first=True, max_live=args.max_live, path_budget=args.path_budget)
+    if args.no_slice:
+        eval_options["slicing_pass"] = False
+    if args.partition:
+        eval_options["partition"] = True
+    if args.fuzz:
+        if fuzz.available():
+            eval_options["fuzz_samples"] = args.fuzz
+        else:
+            print("NumPy is not installed, --fuzz is ignored")
+    if args.watch:
+        import watch
+        try:
+            watch.WatchMode(args.directory, args.output, args.timeout, eval_options).run()
+        except KeyboardInterrupt:
+            pass
+        return
+    collect_stats = args.stats is not None
+    jobs = 1 if args.profile else args.jobs
+    results_cache = None
+    if not args.no_cache and not collect_stats and not args.profile and not args.witness:
+        version = cache.engine_version() + str(sorted(eval_options.items())) + ("portfolio" if args.portfolio else "")
+        results_cache = cache.ResultCache(args.cache, version=version)
+    if args.share_prefixes:
+        if os.path.isdir(args.directory):
+            sources = batch.file_sources(files)
+        else:
+            sources = parser.open_corpus(args.directory)
+        verified = batch.run_shared(sources, results_cache, args.timeout, eval_options)
+    elif not os.path.isdir(args.directory):
+        verified = batch.run_corpus(parser.open_corpus(args.directory), results_cache,
+                                    jobs, args.timeout, args.memory * 1024 * 1024, eval_options, collect_stats,
+                                    args.witness, args.portfolio)
+    elif results_cache is None:
+        verified = batch.run_batch(files, jobs, args.timeout, args.memory * 1024 * 1024, eval_options, collect_stats,
+                                   args.witness, args.portfolio)
+    else:
+        verified = batch.run_cached(files, results_cache,
+                                    jobs, args.timeout, args.memory * 1024 * 1024, eval_options, args.portfolio)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    # only the statistics need all results at the end
+    results = []
+    summary = batch.Summary()
+    log = sys.stderr if args.output == "-" else sys.stdout
+    writer = output.open_output(args.output, args.format)
+    try:
+        for result in verified:
+            if result.verdict == batch.VERDICT_UNKNOWN:
+                print(result.reason, file=log)
+            writer.write(result)
+            summary.add(result)
+            if collect_stats:
+                results.append(result)
+    finally:
+        writer.close()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    print(summary.format(time.perf_counter() - start), file=log)
+
+    if collect_stats:
+        import json
+        with open(args.stats, "w") as f:
+            json.dump([{"file": result.file, "verdict": result.verdict, "reason": result.reason,
+                        "elapsed_ms": result.elapsed * 1000, "stats": result.stats} for result in results], f, indent=1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import gzip
+import json
+import sys
+import time
+from typing import IO, Any, Dict, List, Optional
+
+import batch
+
+'''
+Writers of verification results, fed one batch.Result at a time as soon as it is decided.
+
+TextOutput writes the "name: message" lines of the results files. JsonlOutput writes one JSON
+object per program:
+
+    {"file", "verdict", "reason", "reason_code", "engine", "elapsed_ms", "paths", "witness", "stages"}
+
+reason_code is a stable name for the reason of an unknown verdict (REASON_CODES) and null for a
+decided one; engine and paths are what eval_file reported (batch.Result), witness is a list of
+[label, value] pairs when witnesses were searched for, and stages the engines the portfolio
+(portfolio.py) ran, with their times.
+
+The lines of both formats wait in a buffer until FLUSH_RECORDS of them are pending or a record
+comes FLUSH_INTERVAL seconds after the last flush, so a reader that tails the file isn't far
+behind, and nothing is kept once it is written. A path ending in .gz is written with gzip; every flush is a sync flush,
+so what was written so far can be decompressed (zcat) while the run goes on. "-" is stdout.
+'''
+
+FLUSH_RECORDS = 256
+FLUSH_INTERVAL = 1.0
+
+# (start of the reason, code), the first match wins
+REASON_CODES = [
+    (batch.REASON_TIMEOUT, "timeout"),
+    (batch.REASON_MEMORY, "memory"),
+    (batch.REASON_INVALID, "invalid"),
+    ("Cant multiply variable by variable", "nonlinear"),
+    ("Cant decide the condition", "undecided"),
+    ("Variable ", "undefined_variable"),
+    ("Cant compare", "unsupported"),
+    ("No engine decided", "undecided"),
+    ("Path budget", "budget"),
+    ("Unknown command", "unsupported"),
+]
+
+
+def reason_code(result: batch.Result) -> Optional[str]:
+    if result.verdict != batch.VERDICT_UNKNOWN:
+        return None
+    for start, code in REASON_CODES:
+        if result.reason.startswith(start):
+            return code
+    return "error"
+
+
+def record(result: batch.Result) -> Dict[str, Any]:
+    return {
+        "file": result.file,
+        "verdict": result.verdict,
+        "reason": result.reason,
+        "reason_code": reason_code(result),
+        "engine": result.engine,
+        "elapsed_ms": round(result.elapsed * 1000, 3),
+        "paths": result.paths,
+        "witness": result.witness,
+        "stages": result.stages,
+    }
+
+
+def _open(path: str, binary: bool = False) -> IO:
+    if path == "-":
+        return sys.stdout.buffer if binary else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wb" if binary else "wt")
+    return open(path, "wb" if binary else "w")
+
+
+class _Output:
+    """Writes the lines of the records in batches, see FLUSH_RECORDS and FLUSH_INTERVAL."""
+
+    def __init__(self, path: str, flush_records: int = FLUSH_RECORDS, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self.path = path
+        self.file = _open(path, binary=True)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.pending: List[bytes] = []
+        self.flushed = time.monotonic()
+
+    def line(self, result: batch.Result) -> bytes:
+        raise NotImplementedError
+
+    def write(self, result: batch.Result) -> None:
+        self.pending.append(self.line(result))
+        if len(self.pending) >= self.flush_records or time.monotonic() - self.flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(b"".join(self.pending))
+        self.pending = []
+        self.file.flush()
+        self.flushed = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        if self.path != "-":
+            self.file.close()
+
+
+class TextOutput(_Output):
+    def line(self, result: batch.Result) -> bytes:
+        return (str(result) + "\n").encode()
+
+
+class JsonlOutput(_Output):
+    def line(self, result: batch.Result) -> bytes:
+        return json.dumps(record(result)).encode() + b"\n"
+
+
+def open_output(path: str, output_format: str = "text"):
+    """TextOutput or JsonlOutput ("text" / "jsonl") writing to path."""
+    if output_format == "jsonl":
+        return JsonlOutput(path)
+    return TextOutput(path)
@@ -1,6 +1,9 @@
+import json
+import mmap
+import re
 import sys
 
-from typing import List, Union, Iterator, Optional, Set
+from typing import Iterable, List, Union, Iterator, Set, Tuple
 
 
 class Input:
@@ -119,134 +122,245 @@ class Program:
             self.postCondition)
 
 
+_INTEGER = re.compile(r"[+-]?\d+(?:_\d+)*")
+_OPERATIONS = frozenset(("+", "-", "*"))
+_COMPARISONS = frozenset(("==", "<", ">", "<=", ">=", "!="))
+# token -> parsed constant or variable, shared by all parsers (both are immutable)
+_VALUES = {}
+_MAX_VALUES = 1 << 16
+
+
 class Parser:
     """
     An internal object that is used for parsing.
+
+    Reads the lines in one pass: every line is split into tokens once and every token is
+    classified by a precompiled pattern, without raising and catching exceptions.
     """
 
     def __init__(self):
-        self.lineStream = []
-        self.lastLine = None
         self.postCondition = None
         self.variables = set()
 
 
     def parse_value(self, token: str) -> Value:
+        value = _VALUES.get(token)
+        if value is not None:
+            return value
         if token == "input()":
+            # a new object for every call, it identifies the call
             return Input()
 
-        try:
-            return Constant(int(token))
-        except:
-            return Var(token)
+        if _INTEGER.fullmatch(token):
+            value = Constant(int(token))
+        else:
+            value = Var(token)
+        if len(_VALUES) >= _MAX_VALUES:
+            _VALUES.clear()
+        _VALUES[token] = value
+        return value
 
 
     def parse_expr(self, tokens: List[str]) -> Union[Value, Expr]:
         if len(tokens) == 1:
             return self.parse_value(tokens[0])
-        elif len(tokens) == 3:
+        if len(tokens) == 3:
             op = tokens[1]
-            if op not in ("+", "-", "*"):
+            if op not in _OPERATIONS:
                 raise RuntimeError(f"Unsupported operation {op}")
 
             return Expr(op,
                         self.parse_value(tokens[0]),
                         self.parse_value(tokens[2]))
-        else:
-            raise RuntimeError()
+        raise RuntimeError()
 
 
     def parse_cond(self, tokens: List[str]) -> Comp:
         if len(tokens) == 3:
             op = tokens[1]
-            if op not in ("==", "<", ">", "<=", ">=", "!="):
+            if op not in _COMPARISONS:
                 raise RuntimeError(f"Unsupported comparison {op}")
 
             return Comp(op,
                         self.parse_value(tokens[0]),
                         self.parse_value(tokens[2]))
-        else:
-            raise RuntimeError(f"Invalid condition {tokens}")
+        raise RuntimeError(f"Invalid condition {tokens}")
 
 
-    def parse_command(self, line: str) -> Optional[Command]:
-        tokens = line.split()
+    def parse_program(self, lineIterator: Iterable[str]) -> Program:
+        commands = []
+        # the body of the if being read and its condition
+        body = None
+        condition = None
+
+        parse_value = self.parse_value
+        for line in lineIterator:
+            tokens = line.split()
+            if not tokens:
+                raise RuntimeError(f"Unexpected line {tokens}")
+            first = tokens[0]
+
+            if first == "end" and len(tokens) == 1:
+                if body is None:
+                    break
+                if self.postCondition is not None:
+                    raise RuntimeError(
+                        "No further commands are allowed after a postcondition")
+                commands.append(If(condition, body))
+                body = None
+                continue
+
+            if first == "assert":
+                if self.postCondition is not None:
+                    raise RuntimeError("Only one assertion can be defined")
+                self.postCondition = self.parse_cond(tokens[1:])
+                continue
+
+            if first == "if":
+                if len(tokens) < 5:
+                    raise RuntimeError("Unexpected end of line")
+                if len(tokens) > 5:
+                    raise RuntimeError(f"Unexpected token {tokens[5]}")
+                if body is not None:
+                    raise RuntimeError(
+                        "Nested if-then blocks are not allowed")
+                if self.postCondition is not None:
+                    raise RuntimeError(
+                        "No further commands are allowed after a postcondition")
+                condition = self.parse_cond(tokens[1:4])
+                body = []
+                continue
 
-        if tokens[0] == "assert":
-            if self.postCondition is not None:
-                raise RuntimeError("Only one assertion can be defined")
-            self.postCondition = self.parse_cond(tokens[1:])
-            return None
+            if len(tokens) > 1 and tokens[1] == "=":
+                if self.postCondition is not None:
+                    raise RuntimeError(
+                        "No further commands are allowed after a postcondition")
+                self.variables.add(first)
+                # parse_expr inlined for the two valid shapes
+                if len(tokens) == 3:
+                    rhs = parse_value(tokens[2])
+                elif len(tokens) == 5 and tokens[3] in _OPERATIONS:
+                    rhs = Expr(tokens[3], parse_value(tokens[2]), parse_value(tokens[4]))
+                else:
+                    rhs = self.parse_expr(tokens[2:])
+                assignment = Assignment(first, rhs)
+                if body is None:
+                    commands.append(assignment)
+                else:
+                    body.append(assignment)
+                continue
+
+            raise RuntimeError(f"Unexpected line {tokens}")
+
+        if body is not None:
+            raise RuntimeError("Unexpected end of file")
+        assert(self.postCondition is not None)
+        return Program(commands, self.postCondition, self.variables)
 
-        if tokens[0] == "if":
-            if len(tokens) < 5:
-                raise RuntimeError("Unexpected end of line")
-            elif len(tokens) > 5:
-                raise RuntimeError(f"Unexpected token {tokens[5]}")
-            else:
-                body = self.parse_commands(True)
-                return If(self.parse_cond(tokens[1:4]), body)
 
-        if tokens[1] == "=":
-            var = tokens[0]
-            self.variables.add(var)
-            return Assignment(var, self.parse_expr(tokens[2:]))
+def parse_file(filename: str) -> Program:
+    """Parses the input program and returns its representation as Program
+    object. Also parses the post-condition and passes it as an attribute of the
+    Program object.
+    """
 
-        raise RuntimeError(f"Unexpected line {tokens}")
+    with open(filename) as f:
+        parser = Parser()
+        return parser.parse_program(f)
 
-    def get_next_line(self):
-        try:
-            line = next(self.lineStream)
-            self.lastLine = line
-            return line
-        except StopIteration:
-            return None
 
-    def parse_commands(self, innerBlock = False) -> List[Command]:
-        commands = []
+def parse_stream(lines: Iterable[str]) -> Program:
+    """Parses a program from an iterable of lines (e.g. an open file)."""
 
-        line = self.get_next_line()
-        while line is not None:
-            if line.strip() == "end":
-                return commands
+    return Parser().parse_program(lines)
 
-            command = self.parse_command(line)
-            if isinstance(command, If) and innerBlock:
-                raise RuntimeError(
-                    "Nested if-then blocks are not allowed")
 
-            if command is not None:
-                if self.postCondition:
-                    raise RuntimeError(
-                        "No further commands are allowed after a postcondition")
+def parse_string(text: str) -> Program:
+    """Parses a program from its source text."""
 
-                commands.append(command)
+    return parse_stream(text.splitlines())
 
-            line = self.get_next_line()
 
-        if innerBlock:
-            raise RuntimeError("Unexpected end of file")
+# A bulk file holds many programs, each one preceded by a delimiter line.
+# The rest of the delimiter line is the name of the program (optional):
+#
+#   ### 1.txt
+#   x = input()
+#   assert x > 0
+#   ### 2.txt
+#   ...
+#
+# In the JSONL format every line is an object {"name": ..., "program": ...}.
+DELIMITER = "###"
+
+Source = Tuple[str, str]
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Lines of a file read through mmap, or of stdin when path is "-"."""
+
+    if path == "-":
+        yield from sys.stdin
+        return
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            return
+        with mapped:
+            for line in iter(mapped.readline, b""):
+                yield line.decode()
+
+
+def split_sources(lines: Iterable[str], delimiter: str = DELIMITER) -> Iterator[Source]:
+    """Yields (name, source text) for every program of a bulk stream, one at a time.
+    Programs without a name are named by their position."""
+
+    name = None
+    chunk: List[str] = []
+    count = 0
+    for line in lines:
+        if line.startswith(delimiter):
+            if any(part.strip() for part in chunk):
+                count += 1
+                yield name or f"<{count}>", "\n".join(chunk)
+            name = line[len(delimiter):].strip() or None
+            chunk = []
         else:
-            return commands
+            chunk.append(line.rstrip("\r\n"))
+    if any(part.strip() for part in chunk):
+        count += 1
+        yield name or f"<{count}>", "\n".join(chunk)
 
 
-    def parse_program(self, lineIterator: Iterator[str]) -> Program:
-        self.lineStream = lineIterator
-        commands = self.parse_commands()
+def jsonl_sources(lines: Iterable[str]) -> Iterator[Source]:
+    """Yields (name, source text) for every line of a JSONL stream."""
 
-        assert(self.postCondition is not None)
-        return Program(commands, self.postCondition, self.variables)
+    count = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        count += 1
+        record = json.loads(line)
+        yield str(record.get("name", f"<{count}>")), record["program"]
 
 
-def parse_file(filename: str) -> Program:
-    """Parses the input program and returns its representation as Program
-    object. Also parses the post-condition and passes it as an attribute of the
-    Program object.
-    """
+def open_corpus(path: str) -> Iterator[Source]:
+    """Sources of all programs in a bulk file (JSONL if it ends with .jsonl), or stdin when path is "-"."""
+
+    lines = read_lines(path)
+    if path.endswith(".jsonl"):
+        return jsonl_sources(lines)
+    return split_sources(lines)
+
+
+def iter_programs(path: str) -> Iterator[Tuple[str, Program]]:
+    """Parses the programs of a bulk file lazily, see open_corpus."""
+
+    for name, text in open_corpus(path):
+        yield name, parse_string(text)
 
-    with open(filename) as f:
-        parser = Parser()
-        return parser.parse_program(f)
 
 if __name__ == "__main__":
     program = parse_file(sys.argv[1])
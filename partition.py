@@ -0,0 +1,158 @@
+import itertools
+import math
+from typing import Dict, List, Optional, Set
+
+import compiler
+import concrete
+import fuzz
+import main
+import parser.parser as parser
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Engine that decides a program by running it on one input per region of the input space.
+
+One walk over the commands keeps, for every variable, the set of linear forms over the input
+slots (main.Variable, the slots named as in concrete.input_slots) it can have on any path: an if
+joins the forms of its body with the forms before it. Every condition (of an if or the assert)
+is turned into "left - right op 0" for every pair of forms of its sides; if each of them reads
+at most one input, "a * x + b op 0" switches between floor(-b / a) and ceil(-b / a), and both
+become breakpoints of input x.
+
+Between two neighbouring breakpoints of every input (and beyond the outermost ones) no
+condition changes, so all inputs of such a cell take the same path and agree on the assert. One
+point per cell plus the breakpoints themselves therefore cover every behaviour of the program,
+and running it on them decides it exactly. The points are run as one NumPy batch (fuzz.evaluate)
+when NumPy is installed and int64 can't overflow on them, one at a time by the compiled program
+(compiler.py) otherwise.
+
+partition_check returns None (not decided) for x * y, for a condition over more than one input,
+for a variable that may be read before it is assigned and when the forms or the points would be
+more than MAX_FORMS / MAX_POINTS.
+'''
+
+MAX_FORMS = 64
+MAX_POINTS = 100_000
+# largest value the forms may reach for the int64 batch
+INT64_SAFE = 2 ** 62
+
+
+class _NotApplicable(Exception):
+    pass
+
+
+Forms = Set[Optional[main.Variable]]
+
+
+class _Walk:
+    def __init__(self, program: parser.Program) -> None:
+        self.slots = {id(node): f"{index}" for index, (node, _) in enumerate(concrete.input_slots(program))}
+        # input slot -> numbers where a condition over it switches
+        self.breakpoints: Dict[str, Set[int]] = {name: set() for name in self.slots.values()}
+        self.forms: List[main.Variable] = []
+
+    def value(self, value: parser.Value, env: Dict[str, Forms]) -> Forms:
+        if isinstance(value, parser.Input):
+            return {main.Variable.input(self.slots[id(value)])}
+        if isinstance(value, parser.Constant):
+            return {main.Variable((), value)}
+        forms = env.get(value)
+        # None stands for "not assigned on some path"
+        if forms is None or None in forms:
+            raise _NotApplicable
+        return forms
+
+    def expression(self, expr, env: Dict[str, Forms]) -> Forms:
+        if not isinstance(expr, parser.Expr):
+            return self.value(expr, env)
+        result = set()
+        for left, right in itertools.product(self.value(expr.l, env), self.value(expr.r, env)):
+            if expr.op == "+":
+                result.add(left + right)
+            elif expr.op == "-":
+                result.add(left - right)
+            elif left.is_constant():
+                result.add(right.scale(left.constant))
+            elif right.is_constant():
+                result.add(left.scale(right.constant))
+            else:
+                raise _NotApplicable
+        if len(result) > MAX_FORMS:
+            raise _NotApplicable
+        self.forms.extend(result)
+        return result
+
+    def condition(self, cond: parser.Comp, env: Dict[str, Forms]) -> None:
+        for left, right in itertools.product(self.value(cond.l, env), self.value(cond.r, env)):
+            difference = left - right
+            if len(difference.terms) > 1:
+                raise _NotApplicable
+            if difference.terms:
+                (name, times), = difference.terms
+                breakpoints = self.breakpoints[name]
+                breakpoints.add((-difference.constant) // times)
+                breakpoints.add(-(difference.constant // times))
+
+    def run(self, program: parser.Program) -> None:
+        env: Dict[str, Forms] = {}
+        for command in program.commands:
+            if isinstance(command, parser.If):
+                self.condition(command.condition, env)
+                body_env = dict(env)
+                for assignment in command.body:
+                    body_env[assignment.lhs] = self.expression(assignment.rhs, body_env)
+                for name in {assignment.lhs for assignment in command.body}:
+                    env[name] = env.get(name, {None}) | body_env[name]
+                    if len(env[name]) > MAX_FORMS:
+                        raise _NotApplicable
+            else:
+                env[command.lhs] = self.expression(command.rhs, env)
+        self.condition(program.postCondition, env)
+
+
+# the breakpoints, a number between every two of them that aren't neighbours and one beyond each end
+def representatives(breakpoints: Set[int]) -> List[int]:
+    if not breakpoints:
+        return [0]
+    points = sorted(breakpoints)
+    result = [points[0] - 1]
+    for point, following in zip(points, points[1:]):
+        result.append(point)
+        if following - point > 1:
+            result.append(point + 1)
+    result += [points[-1], points[-1] + 1]
+    return result
+
+
+def _fits_int64(forms: List[main.Variable], largest: Dict[str, int]) -> bool:
+    for form in forms:
+        bound = abs(form.constant) + sum(abs(times) * largest[name] for name, times in form.terms)
+        if bound >= INT64_SAFE:
+            return False
+    return True
+
+
+def partition_check(program: parser.Program) -> Optional[bool]:
+    """True if the assert can be false, False if it can't, None if the program doesn't fit the engine."""
+    walk = _Walk(program)
+    try:
+        walk.run(program)
+    except _NotApplicable:
+        return None
+    slots = sorted(walk.breakpoints, key=int)
+    points = [representatives(walk.breakpoints[name]) for name in slots]
+    if math.prod(len(values) for values in points) > MAX_POINTS:
+        return None
+
+    run = compiler.compile_program(program)
+    largest = {name: max(abs(values[0]), abs(values[-1])) for name, values in zip(slots, points)}
+    if fuzz.available() and slots and _fits_int64(walk.forms, largest):
+        grid = np.array(list(itertools.product(*points)), dtype=np.int64).T
+        holds = fuzz.evaluate(program, grid)
+        # the failing lane is run again with exact integers, as in fuzz.find_witness
+        return any(not run([int(v) for v in grid[:, lane]])[1] for lane in np.flatnonzero(~holds)[:1])
+    return any(not run(list(inputs))[1] for inputs in itertools.product(*points))
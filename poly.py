@@ -0,0 +1,191 @@
+import itertools
+import math
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import lia
+
+'''
+Monomials of the polynomial normal form of main.Variable, and the reasoning about them.
+
+A Variable is a sum of terms (name, coefficient) plus a constant. The name of a linear term is
+an input value, the name of a term of degree 2 or more is a Monomial: a str subclass ("x*x*y")
+that also has its factors ((input value, exponent), ...). Monomials are interned in a global
+unique table, so equal products are one object, and since they are strings, terms stay sorted
+tuples that lia.py reads as variables like any other.
+
+lia only sees a relaxation - every monomial is an unknown of its own, bounded by the interval
+product of the ranges of its factors (bounds; an even power is never negative). When it finds
+no solution, there is none. When it finds one, check tries to make it real: it fixes the input
+values that are factors of a monomial (every value of their ranges when those are finite and
+small, which proves infeasibility too, otherwise values around the model and 0) and lets lia
+solve the rest, which is linear. A pure power also bounds its input, e.g. x * x <= 10 gives
+-3 <= x <= 3.
+'''
+
+Factors = Tuple[Tuple[str, int], ...]
+Bounds = Tuple[float, float]
+
+# assignments of the factor input values tried by check
+MAX_ASSIGNMENTS = 4096
+# values around 0 tried for an input value whose range is too wide
+SEARCH = 16
+
+
+class Monomial(str):
+    _table: "weakref.WeakValueDictionary[Factors, Monomial]" = weakref.WeakValueDictionary()
+
+    def __new__(cls, factors: Factors) -> "Monomial":
+        result = cls._table.get(factors)
+        if result is None:
+            result = str.__new__(cls, "*".join(name for name, exponent in factors for _ in range(exponent)))
+            result.factors = factors
+            cls._table[factors] = result
+        return result
+
+    def __reduce__(self):
+        return Monomial, (self.factors,)
+
+
+def factors(name: str) -> Factors:
+    return name.factors if isinstance(name, Monomial) else ((name, 1),)
+
+
+def inputs(name: str) -> List[str]:
+    return [factor for factor, _ in factors(name)]
+
+
+# name of the product of the input values with these exponents, None for the empty product
+def of(exponents: Dict[str, int]) -> Optional[str]:
+    items = tuple(sorted((name, exponent) for name, exponent in exponents.items() if exponent > 0))
+    if not items:
+        return None
+    if len(items) == 1 and items[0][1] == 1:
+        return items[0][0]
+    return Monomial(items)
+
+
+def product(left: str, right: str) -> str:
+    exponents = dict(factors(left))
+    for name, exponent in factors(right):
+        exponents[name] = exponents.get(name, 0) + exponent
+    return of(exponents)
+
+
+def is_nonlinear(constraints: Iterable[lia.Constraint]) -> bool:
+    return any(isinstance(name, Monomial) for terms, _, _ in constraints for name, _ in terms)
+
+
+def _times(a: float, b: float) -> float:
+    # 0 * inf is 0 here, a zero factor makes the product 0
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+def power_bounds(low: float, high: float, exponent: int) -> Bounds:
+    ends = (low ** exponent, high ** exponent)
+    if exponent % 2 == 0 and low <= 0 <= high:
+        return 0, max(ends)
+    return min(ends), max(ends)
+
+
+def bounds(monomial: Monomial, ranges: Callable[[str], Bounds]) -> Bounds:
+    low: float = 1
+    high: float = 1
+    for name, exponent in monomial.factors:
+        factor_low, factor_high = power_bounds(*ranges(name), exponent)
+        products = [_times(a, b) for a in (low, high) for b in (factor_low, factor_high)]
+        low, high = min(products), max(products)
+    return low, high
+
+
+def _root(number: int, exponent: int) -> int:
+    result = int(round(number ** (1 / exponent)))
+    while result ** exponent > number:
+        result -= 1
+    while (result + 1) ** exponent <= number:
+        result += 1
+    return result
+
+
+# bounds of the names that have a constraint of their own, e.g. 2 * x - 7 <= 0 gives x <= 3
+def _single_bounds(constraints: List[lia.Constraint]) -> Dict[str, List[float]]:
+    result: Dict[str, List[float]] = {}
+    for terms, constant, op in constraints:
+        if len(terms) != 1:
+            continue
+        (name, times), = terms
+        bound = result.setdefault(name, [-math.inf, math.inf])
+        if op == lia.EQ:
+            bound[0] = max(bound[0], -constant // times)
+            bound[1] = min(bound[1], -constant // times)
+        elif op == lia.LE and times > 0:
+            bound[1] = min(bound[1], (-constant) // times)
+        elif op == lia.LE:
+            bound[0] = max(bound[0], -((-constant) // -times))
+    return result
+
+
+def _substitute(constraint: lia.Constraint, assignment: Dict[str, int]):
+    terms, constant, op = constraint
+    rest: Dict[str, int] = {}
+    for name, times in terms:
+        if isinstance(name, Monomial):
+            constant += times * math.prod(assignment[factor] ** exponent for factor, exponent in name.factors)
+        elif name in assignment:
+            constant += times * assignment[name]
+        else:
+            rest[name] = times
+    return lia.make(rest, constant, op)
+
+
+def check(constraints: List[lia.Constraint], ranges: Callable[[str], Bounds],
+          model: Optional[lia.Model] = None) -> Optional[bool]:
+    """Whether the constraints have an integer solution in which every monomial is the product
+    of its factors, None if it couldn't be decided. ranges gives the bounds of an input value."""
+    monomials = {name for terms, _, _ in constraints for name, _ in terms if isinstance(name, Monomial)}
+    names = sorted({factor for monomial in monomials for factor, _ in monomial.factors})
+    single = _single_bounds(constraints)
+    limits = {}
+    for name in names:
+        low, high = ranges(name)
+        own_low, own_high = single.get(name, (-math.inf, math.inf))
+        limits[name] = [max(low, own_low), min(high, own_high)]
+    for monomial in monomials:
+        if len(monomial.factors) != 1:
+            continue
+        (name, exponent), = monomial.factors
+        low, high = single.get(monomial, (-math.inf, math.inf))
+        if exponent % 2 == 0 and high != math.inf:
+            radius = _root(max(int(high), 0), exponent)
+        elif low != -math.inf and high != math.inf:
+            radius = _root(int(max(abs(low), abs(high))), exponent)
+        else:
+            continue
+        limits[name] = [max(limits[name][0], -radius), min(limits[name][1], radius)]
+
+    exhaustive = all(math.isfinite(low) and math.isfinite(high) for low, high in limits.values())
+    if exhaustive and math.prod(max(0, int(high) - int(low) + 1) for low, high in limits.values()) <= MAX_ASSIGNMENTS:
+        candidates = [range(int(limits[name][0]), int(limits[name][1]) + 1) for name in names]
+    else:
+        exhaustive = False
+        hint = model or {}
+        candidates = []
+        for name in names:
+            low, high = limits[name]
+            values = {hint.get(name, 0)} | set(range(-SEARCH, SEARCH + 1))
+            candidates.append(sorted((value for value in values if low <= value <= high), key=abs))
+
+    unknown = False
+    for values in itertools.islice(itertools.product(*candidates), MAX_ASSIGNMENTS):
+        assignment = dict(zip(names, values))
+        substituted = [_substitute(constraint, assignment) for constraint in constraints]
+        if False in substituted:
+            continue
+        result, _ = lia.check([constraint for constraint in substituted if constraint is not True])
+        if result:
+            return True
+        if result is None:
+            unknown = True
+    return False if exhaustive and not unknown else None
@@ -0,0 +1,204 @@
+import collections
+import math
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import batch
+import concrete
+import interval
+import main
+import parser.parser as parser
+import partition
+import slicing
+import ssa
+import witness
+
+'''
+Portfolio of engines under one time budget per program: the engines are tried from cheap to
+expensive and the first verdict ends the run.
+
+    fold       the sliced program reads no input(), so running it once decides it
+    intervals  interval.interval_check
+    partition  partition.partition_check, one run per region when every condition reads one input
+    states     the symbolic state engine of main.eval_file
+    ssa        ssa.ssa_check, which handles x * y as long as the product doesn't matter
+    search     random inputs (witness.sampled_witness), can only show that the assert fails
+
+Every engine is sound, so the order only changes the time it takes. fold and intervals take
+microseconds and partition at most partition.MAX_POINTS runs of the compiled program, so they
+always run first, each with what is left of the budget. The others are ordered by their recent
+history on programs of the same shape (var * var or not, number of ifs, size): the expected time
+to a verdict, i.e. the mean time of a run divided by the share of runs that decided the program.
+An engine gets the time that settled programs of this shape so far (times SLACK), at least
+MIN_SLICE, and the last one gets the rest; what is left after all of them goes to the most
+promising engine that ran out of time. An engine without history gets an equal share of what is
+left.
+
+The report has the verdict, the engine that decided it and the time of every stage. A program
+that is still undecided when the budget runs out, or after an engine ran out of its time, is
+"Timeout", so it isn't cached like one that no engine can decide.
+'''
+
+HISTORY = 64
+SLACK = 4.0
+MIN_SLICE = 0.01
+
+CHEAP = ("fold", "intervals", "partition")
+EXPENSIVE = ("states", "ssa", "search")
+# ("seconds of a run", "decided") an engine starts with, so untried engines get a chance
+PRIOR = {"states": (0.01, 1), "ssa": (0.02, 1), "search": (0.05, 0)}
+
+Shape = Tuple[bool, int, int]
+
+
+def shape(program: parser.Program) -> Shape:
+    var_by_var = False
+    ifs = 0
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            ifs += 1
+            assignments = command.body
+        else:
+            assignments = [command]
+        for assignment in assignments:
+            rhs = assignment.rhs
+            if isinstance(rhs, parser.Expr) and rhs.op == "*" and isinstance(rhs.l, str) and isinstance(rhs.r, str):
+                var_by_var = True
+    return var_by_var, min(ifs, 16) // 4, int(math.log2(len(program.commands) + 1))
+
+
+class Stage:
+    __slots__ = ("engine", "seconds", "outcome")
+
+    # outcome: the verdict ("true" / "false"), "undecided" or why the engine gave up (e.g. "Timeout")
+    def __init__(self, engine: str, seconds: float, outcome: str) -> None:
+        self.engine = engine
+        self.seconds = seconds
+        self.outcome = outcome
+
+    def as_dict(self) -> Dict:
+        return {"engine": self.engine, "ms": round(self.seconds * 1000, 3), "outcome": self.outcome}
+
+
+class Report:
+    def __init__(self) -> None:
+        # True if the assert can be false, None if no engine decided it
+        self.result: Optional[bool] = None
+        self.engine: Optional[str] = None
+        self.stages: List[Stage] = []
+        # why it is undecided: "Timeout" when the budget ran out before every engine finished (the
+        # result then depends on the budget), otherwise the reason of the last stage that gave up
+        self.reason = "No engine decided the program"
+
+
+def _fold(program: parser.Program) -> Optional[bool]:
+    if concrete.input_slots(program):
+        return None
+    try:
+        return not concrete.execute(program, [])[1]
+    except KeyError:
+        # reads a variable that was never assigned
+        return None
+
+
+def _search(program: parser.Program) -> Optional[bool]:
+    return True if witness.sampled_witness(program) is not None else None
+
+
+ENGINES: Dict[str, Callable[[parser.Program], Optional[bool]]] = {
+    "fold": _fold,
+    "intervals": interval.interval_check,
+    "partition": partition.partition_check,
+    "states": lambda program: main.eval_file(program, intervals=False, slicing_pass=False),
+    "ssa": ssa.ssa_check,
+    "search": _search,
+}
+
+
+class Portfolio:
+    def __init__(self) -> None:
+        # shape -> engine -> (seconds, decided) of its recent runs
+        self.history: Dict[Shape, Dict[str, Deque[Tuple[float, bool]]]] = {}
+
+    def runs(self, key: Shape, engine: str) -> Deque[Tuple[float, bool]]:
+        engines = self.history.setdefault(key, {})
+        if engine not in engines:
+            engines[engine] = collections.deque(maxlen=HISTORY)
+        return engines[engine]
+
+    # expected seconds until the engine decides a program of this shape
+    def expected(self, key: Shape, engine: str) -> float:
+        seconds, decided = PRIOR[engine]
+        runs = 1
+        for run_seconds, run_decided in self.runs(key, engine):
+            seconds += run_seconds
+            decided += run_decided
+            runs += 1
+        return (seconds / runs) / max(decided / runs, 1e-3)
+
+    def order(self, key: Shape) -> List[str]:
+        return sorted(EXPENSIVE, key=lambda engine: self.expected(key, engine))
+
+    def time_slice(self, key: Shape, engine: str, left: float, engines_left: int) -> float:
+        if engines_left == 1:
+            return left
+        settled = [seconds for seconds, decided in self.runs(key, engine) if decided]
+        if not settled:
+            return left / engines_left
+        return min(left, max(MIN_SLICE, SLACK * max(settled)))
+
+    def run_stage(self, report: Report, key: Shape, engine: str, program: parser.Program,
+                  seconds: Optional[float]) -> Optional[bool]:
+        start = time.perf_counter()
+        result = None
+        try:
+            if seconds is None:
+                result = ENGINES[engine](program)
+            else:
+                with batch.time_limit(seconds):
+                    result = ENGINES[engine](program)
+            outcome = "undecided" if result is None else (batch.VERDICT_FALSE if result else batch.VERDICT_TRUE)
+        except batch.ERRORS as e:
+            outcome = batch.outcome_result("", e, 0.0).reason
+        elapsed = time.perf_counter() - start
+        report.stages.append(Stage(engine, elapsed, outcome))
+        if engine in EXPENSIVE:
+            self.runs(key, engine).append((elapsed, result is not None))
+        if result is not None:
+            report.result = result
+            report.engine = engine
+        elif outcome != "undecided":
+            report.reason = outcome
+        return result
+
+    def verify(self, parsed: parser.Program, budget: float = 0.0) -> Report:
+        """Runs the engines until one decides the program or the budget (seconds, 0 = none) is spent."""
+        deadline = time.perf_counter() + budget
+        report = Report()
+        program = slicing.slice_program(parsed)
+        key = shape(program)
+        order = self.order(key)
+        timed_out = []
+        for index, engine in enumerate(CHEAP + tuple(order)):
+            left = deadline - time.perf_counter()
+            if budget > 0 and left <= 0:
+                report.reason = batch.REASON_TIMEOUT
+                return report
+            if budget <= 0:
+                seconds = None
+            elif engine in CHEAP:
+                seconds = left
+            else:
+                seconds = self.time_slice(key, engine, left, len(CHEAP) + len(order) - index)
+            if self.run_stage(report, key, engine, program, seconds) is not None:
+                return report
+            if report.stages[-1].outcome == batch.REASON_TIMEOUT:
+                timed_out.append(engine)
+
+        # anytime: the rest of the budget goes to the best engine that only ran out of time
+        left = deadline - time.perf_counter()
+        if timed_out and budget > 0 and left > MIN_SLICE:
+            self.run_stage(report, key, timed_out[0], program, left)
+        if timed_out and report.result is None:
+            report.reason = batch.REASON_TIMEOUT
+        return report
@@ -0,0 +1,148 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import main
+import parser.parser as parser
+
+'''
+Verifies a batch of programs that share prefixes of commands, executing every shared prefix once.
+
+The (pre-passed) programs are put into a trie whose edges are commands, compared structurally by
+their text. The states after a node's command (its snapshot) are computed once from the parent's
+snapshot and are the starting point of every program below the node, so only the suffix of each
+program and its postCondition are evaluated on their own.
+
+Merging after a command needs the variables that are still live; at a shared node these are the
+union of the live variables of all programs that pass through it, which is sound for each of them.
+
+A snapshot is needed until the snapshots of all its children are computed and the postConditions
+of the programs that end at the node are checked. Then it is evicted; the last child takes the
+parent's states over without copying them. The trie is walked depth-first, so besides the node that
+is being computed only the snapshots of unfinished nodes on the current path are alive.
+
+An error (AssertionError, or e.g. a timeout raised inside `guard`) while computing a node is the
+result of every program below it.
+'''
+
+Outcome = Union[bool, BaseException]
+
+
+def command_key(command: parser.Command) -> str:
+    return str(command)
+
+
+class Node:
+    __slots__ = ("command", "children", "programs", "live", "waiting", "states", "elapsed")
+
+    def __init__(self, command: Optional[parser.Command]) -> None:
+        self.command = command
+        self.children: Dict[str, Node] = {}
+        # (index in the batch, postCondition) of the programs that end here
+        self.programs: List[Tuple[int, parser.Comp]] = []
+        # variables live after the command in any of the programs below, None without merging
+        self.live: Optional[Set[str]] = None
+        # children and programs that still need the snapshot
+        self.waiting = 0
+        self.states: Optional[List[main.State]] = None
+        # seconds spent computing the snapshots from the root up to this node
+        self.elapsed = 0.0
+
+
+class PrefixTrie:
+    def __init__(self, merge: bool = True) -> None:
+        self.merge = merge
+        self.root = Node(None)
+        self.nodes = 1
+
+    def add(self, index: int, parsed: parser.Program) -> None:
+        live_after = main.live_variables(parsed) if self.merge else []
+        node = self.root
+        for position, command in enumerate(parsed.commands):
+            key = command_key(command)
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = Node(command)
+                node.waiting += 1
+                self.nodes += 1
+                if self.merge:
+                    child.live = set()
+            if self.merge:
+                child.live |= live_after[position]
+            node = child
+        node.programs.append((index, parsed.postCondition))
+        node.waiting += 1
+
+    # (index, result or error, seconds) of every program, in depth-first order of the trie
+    # guard() is entered around each computation (e.g. to enforce a time limit), the exceptions
+    # in errors become the result of the programs below the node where they were raised
+    def evaluate(self, guard: Optional[Callable] = None,
+                 errors: Tuple[type, ...] = (AssertionError,)) -> Iterator[Tuple[int, Outcome, float]]:
+        self.root.states = [main.State()]
+        stack: List[Tuple[Optional[Node], Node, Optional[BaseException]]] = [(None, self.root, None)]
+        while stack:
+            parent, node, error = stack.pop()
+            if parent is not None and error is None:
+                start = time.perf_counter()
+                try:
+                    node.states = _run(guard, lambda: self.execute(parent, node))
+                except errors as e:
+                    error = e
+                _release(parent)
+                node.elapsed = parent.elapsed + time.perf_counter() - start
+
+            for index, cond in node.programs:
+                if error is not None:
+                    yield index, error, node.elapsed
+                    continue
+                start = time.perf_counter()
+                try:
+                    outcome: Outcome = _run(guard, lambda: main.assert_can_fail(cond, node.states))
+                except errors as e:
+                    outcome = e
+                _release(node)
+                yield index, outcome, node.elapsed + time.perf_counter() - start
+            # a child's snapshot is computed only when it is its turn, so siblings don't wait in memory
+            for child in reversed(list(node.children.values())):
+                stack.append((node, child, error))
+            node.children = {}
+
+    def execute(self, parent: Node, child: Node) -> List[main.State]:
+        if parent.waiting == 1:
+            # nothing else needs the parent's states
+            states = parent.states
+        else:
+            states = [state.copy() for state in parent.states]
+        return main.execute_command(child.command, states, child.live)
+
+
+def _run(guard: Optional[Callable], function: Callable):
+    if guard is None:
+        return function()
+    with guard():
+        return function()
+
+
+def _release(node: Node) -> None:
+    node.waiting -= 1
+    if node.waiting == 0:
+        node.states = None
+
+
+def eval_shared(programs: List[parser.Program], merge: bool = True, intervals: bool = True, fuzz_samples: int = 0,
+                slicing_pass: bool = True, guard: Optional[Callable] = None,
+                errors: Tuple[type, ...] = (AssertionError,), partition: bool = False) -> Iterator[Tuple[int, Outcome, float]]:
+    """(index, eval_file result or the error it raised, seconds) for every program, not in order."""
+    trie = PrefixTrie(merge)
+    for index, parsed in enumerate(programs):
+        start = time.perf_counter()
+        try:
+            parsed, decided = _run(guard, lambda: main.pre_passes(parsed, intervals, fuzz_samples, slicing_pass,
+                                                                    partition=partition))
+        except errors as e:
+            yield index, e, time.perf_counter() - start
+            continue
+        if decided is not None:
+            yield index, decided, time.perf_counter() - start
+        else:
+            trie.add(index, parsed)
+    yield from trie.evaluate(guard, errors)
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import batch
+import main
+import parser.parser as parser
+import witness
+
+'''
+Verification service: a long-running process that verifies programs sent to it over HTTP, on
+localhost or on a Unix socket, so a client pays one round trip instead of a Python start-up.
+
+    POST /verify   {"program": text, "name": optional, "deadline": seconds, optional}
+                   -> {"name", "verdict", "reason", "message", "witness", "elapsed_ms"}
+    GET /health    -> {"status": "ok", "workers", "queued"}
+    GET /metrics   -> counters, batch sizes and latency percentiles
+
+The witness is [[label, value], ...] for every input() of the program (witness.py) when the
+verdict is "false" and one was found, null otherwise.
+
+Requests wait in a queue of at most MAX_QUEUE; when it is full the request is rejected with 503
+right away (backpressure), instead of letting latencies grow without a bound. A dispatcher takes
+up to BATCH_SIZE requests that arrive within BATCH_WINDOW of each other and sends them as one task
+to a pool of worker processes, which imported the engine once at start-up. At most one batch per
+worker is in flight, so the queue fills up when the workers are busy.
+
+Every request has a deadline (DEFAULT_DEADLINE unless it gives one). A request whose deadline
+passed while it was queued isn't verified at all; in the worker, eval_file gets the time that is
+left (SIGALRM, as in batch.py) and the result is "unknown" with reason "Timeout" when it runs out.
+An error on a program (batch.ERRORS, or a bug of the engine) is the reason of its own reply only.
+When a worker dies (e.g. killed at the address space limit), the requests of the batches in
+flight are "Memory limit exceeded" and the pool is started again.
+
+Run with  python service.py --port 8765  and query it with client.py.
+'''
+
+MAX_QUEUE = 1024
+BATCH_SIZE = 32
+BATCH_WINDOW = 0.002
+DEFAULT_DEADLINE = 10.0
+# time the reply may take after the deadline (transfer from the worker)
+GRACE = 1.0
+MAX_BODY = 1 << 22
+# latencies kept for the percentiles of /metrics
+LATENCY_WINDOW = 4096
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+def _verify(name: str, text: str, seconds: float, eval_options: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    found = None
+    if seconds <= 0:
+        result = batch.Result(name, batch.VERDICT_UNKNOWN, batch.REASON_TIMEOUT)
+    else:
+        try:
+            parsed = parser.parse_string(text)
+        except batch.PARSE_ERRORS as e:
+            result = batch.invalid_result(name, e)
+        else:
+            try:
+                with batch.time_limit(seconds):
+                    outcome = main.eval_file(parsed, **eval_options)
+            except batch.ERRORS as e:
+                outcome = e
+            result = batch.outcome_result(name, outcome, 0.0)
+            left = seconds - (time.perf_counter() - start)
+            if outcome is True and left > 0:
+                # the verdict stands even if no witness is found in time
+                try:
+                    with batch.time_limit(left):
+                        found = witness.find_witness(parsed)
+                except batch.ERRORS:
+                    found = None
+    return _reply(result, found, (time.perf_counter() - start) * 1000)
+
+
+def _reply(result: batch.Result, found: Optional[List] = None, elapsed_ms: float = 0.0) -> Dict[str, Any]:
+    return {"name": result.file, "verdict": result.verdict, "reason": result.reason, "message": result.message(),
+            "witness": found, "elapsed_ms": elapsed_ms}
+
+
+# runs in a worker process: (name, program text, seconds left) -> reply of every request
+def verify_batch(requests: List[Tuple[str, str, float]], eval_options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    replies = []
+    for name, text, seconds in requests:
+        try:
+            replies.append(_verify(name, text, seconds, eval_options))
+        except Exception as e:
+            # a bug of the engine is the reply of this request only, the rest of the batch goes on
+            replies.append(_reply(batch.outcome_result(name, e, 0.0)))
+    return replies
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.requests = 0
+        self.rejected = 0
+        self.expired = 0
+        self.verdicts = {batch.VERDICT_TRUE: 0, batch.VERDICT_FALSE: 0, batch.VERDICT_UNKNOWN: 0}
+        self.batches = 0
+        self.batched = 0
+        self.latencies: "collections.deque[float]" = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self, queued: int, in_flight: int) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "uptime_s": time.time() - self.started,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "verdicts": self.verdicts,
+            "batches": self.batches,
+            "mean_batch_size": self.batched / self.batches if self.batches else 0.0,
+            "queued": queued,
+            "batches_in_flight": in_flight,
+            "latency_p50_ms": batch.percentile(latencies, 50) * 1000,
+            "latency_p99_ms": batch.percentile(latencies, 99) * 1000,
+        }
+
+
+class _Request:
+    __slots__ = ("name", "text", "deadline", "reply")
+
+    def __init__(self, name: str, text: str, deadline: float, reply: asyncio.Future) -> None:
+        self.name = name
+        self.text = text
+        self.deadline = deadline
+        self.reply = reply
+
+
+class Service:
+    def __init__(self, jobs: int = 0, memory_limit: Optional[int] = None,
+                 eval_options: Optional[Dict[str, Any]] = None) -> None:
+        self.jobs = jobs if jobs > 0 else os.cpu_count() or 1
+        self.eval_options = eval_options or {}
+        self.memory_limit = memory_limit
+        self.pool = self._new_pool()
+        self.metrics = Metrics()
+        self.queue: "asyncio.Queue[_Request]" = asyncio.Queue(MAX_QUEUE)
+        self.slots = asyncio.Semaphore(self.jobs)
+        self.in_flight = 0
+
+    def _new_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(self.jobs, initializer=batch.init_worker,
+                                                      initargs=(0.0, self.memory_limit))
+
+    # a worker that died (e.g. killed by the address space limit) breaks the whole pool
+    def _restart(self, broken: concurrent.futures.ProcessPoolExecutor) -> None:
+        if self.pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+
+    async def warm_up(self) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm) for _ in range(self.jobs)))
+
+    async def submit(self, name: str, text: str, deadline: float) -> Optional[Dict[str, Any]]:
+        """The reply for the program, None if the queue is full."""
+        loop = asyncio.get_running_loop()
+        request = _Request(name, text, loop.time() + deadline, loop.create_future())
+        try:
+            self.queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            return None
+        self.metrics.requests += 1
+        start = loop.time()
+        try:
+            reply = await asyncio.wait_for(asyncio.shield(request.reply), deadline + GRACE)
+        except asyncio.TimeoutError:
+            reply = {"name": name, "verdict": batch.VERDICT_UNKNOWN, "reason": batch.REASON_TIMEOUT,
+                     "message": batch.REASON_TIMEOUT, "witness": None, "elapsed_ms": (loop.time() - start) * 1000}
+        self.metrics.verdicts[reply["verdict"]] += 1
+        self.metrics.latencies.append(loop.time() - start)
+        return reply
+
+    async def _collect(self) -> List[_Request]:
+        requests = [await self.queue.get()]
+        if self.queue.qsize() < BATCH_SIZE - 1:
+            # give the requests that arrive together a moment to join the batch
+            await asyncio.sleep(BATCH_WINDOW)
+        while len(requests) < BATCH_SIZE and not self.queue.empty():
+            requests.append(self.queue.get_nowait())
+        return requests
+
+    async def dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # waiting for a free worker first leaves the requests in the queue meanwhile
+            await self.slots.acquire()
+            requests = await self._collect()
+            now = loop.time()
+            work = []
+            for request in requests:
+                if request.deadline <= now:
+                    self.metrics.expired += 1
+                work.append((request.name, request.text, request.deadline - now))
+            self.metrics.batches += 1
+            self.metrics.batched += len(requests)
+            self.in_flight += 1
+            pool = self.pool
+            try:
+                future = loop.run_in_executor(pool, verify_batch, work, self.eval_options)
+            except concurrent.futures.BrokenExecutor:
+                self._restart(pool)
+                future = loop.run_in_executor(self.pool, verify_batch, work, self.eval_options)
+            future.add_done_callback(lambda done, requests=requests, pool=pool: self._finished(done, requests, pool))
+
+    def _finished(self, done: asyncio.Future, requests: List[_Request],
+                  pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        self.in_flight -= 1
+        self.slots.release()
+        if done.cancelled():
+            # the service is shutting down
+            return
+        error = done.exception()
+        if error is not None:
+            if isinstance(error, concurrent.futures.BrokenExecutor):
+                # a worker died, the batches the pool had in flight are lost
+                self._restart(pool)
+                reason = batch.REASON_MEMORY
+            else:
+                # e.g. a reply that couldn't be sent back from the worker
+                reason = batch.outcome_result("", error, 0.0).reason
+            replies = [_reply(batch.Result(request.name, batch.VERDICT_UNKNOWN, reason)) for request in requests]
+        else:
+            replies = done.result()
+        for request, reply in zip(requests, replies):
+            if not request.reply.done():
+                request.reply.set_result(reply)
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "workers": self.jobs, "queued": self.queue.qsize()}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.as_dict(self.queue.qsize(), self.in_flight)
+        if path != "/verify":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            request = json.loads(body)
+            text = request["program"]
+            name = str(request.get("name", "program"))
+            deadline = float(request.get("deadline", DEFAULT_DEADLINE))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {"error": 'expected {"program": text, "name": ..., "deadline": seconds}'}
+        reply = await self.submit(name, text, deadline)
+        if reply is None:
+            return 503, {"error": "queue is full, retry later"}
+        return 200, reply
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, reply = 413, {"error": "program too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, reply = await self.route(method, path.split("?", 1)[0], body)
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version.strip() == "HTTP/1.1")
+                data = json.dumps(reply).encode()
+                writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None) -> None:
+        await self.warm_up()
+        dispatcher = asyncio.ensure_future(self.dispatch())
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle, socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        print("listening on", socket_path or f"http://{host}:{port}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            dispatcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+def main_service() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--socket", help="listen on this Unix socket instead")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes, 0 = cpu count")
+    arg_parser.add_argument("--memory", type=int, default=1024, help="MiB per worker")
+    arg_parser.add_argument("--depth-first", action="store_true")
+    arg_parser.add_argument("--ssa", action="store_true")
+    arg_parser.add_argument("--no-slice", action="store_true")
+    args = arg_parser.parse_args()
+
+    eval_options: Dict[str, Any] = {"depth_first": args.depth_first}
+    if args.ssa:
+        eval_options["ssa"] = True
+    if args.no_slice:
+        eval_options["slicing_pass"] = False
+
+    async def run() -> None:
+        service = Service(args.jobs, args.memory * 1024 * 1024, eval_options)
+        await service.serve(args.host, args.port, args.socket)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main_service()
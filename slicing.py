@@ -0,0 +1,60 @@
+from typing import List, Set
+
+import parser.parser as parser
+
+'''
+Cone-of-influence slicing: removes the commands that can't change the values the assert reads.
+
+Goes backwards over the program with the set of relevant variables (at first the ones in the
+assert). An assignment is kept only if it writes a relevant variable; then the variable stops
+being relevant (its old value is overwritten) and the variables of the right-hand side become
+relevant. The body of an if is sliced the same way, but the written variables stay relevant
+(the body may not run), and if anything of the body is kept, the variables of the condition
+become relevant too. An if whose body is removed completely is dropped with its condition.
+
+Inputs are independent of each other, so dropping an input() call doesn't change what the
+remaining ones can be, and both branches of a dropped if together cover all inputs, so the
+sliced program has a failing assert exactly when the original one has.
+'''
+
+
+def value_uses(value) -> Set[str]:
+    if isinstance(value, (parser.Expr, parser.Comp)):
+        return value_uses(value.l) | value_uses(value.r)
+    if isinstance(value, parser.Var):
+        return {value}
+    return set()
+
+
+# kept assignments (in order) and the variables relevant before them
+def _slice_assignments(assignments: List[parser.Assignment], relevant: Set[str]):
+    kept = []
+    for assignment in reversed(assignments):
+        if assignment.lhs in relevant:
+            kept.append(assignment)
+            relevant = (relevant - {assignment.lhs}) | value_uses(assignment.rhs)
+    kept.reverse()
+    return kept, relevant
+
+
+def slice_program(program: parser.Program) -> parser.Program:
+    relevant = value_uses(program.postCondition)
+    commands: List[parser.Command] = []
+    for command in reversed(program.commands):
+        if isinstance(command, parser.If):
+            body, body_relevant = _slice_assignments(command.body, relevant)
+            if body:
+                commands.append(command if len(body) == len(command.body) else parser.If(command.condition, body))
+                relevant = relevant | body_relevant | value_uses(command.condition)
+        elif command.lhs in relevant:
+            commands.append(command)
+            relevant = (relevant - {command.lhs}) | value_uses(command.rhs)
+    commands.reverse()
+    if len(commands) == len(program.commands) and all(a is b for a, b in zip(commands, program.commands)):
+        return program
+
+    variables = set()
+    for command in commands:
+        for assignment in (command.body if isinstance(command, parser.If) else [command]):
+            variables.add(assignment.lhs)
+    return parser.Program(commands, program.postCondition, variables)
@@ -0,0 +1,356 @@
+import math
+import weakref
+from collections import ChainMap
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import interval
+import lia
+import main
+import parser.parser as parser
+
+'''
+Engine without path enumeration: the program is turned into one term per variable.
+
+Every assignment gives the variable a new term (SSA form). An if becomes a Guard - its
+condition, evaluated on the terms at that point - and a variable written in its body gets the
+term ite(guard, after, before), which is kept as  before + [guard] (after - before)  where
+[guard] d means "d if the guard holds, else 0". A term is a linear form over the inputs plus
+such guarded parts (at most one per guard, so sums of ites of the same if are merged) plus
+products of two non-constant terms. No term is ever copied per path, so the encoding grows
+with the program, not with the number of paths.
+
+The assert fails if "left - right negated-op 0" can hold. That is decided by a depth-first
+search over obligations "term op 0":
+ - the bounds of the term (an undecided guarded part is between 0 and its own bounds) can
+   show that the obligation always or never holds without splitting anything,
+ - otherwise, if the term still has a guarded part whose guard isn't chosen yet, the search
+   splits on that guard (lazily, only for guards the obligations need) and adds the guard's
+   condition (or its negation) as a new obligation,
+ - a term without undecided parts is a linear constraint over the inputs, and branches whose
+   constraints lia.check finds unsatisfiable are cut off immediately.
+'''
+
+Linear = main.Variable
+
+
+class Guard:
+    __slots__ = ("term", "op", "index")
+
+    # the condition "term op 0" of the if at commands[index]
+    def __init__(self, term: "Term", op: str, index: int) -> None:
+        self.term = term
+        self.op = op
+        self.index = index
+
+
+class Product:
+    __slots__ = ("left", "right")
+
+    def __init__(self, left: "Term", right: "Term") -> None:
+        self.left = left
+        self.right = right
+
+
+class Term:
+    __slots__ = ("linear", "guarded", "products", "__weakref__")
+    # interned like main.Variable, equal terms are the same object (the parts are interned already,
+    # so they are compared by identity)
+    _table: "weakref.WeakValueDictionary[tuple, Term]" = weakref.WeakValueDictionary()
+
+    # linear + sum([guard] delta) + sum(times * product), guarded is sorted by guard index
+    def __new__(cls, linear: Linear, guarded: Tuple[Tuple[Guard, "Term"], ...] = (),
+                products: Tuple[Tuple[Product, int], ...] = ()) -> "Term":
+        key = (linear, tuple((id(guard), id(delta)) for guard, delta in guarded),
+               tuple((id(product), times) for product, times in products))
+        result = cls._table.get(key)
+        if result is None:
+            result = object.__new__(cls)
+            result.linear = linear
+            result.guarded = guarded
+            result.products = products
+            cls._table[key] = result
+        return result
+
+    def is_linear(self) -> bool:
+        return not self.guarded and not self.products
+
+    def is_zero(self) -> bool:
+        return self is ZERO
+
+    def is_constant(self) -> bool:
+        return self.is_linear() and self.linear.is_constant()
+
+
+# a variable that is only assigned in the body of an if that may not run
+class Undefined:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+ZERO_LINEAR = Linear()
+ZERO = Term(ZERO_LINEAR)
+ZERO_INTERVAL = interval.Interval(0, 0)
+
+
+# results of scale and add while a program is encoded, with the operands kept alive so their ids stay valid
+_cache: Dict[tuple, tuple] = {}
+
+
+def scale(term: Term, times: int) -> Term:
+    if times == 0:
+        return ZERO
+    if times == 1 or term is ZERO:
+        return term
+    key = (id(term), None, times)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached[-1]
+    result = Term(term.linear.scale(times),
+                  tuple((guard, scale(delta, times)) for guard, delta in term.guarded),
+                  tuple((product, value * times) for product, value in term.products))
+    _cache[key] = (term, result)
+    return result
+
+
+# left + times * right, guarded parts of the same guard are added together
+def add(left: Term, right: Term, times: int = 1) -> Term:
+    if right.is_linear():
+        if right is ZERO:
+            return left
+        return Term(left.linear.combine(right.linear, times), left.guarded, left.products)
+    key = (id(left), id(right), times)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached[-1]
+    result = _add(left, right, times)
+    _cache[key] = (left, right, result)
+    return result
+
+
+def _add(left: Term, right: Term, times: int) -> Term:
+    linear = left.linear.combine(right.linear, times)
+
+    guarded = []
+    i = j = 0
+    while i < len(left.guarded) or j < len(right.guarded):
+        if j == len(right.guarded) or (i < len(left.guarded) and left.guarded[i][0].index < right.guarded[j][0].index):
+            guarded.append(left.guarded[i])
+            i += 1
+        elif i == len(left.guarded) or right.guarded[j][0].index < left.guarded[i][0].index:
+            guarded.append((right.guarded[j][0], scale(right.guarded[j][1], times)))
+            j += 1
+        else:
+            delta = add(left.guarded[i][1], right.guarded[j][1], times)
+            if not delta.is_zero():
+                guarded.append((left.guarded[i][0], delta))
+            i += 1
+            j += 1
+
+    products = dict(left.products)
+    for product, value in right.products:
+        products[product] = products.get(product, 0) + value * times
+    return Term(linear, tuple(guarded), tuple((product, value) for product, value in products.items() if value != 0))
+
+
+def multiply(left: Term, right: Term) -> Term:
+    if left.is_constant():
+        return scale(right, left.linear.constant)
+    if right.is_constant():
+        return scale(left, right.linear.constant)
+    # only fails if the search needs the value of this product
+    return Term(ZERO_LINEAR, (), ((Product(left, right), 1),))
+
+
+def ite(guard: Guard, then: Term, other: Term) -> Term:
+    delta = add(then, other, -1)
+    if delta.is_zero():
+        return other
+    return add(other, Term(ZERO_LINEAR, ((guard, delta),)))
+
+
+class Encoding:
+    def __init__(self, program: parser.Program) -> None:
+        self.inputs = 0
+        self.env: Dict[str, Union[Term, Undefined]] = {}
+        self.guards: List[Guard] = []
+        for index, command in enumerate(program.commands):
+            if isinstance(command, parser.If):
+                self.encode_if(command, index)
+            else:
+                self.env[command.lhs] = self.expression(command.rhs, self.env)
+        condition = program.postCondition
+        # the assert fails when the negated condition holds
+        self.target = (self.difference(condition, self.env), interval.NEGATED[condition.op])
+
+    def value(self, v: parser.Value, env: Mapping[str, Union[Term, Undefined]]) -> Term:
+        if isinstance(v, parser.Constant):
+            return Term(Linear((), v))
+        if isinstance(v, parser.Input):
+            self.inputs += 1
+            return Term(Linear.input(f"i{self.inputs}"))
+        result = env[v]
+        if isinstance(result, Undefined):
+            raise AssertionError(f"Variable {v} may be undefined")
+        return result
+
+    def expression(self, e, env: Mapping[str, Union[Term, Undefined]]) -> Term:
+        if not isinstance(e, parser.Expr):
+            return self.value(e, env)
+        left = self.value(e.l, env)
+        right = self.value(e.r, env)
+        if e.op == "+":
+            return add(left, right)
+        if e.op == "-":
+            return add(left, right, -1)
+        return multiply(left, right)
+
+    def difference(self, cond: parser.Comp, env: Mapping[str, Union[Term, Undefined]]) -> Term:
+        left = self.value(cond.l, env)
+        return add(left, self.value(cond.r, env), -1)
+
+    def encode_if(self, command: parser.If, index: int) -> None:
+        term = self.difference(command.condition, self.env)
+        if term.is_constant():
+            # decided without any input, the body runs always or never
+            if main.OPERATIONS[command.condition.op](term.linear.constant, 0):
+                for assignment in command.body:
+                    self.env[assignment.lhs] = self.expression(assignment.rhs, self.env)
+            return
+        guard = Guard(term, command.condition.op, index)
+        self.guards.append(guard)
+        # only the written variables are copied, the body reads through to env
+        written: Dict[str, Term] = {}
+        reads = ChainMap(written, self.env)
+        for assignment in command.body:
+            written[assignment.lhs] = self.expression(assignment.rhs, reads)
+        for name, value in written.items():
+            before = self.env.get(name)
+            if before is None or isinstance(before, Undefined):
+                self.env[name] = Undefined(name)
+            else:
+                self.env[name] = ite(guard, value, before)
+
+
+# the linear form of term under the chosen guards, or the first guard that still has to be chosen
+# memo only holds finished linear forms, which don't depend on guards that aren't chosen yet
+def linearize(term: Term, choices: Dict[Guard, bool], memo: Dict[int, Linear]) -> Union[Linear, Guard]:
+    result = memo.get(id(term))
+    if result is not None:
+        return result
+    result = term.linear
+    for guard, delta in term.guarded:
+        choice = choices.get(guard)
+        if choice is None:
+            return guard
+        if choice:
+            value = linearize(delta, choices, memo)
+            if isinstance(value, Guard):
+                return value
+            result = result + value
+    for product, times in term.products:
+        left = linearize(product.left, choices, memo)
+        if isinstance(left, Guard):
+            return left
+        right = linearize(product.right, choices, memo)
+        if isinstance(right, Guard):
+            return right
+        if left.is_constant():
+            value = right.scale(left.constant)
+        elif right.is_constant():
+            value = left.scale(right.constant)
+        else:
+            raise AssertionError("Cant multiply variable by variable")
+        result = result.combine(value, times)
+    memo[id(term)] = result
+    return result
+
+
+# values the term can have under the chosen guards, inputs are unbounded
+def bounds(term: Term, choices: Dict[Guard, bool], memo: Dict[int, interval.Interval]) -> interval.Interval:
+    result = memo.get(id(term))
+    if result is not None:
+        return result
+    if term.linear.is_constant():
+        result = interval.Interval(term.linear.constant, term.linear.constant)
+    else:
+        result = interval.Interval()
+    for guard, delta in term.guarded:
+        if result.lo == -math.inf and result.hi == math.inf:
+            break
+        choice = choices.get(guard)
+        if choice is False:
+            continue
+        part = bounds(delta, choices, memo)
+        result = result + (part if choice else part.join(ZERO_INTERVAL))
+    for product, times in term.products:
+        if result.lo == -math.inf and result.hi == math.inf:
+            break
+        part = bounds(product.left, choices, memo) * bounds(product.right, choices, memo)
+        result = result + part * interval.Interval(times, times)
+    memo[id(term)] = result
+    return result
+
+
+class _Branch:
+    def __init__(self, pending: List[Tuple[Term, str]], choices: Dict[Guard, bool], memo: Dict[int, Linear],
+                 constraints: List[lia.Constraint], model: Optional[lia.Model]) -> None:
+        self.pending = pending
+        self.choices = choices
+        self.memo = memo
+        self.constraints = constraints
+        self.model = model
+
+
+def ssa_check(parsed: parser.Program) -> bool:
+    """True if the assert can be false, raises AssertionError if that can't be decided."""
+    try:
+        encoding = Encoding(parsed)
+    finally:
+        _cache.clear()
+    branches = [_Branch([encoding.target], {}, {}, [], None)]
+    unknown = False
+    while branches:
+        branch = branches.pop()
+        alive = True
+        while alive and branch.pending:
+            term, op = branch.pending[-1]
+            values = bounds(term, branch.choices, {})
+            if interval.narrow(values, op, ZERO_INTERVAL).is_empty():
+                alive = False
+                break
+            if interval.narrow(values, interval.NEGATED[op], ZERO_INTERVAL).is_empty():
+                branch.pending.pop()
+                continue
+
+            result = linearize(term, branch.choices, branch.memo)
+            if isinstance(result, Guard):
+                # the else branch is explored after the then branch
+                for choice, guard_op in ((False, interval.NEGATED[result.op]), (True, result.op)):
+                    choices = dict(branch.choices)
+                    choices[result] = choice
+                    branches.append(_Branch(branch.pending + [(result.term, guard_op)], choices,
+                                            dict(branch.memo), list(branch.constraints), branch.model))
+                alive = False
+                break
+            branch.pending.pop()
+            constraint = lia.make(dict(result.terms), result.constant, op)
+            if constraint is True:
+                continue
+            if constraint is False:
+                alive = False
+                break
+            branch.constraints.append(constraint)
+            feasible, model = lia.check(branch.constraints, branch.model)
+            if feasible is None:
+                unknown = True
+            if not feasible:
+                alive = False
+                break
+            branch.model = model
+        if alive:
+            return True
+    if unknown:
+        raise AssertionError("Cant decide the condition")
+    return False
@@ -0,0 +1,187 @@
+import contextlib
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import fuzz
+import interval
+import lia
+import main
+import parser.parser as parser
+
+'''
+Statistics of the symbolic executor for one or more eval_file runs.
+
+collect() replaces the functions of main (and the pre-passes and the solver) by counting and
+timing wrappers and puts the originals back when it ends. Nothing is wrapped outside of it, so
+when no statistics are collected the engine runs exactly the code it runs without this module.
+
+    with stats.collect() as collected:
+        main.eval_file(parsed)
+    print(collected.as_dict())
+
+Recorded: states created (new and copies), states found unreachable, states alive at the peak,
+calls and results of is_always_true / split_by_cond / eval_if, solver calls, time per phase
+(interval pre-pass, fuzzing, path exploration, checking the assert, solver) and the if that
+split the most states.
+'''
+
+PHASES = ("total", "intervals", "fuzz", "explore", "check", "solver")
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.programs = 0
+        self.states_created = 0
+        self.state_copies = 0
+        self.states_pruned = 0
+        self.peak_live_states = 0
+        self.always_true_calls = 0
+        self.always_true = 0
+        self.split_calls = 0
+        self.if_calls = 0
+        self.splits = 0
+        self.solver_calls = 0
+        self.time: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        # (program number, index of the if in the program) -> [splits, text of the condition]
+        self.splits_by_if: Dict[Tuple[int, int], List] = {}
+        self._live: "weakref.WeakSet[main.State]" = weakref.WeakSet()
+        self._pruned: "weakref.WeakSet[main.State]" = weakref.WeakSet()
+        self._if_index: Dict[int, int] = {}
+
+    def start_program(self, program: parser.Program) -> None:
+        self.programs += 1
+        # by the condition, which an if rebuilt by slicing (with part of its body) keeps
+        self._if_index = {id(command.condition): index for index, command in enumerate(program.commands)
+                          if isinstance(command, parser.If)}
+
+    def state_created(self, state: "main.State") -> None:
+        self.states_created += 1
+        self._live.add(state)
+        self.peak_live_states = max(self.peak_live_states, len(self._live))
+
+    def state_invalid(self, state: "main.State") -> None:
+        if state not in self._pruned:
+            self._pruned.add(state)
+            self.states_pruned += 1
+
+    def if_split(self, command: parser.If) -> None:
+        self.splits += 1
+        key = (self.programs, self._if_index.get(id(command.condition), -1))
+        entry = self.splits_by_if.setdefault(key, [0, str(command.condition)])
+        entry[0] += 1
+
+    def hottest_if(self) -> Optional[Dict[str, Any]]:
+        if not self.splits_by_if:
+            return None
+        (program, index), (splits, condition) = max(self.splits_by_if.items(), key=lambda item: item[1][0])
+        return {"program": program, "command": index, "condition": condition, "splits": splits}
+
+    def as_dict(self) -> Dict[str, Any]:
+        time_ms = {phase: seconds * 1000 for phase, seconds in self.time.items()}
+        # exploration is what's left of eval_file after the other phases (the solver runs inside them)
+        time_ms["explore"] = max(0.0, time_ms["total"] - time_ms["intervals"] - time_ms["fuzz"] - time_ms["check"])
+        return {
+            "programs": self.programs,
+            "states_created": self.states_created,
+            "state_copies": self.state_copies,
+            "states_pruned": self.states_pruned,
+            "peak_live_states": self.peak_live_states,
+            "is_always_true": {"calls": self.always_true_calls, "true": self.always_true},
+            "split_by_cond_calls": self.split_calls,
+            "eval_if": {"calls": self.if_calls, "splits": self.splits},
+            "solver_calls": self.solver_calls,
+            "time_ms": time_ms,
+            "hottest_if": self.hottest_if(),
+        }
+
+
+def _timed(stats: Stats, phase: str, function: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.time[phase] += time.perf_counter() - start
+    return wrapper
+
+
+def _wrappers(stats: Stats, original: Dict[Tuple[Any, str], Callable]) -> Dict[Tuple[Any, str], Callable]:
+    def state_init(self, *args, **kwargs) -> None:
+        original[main.State, "__init__"](self, *args, **kwargs)
+        stats.state_created(self)
+
+    def state_copy(self):
+        stats.state_copies += 1
+        return original[main.State, "copy"](self)
+
+    def is_valid(self) -> bool:
+        valid = original[main.State, "is_valid"](self)
+        if not valid:
+            stats.state_invalid(self)
+        return valid
+
+    def is_always_true(cond, state) -> bool:
+        stats.always_true_calls += 1
+        result = original[main, "is_always_true"](cond, state)
+        stats.always_true += bool(result)
+        return result
+
+    def split_by_cond(cond, state, original_state) -> bool:
+        stats.split_calls += 1
+        return original[main, "split_by_cond"](cond, state, original_state)
+
+    def eval_if(command, state):
+        stats.if_calls += 1
+        new_state = original[main, "eval_if"](command, state)
+        if new_state is not None:
+            stats.if_split(command)
+        return new_state
+
+    def solver_check(*args, **kwargs):
+        stats.solver_calls += 1
+        return original[lia, "check"](*args, **kwargs)
+
+    eval_file = _timed(stats, "total", original[main, "eval_file"])
+
+    def program_wrapper(parsed, *args, **kwargs):
+        stats.start_program(parsed)
+        return eval_file(parsed, *args, **kwargs)
+
+    return {
+        (main.State, "__init__"): state_init,
+        (main.State, "copy"): state_copy,
+        (main.State, "is_valid"): is_valid,
+        (main, "is_always_true"): is_always_true,
+        (main, "split_by_cond"): split_by_cond,
+        (main, "eval_if"): eval_if,
+        (main, "can_be_false"): _timed(stats, "check", original[main, "can_be_false"]),
+        (main, "eval_file"): program_wrapper,
+        (interval, "interval_check"): _timed(stats, "intervals", original[interval, "interval_check"]),
+        (fuzz, "find_witness"): _timed(stats, "fuzz", original[fuzz, "find_witness"]),
+        (lia, "check"): _timed(stats, "solver", solver_check),
+    }
+
+
+@contextlib.contextmanager
+def collect(stats: Optional[Stats] = None) -> Iterator[Stats]:
+    """Collects statistics of everything main.eval_file does inside the with block."""
+    stats = stats if stats is not None else Stats()
+    targets = [(main.State, "__init__"), (main.State, "copy"), (main.State, "is_valid"),
+               (main, "is_always_true"), (main, "split_by_cond"), (main, "eval_if"), (main, "can_be_false"),
+               (main, "eval_file"), (interval, "interval_check"), (fuzz, "find_witness"), (lia, "check")]
+    original = {(owner, name): getattr(owner, name) for owner, name in targets}
+    try:
+        for (owner, name), wrapper in _wrappers(stats, original).items():
+            setattr(owner, name, wrapper)
+        yield stats
+    finally:
+        for (owner, name), function in original.items():
+            setattr(owner, name, function)
+
+
+def eval_with_stats(parsed: parser.Program, **eval_options) -> Tuple[bool, Dict[str, Any]]:
+    """eval_file(parsed, **eval_options) and the statistics of the run."""
+    with collect() as stats:
+        result = main.eval_file(parsed, **eval_options)
+    return result, stats.as_dict()
@@ -0,0 +1,49 @@
+import random
+from typing import Optional
+
+import compiler
+import concrete
+import parser.parser as parser
+from benchmarks.generator import Knobs, generate
+
+'''
+Brute force the engine tests compare against: programs of benchmarks/generator.py with the verdict
+it expects, run by the compiled program (compiler.py) on random inputs.
+'''
+
+PROGRAMS = 200
+INPUTS = 200
+KNOBS = [Knobs(), Knobs(variables=3, ifs=6, body=3, assignments=2), Knobs(multiplication=0.3)]
+# programs that multiply variables with each other
+NONLINEAR_KNOBS = [Knobs(var_by_var=True), Knobs(multiplication=0.5, var_by_var=True)]
+
+
+def programs(knobs=KNOBS, count: int = PROGRAMS):
+    for seed in range(count):
+        text, expected = generate(knobs[seed % len(knobs)], seed)
+        yield seed, parser.parse_string(text), expected
+
+
+def random_inputs(program: parser.Program, rng: random.Random):
+    slots = concrete.input_slots(program)
+    for index in range(INPUTS):
+        bound = 10 if index < INPUTS // 2 else 1000
+        yield {id(node): rng.randint(-bound, bound) for node, _ in slots}
+
+
+# the input() calls slicing keeps are the same objects, so they get the same value
+def assert_holds(program: parser.Program, inputs) -> bool:
+    run = compiler.compile_program(program)
+    return run([inputs[id(node)] for node, _ in concrete.input_slots(program)])[1]
+
+
+def can_fail(program: parser.Program, seed: int) -> bool:
+    return any(not assert_holds(program, inputs) for inputs in random_inputs(program, random.Random(seed)))
+
+
+def assert_verdict(verdict: Optional[bool], program: parser.Program, seed: int, expected: Optional[str]) -> None:
+    """verdict (True when the assert can be false, None when undecided) agrees with brute force."""
+    if expected == "false" or can_fail(program, seed):
+        assert verdict in (True, None), seed
+    if expected == "true":
+        assert verdict in (False, None), seed
@@ -0,0 +1,53 @@
+import itertools
+import random
+
+import compiler
+import interval
+import main
+import parser.parser as parser
+
+'''
+Random differential test of the interval pre-pass (interval.py) against brute force. The programs
+of benchmarks/generator.py compare variables with each other, which intervals can't decide, so
+these are small programs of two inputs clamped by ifs against constants. Whenever interval_check
+decides one, the verdict must match running the compiled program (compiler.py) on every input of
+a grid that covers all its constants, and eval_file without the pre-pass.
+
+Run from the repository root: python -m pytest tests
+'''
+
+PROGRAMS = 300
+GRID = range(-45, 46)
+OPS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+def clamp_program(rng: random.Random) -> str:
+    lines = ["x = input()", "y = input()"]
+    for _ in range(rng.randint(2, 5)):
+        name, target, k = rng.choice("xy"), rng.choice("xy"), rng.randint(-10, 10)
+        kind = rng.randrange(4)
+        if kind == 0:
+            # clamp from below or above
+            op = rng.choice(("<", ">"))
+            lines += [f"if {name} {op} {k} then", f"    {name} = {k}", "end"]
+        elif kind == 1:
+            lines.append(f"{target} = {rng.choice([str(k), f'{target} + {rng.randint(-5, 5)}'])}")
+        else:
+            value = rng.choice([str(rng.randint(-10, 10)), f"{target} + {rng.randint(-5, 5)}", f"{name} - 1"])
+            lines += [f"if {name} {rng.choice(OPS)} {k} then", f"    {target} = {value}", "end"]
+    lines.append(f"assert {rng.choice('xy')} {rng.choice(OPS)} {rng.randint(-15, 15)}")
+    return "\n".join(lines) + "\n"
+
+
+def test_interval_verdicts_agree_with_brute_force():
+    decided = 0
+    for seed in range(PROGRAMS):
+        program = parser.parse_string(clamp_program(random.Random(seed)))
+        verdict = interval.interval_check(program)
+        if verdict is None:
+            continue
+        decided += 1
+        run = compiler.compile_program(program)
+        assert verdict == any(not run(list(inputs))[1] for inputs in itertools.product(GRID, repeat=2)), seed
+        assert main.eval_file(program, intervals=False) == verdict, seed
+    assert decided > PROGRAMS // 4
@@ -0,0 +1,67 @@
+import math
+import random
+
+from intset import EMPTY, FULL, IntervalSet
+
+'''
+Random test of intset.py against Python sets: sets built by random removals, unions and range
+intersections over a small universe are compared member by member with the same operations on
+sets of ints, and checked to stay in normal form (sorted, disjoint, non-adjacent intervals).
+
+Run from the repository root: python -m pytest tests
+'''
+
+SETS = 300
+STEPS = 12
+UNIVERSE = range(-30, 31)
+
+
+def members(numbers: IntervalSet) -> set:
+    return {number for number in UNIVERSE if number in numbers}
+
+
+def assert_normal(numbers: IntervalSet) -> None:
+    for low, high in numbers:
+        assert low <= high, numbers
+    for first, last in numbers.gaps():
+        assert first <= last, numbers
+
+
+def random_range(rng: random.Random):
+    return rng.randint(-25, 25), rng.randint(-25, 25)
+
+
+def test_operations_agree_with_python_sets():
+    rng = random.Random(0)
+    for _ in range(SETS):
+        low, high = random_range(rng)
+        numbers, expected = IntervalSet.range(low, high), set(range(low, high + 1))
+        for _ in range(STEPS):
+            step = rng.choice(("remove", "union", "intersect_range"))
+            low, high = random_range(rng)
+            if step == "remove":
+                numbers, expected = numbers.remove(low), expected - {low}
+            elif step == "union":
+                numbers, expected = numbers.union(IntervalSet.range(low, high)), expected | set(range(low, high + 1))
+            else:
+                numbers, expected = numbers.intersect_range(low, high), expected & set(range(low, high + 1))
+            assert_normal(numbers)
+            assert members(numbers) == expected
+            assert numbers.is_empty() == (not expected)
+            if expected:
+                assert (numbers.min(), numbers.max()) == (min(expected), max(expected))
+                assert numbers.is_point() == (len(expected) == 1)
+                for number in UNIVERSE:
+                    nearest = min(expected, key=lambda member: (abs(member - number), member))
+                    assert numbers.nearest(number) == nearest
+            else:
+                assert numbers.nearest(0) is None
+
+
+def test_unbounded_sets():
+    assert FULL.remove(0) == IntervalSet([-math.inf, 1], [-1, math.inf])
+    assert FULL.remove(0).union(IntervalSet.point(0)) == FULL
+    assert FULL.intersect_range(-math.inf, 3) == IntervalSet.range(high=3)
+    assert FULL.intersect_range(5, 3) == EMPTY
+    assert IntervalSet.range(low=0).nearest(-7) == 0
+    assert -10 ** 30 in FULL and 10 ** 30 not in IntervalSet.range(high=0)
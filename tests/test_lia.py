@@ -0,0 +1,89 @@
+import itertools
+import random
+
+import lia
+
+'''
+Tests of lia.py: a few systems with a known answer (equality elimination with and without a unit
+coefficient, Fourier-Motzkin without an integer point, disequality splits), and random systems over
+a bounded box checked against enumerating every point of the box.
+
+Run from the repository root: python -m pytest tests
+'''
+
+SYSTEMS = 400
+NAMES = ("x", "y", "z")
+BOX = 4
+
+
+def assert_model(constraints, expected_sat=True):
+    result, model = lia.check(constraints)
+    assert result is expected_sat, constraints
+    if result:
+        assert all(lia.satisfies(constraint, model) for constraint in constraints), model
+    return model
+
+
+def test_normalization():
+    # 2x + 2y < 3  is  x + y <= 1  on integers
+    assert lia.make({"x": 2, "y": 2}, -3, "<") == lia.make({"x": 1, "y": 1}, -1, lia.LE)
+    # 2x = 3 and 2x != 3 are decided by the gcd alone
+    assert lia.make({"x": 2}, -3, lia.EQ) is False
+    assert lia.make({"x": 2}, -3, lia.NE) is True
+    assert lia.make({}, 1, lia.LE) is False
+    assert lia.make({"x": 0}, 0, lia.EQ) is True
+
+
+def test_equalities():
+    # x = y + 1, y = 3
+    model = assert_model([lia.make({"x": 1, "y": -1}, -1, lia.EQ), lia.make({"y": 1}, -3, lia.EQ)])
+    assert (model["x"], model["y"]) == (4, 3)
+    # 3x + 5y = 7 has no unit coefficient
+    model = assert_model([lia.make({"x": 3, "y": 5}, -7, lia.EQ), lia.make({"x": 1}, 0, ">=")])
+    assert 3 * model["x"] + 5 * model["y"] == 7
+    # 2x + 4y = 5 has no integer solution
+    assert_model([lia.make({"x": 2, "y": 4}, -5, lia.EQ)], False)
+
+
+def test_inequalities():
+    # 1 <= 3x <= 2 has a rational solution only
+    assert_model([lia.make({"x": 3}, -1, ">="), lia.make({"x": 3}, -2, lia.LE)], False)
+    # x < y < z < x
+    assert_model([lia.make({"x": 1, "y": -1}, 0, "<"), lia.make({"y": 1, "z": -1}, 0, "<"),
+                  lia.make({"z": 1, "x": -1}, 0, "<")], False)
+    model = assert_model([lia.make({"x": 1, "y": 1}, -10, ">="), lia.make({"x": 1}, -3, lia.LE),
+                          lia.make({"y": 1}, -7, lia.LE)])
+    assert (model["x"], model["y"]) == (3, 7)
+
+
+def test_disequalities():
+    # 0 <= x <= 2, x != 0, x != 2
+    model = assert_model([lia.make({"x": 1}, 0, ">="), lia.make({"x": 1}, -2, lia.LE),
+                          lia.make({"x": 1}, 0, lia.NE), lia.make({"x": 1}, -2, lia.NE)])
+    assert model["x"] == 1
+    assert_model([lia.make({"x": 1}, 0, ">="), lia.make({"x": 1}, -1, lia.LE),
+                  lia.make({"x": 1}, 0, lia.NE), lia.make({"x": 1}, -1, lia.NE)], False)
+    assert lia.entails([lia.make({"x": 1}, 0, ">="), lia.make({"x": 1}, 0, lia.NE)], lia.make({"x": 1}, -1, ">="))
+
+
+def random_constraint(rng: random.Random):
+    terms = {name: rng.randint(-3, 3) for name in rng.sample(NAMES, rng.randint(1, len(NAMES)))}
+    return lia.make(terms, rng.randint(-6, 6), rng.choice(("<=", "<", ">=", ">", "==", "!=")))
+
+
+def test_random_systems_agree_with_enumeration():
+    rng = random.Random(0)
+    box = [lia.make({name: 1}, -BOX, lia.LE) for name in NAMES] + [lia.make({name: 1}, BOX, ">=") for name in NAMES]
+    for _ in range(SYSTEMS):
+        constraints = box + [random_constraint(rng) for _ in range(rng.randint(1, 4))]
+        result, model = lia.check(constraints)
+        if False in constraints:
+            assert result is False
+            continue
+        constraints = [constraint for constraint in constraints if constraint is not True]
+        solutions = (dict(zip(NAMES, point)) for point in itertools.product(range(-BOX, BOX + 1), repeat=len(NAMES)))
+        feasible = any(all(lia.satisfies(constraint, point) for constraint in constraints) for point in solutions)
+        if result is not None:
+            assert result == feasible, constraints
+        if result:
+            assert all(lia.satisfies(constraint, model) for constraint in constraints), (constraints, model)
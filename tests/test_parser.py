@@ -0,0 +1,51 @@
+import glob
+import json
+import os
+
+import parser.parser as parser
+
+'''
+Round trip of the programs in programs/ through every way parser.py reads them: parse_file,
+parse_string, parse_stream, and bulk files in the ### and JSONL formats must all give the same
+program (compared by str, which prints every command and the assert).
+
+Run from the repository root: python -m pytest tests
+'''
+
+ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "programs")
+FILES = sorted(glob.glob(os.path.join(ROOT, "*", "*.txt")))
+
+
+def sources():
+    for path in FILES:
+        with open(path) as f:
+            yield os.path.relpath(path, ROOT), f.read()
+
+
+def test_parse_string_and_stream_agree_with_parse_file():
+    assert FILES
+    for path, (name, text) in zip(FILES, sources()):
+        expected = str(parser.parse_file(path))
+        assert str(parser.parse_string(text)) == expected, name
+        assert str(parser.parse_stream(text.splitlines(keepends=True))) == expected, name
+        # Windows line ends and a missing last line end
+        assert str(parser.parse_string(text.replace("\n", "\r\n").rstrip())) == expected, name
+
+
+def test_bulk_files_give_every_program(tmp_path):
+    expected = [(name, str(parser.parse_string(text))) for name, text in sources()]
+    bulk = tmp_path / "corpus.txt"
+    bulk.write_text("".join(f"{parser.DELIMITER} {name}\n{text.rstrip()}\n" for name, text in sources()))
+    jsonl = tmp_path / "corpus.jsonl"
+    jsonl.write_text("".join(json.dumps({"name": name, "program": text}) + "\n\n" for name, text in sources()))
+    for path in (bulk, jsonl):
+        assert [(name, str(program)) for name, program in parser.iter_programs(str(path))] == expected
+
+
+# by their position among all programs of the file
+def test_programs_without_a_name_are_numbered():
+    text = "x = input()\nassert x > 0\n"
+    lines = ["\n", "### \n", text, "###\n", "\n", "### named\n", text, "###\n", text]
+    assert [name for name, _ in parser.split_sources(lines)] == ["<1>", "named", "<3>"]
+    lines = [json.dumps({"program": text}), json.dumps({"name": 7, "program": text})]
+    assert [name for name, _ in parser.jsonl_sources(lines)] == ["<1>", "7"]
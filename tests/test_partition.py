@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import compiler
+import concrete
+import fuzz
+import main
+import partition
+from benchmarks.generator import Knobs
+from tests.brute import NONLINEAR_KNOBS, PROGRAMS, assert_verdict, programs, random_inputs
+
+'''
+Random differential tests of partition.py and compiler.py against brute force: the compiled
+program must compute the same variables and assert as concrete.execute on random inputs, and the
+verdicts of partition_check on programs of benchmarks/generator.py, with and without the NumPy
+batch, are checked against the runs of the compiled program and against eval_file. The engine
+doesn't take a condition that reads two inputs, which most conditions of those programs do, so
+its programs have fewer variables.
+
+Run from the repository root: python -m pytest tests
+'''
+
+# partition_check decides about two programs in three of these
+PARTITION_KNOBS = [Knobs(variables=2), Knobs(variables=2, ifs=2), Knobs(variables=2, ifs=3, body=1, multiplication=0.3)]
+
+
+def all_programs():
+    return itertools.chain(programs(), programs(NONLINEAR_KNOBS))
+
+
+def test_compiled_program_agrees_with_concrete_execution():
+    for seed, program, _ in all_programs():
+        run = compiler.compile_program(program)
+        slots = concrete.input_slots(program)
+        for inputs in random_inputs(program, random.Random(seed)):
+            values = [inputs[id(node)] for node, _ in slots]
+            assert run(values) == concrete.execute(program, values), seed
+
+
+def test_partition_verdicts_agree_with_brute_force(monkeypatch):
+    decided = 0
+    for seed, program, expected in programs(PARTITION_KNOBS):
+        verdict = partition.partition_check(program)
+        assert_verdict(verdict, program, seed, expected)
+        if verdict is None:
+            continue
+        decided += 1
+        try:
+            engine = main.eval_file(program)
+        except AssertionError:
+            # the engine gave up, e.g. on x * y
+            engine = None
+        assert engine in (verdict, None), seed
+        with monkeypatch.context() as patch:
+            # one compiled run per point instead of the NumPy batch
+            patch.setattr(fuzz, "np", None)
+            assert partition.partition_check(program) == verdict, seed
+    assert decided > PROGRAMS // 2
@@ -0,0 +1,81 @@
+import itertools
+import math
+import pickle
+import random
+
+import lia
+import main
+import poly
+from tests.brute import NONLINEAR_KNOBS, assert_verdict, programs
+
+'''
+Tests of poly.py: monomials are interned and keep their factors, their bounds are the products of
+the ranges of the factors, random nonlinear systems over a bounded box are checked against
+enumerating every point of the box, and the verdicts of eval_file on var * var programs of
+benchmarks/generator.py against brute force.
+
+Run from the repository root: python -m pytest tests
+'''
+
+SYSTEMS = 300
+BOX = 4
+
+
+def test_monomials_are_interned():
+    xy = poly.product("x", "y")
+    assert xy is poly.product("y", "x")
+    assert poly.product(xy, "x") == "x*x*y"
+    assert poly.product(xy, "x").factors == (("x", 2), ("y", 1))
+    assert poly.product("x", "x") is poly.of({"x": 2})
+    assert poly.of({"x": 1}) == "x" and poly.of({"x": 0}) is None
+    assert pickle.loads(pickle.dumps(xy)) is xy
+    assert poly.is_nonlinear([lia.make({xy: 1, "x": 2}, 0, lia.LE)])
+    assert not poly.is_nonlinear([lia.make({"x": 2}, 0, lia.LE)])
+
+
+def test_bounds():
+    ranges = {"x": (-3, 2), "y": (1, 4), "z": (0, 0), "w": (-math.inf, math.inf)}.get
+    assert poly.bounds(poly.of({"x": 2}), ranges) == (0, 9)
+    assert poly.bounds(poly.of({"x": 3}), ranges) == (-27, 8)
+    assert poly.bounds(poly.of({"x": 1, "y": 1}), ranges) == (-12, 8)
+    assert poly.bounds(poly.of({"w": 2}), ranges) == (0, math.inf)
+    # a zero factor makes the product 0, even of an unbounded one
+    assert poly.bounds(poly.of({"w": 1, "z": 1}), ranges) == (0, 0)
+
+
+def value(name: str, point) -> int:
+    return math.prod(point[factor] ** exponent for factor, exponent in poly.factors(name))
+
+
+def test_random_systems_agree_with_enumeration():
+    rng = random.Random(0)
+    names = ["x", "y", poly.of({"x": 2}), poly.of({"x": 1, "y": 1}), poly.of({"y": 3})]
+    # the ranges are constraints too, as in main.State.constraints
+    box = [lia.make({name: 1}, -BOX, lia.LE) for name in "xy"] + [lia.make({name: 1}, BOX, ">=") for name in "xy"]
+    for _ in range(SYSTEMS):
+        constraints = list(box)
+        for _ in range(rng.randint(1, 3)):
+            terms = {name: rng.randint(-3, 3) for name in rng.sample(names, rng.randint(1, 3))}
+            constraint = lia.make(terms, rng.randint(-10, 10), rng.choice(("<=", "<", ">=", "==", "!=")))
+            if constraint is not True:
+                constraints.append(constraint)
+        if False in constraints or not poly.is_nonlinear(constraints):
+            continue
+        result = poly.check(constraints, lambda name: (-BOX, BOX))
+        points = (dict(zip("xy", point)) for point in itertools.product(range(-BOX, BOX + 1), repeat=2))
+        feasible = any(all(lia.satisfies(constraint, {name: value(name, point) for name, _ in constraint[0]})
+                           for constraint in constraints) for point in points)
+        assert result in (feasible, None), constraints
+
+
+def test_var_by_var_verdicts_agree_with_brute_force():
+    decided = 0
+    for seed, program, expected in programs(NONLINEAR_KNOBS):
+        try:
+            verdict = main.eval_file(program)
+        except AssertionError:
+            # the engine gave up
+            verdict = None
+        assert_verdict(verdict, program, seed, expected)
+        decided += verdict is not None
+    assert decided > 0
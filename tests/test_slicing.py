@@ -0,0 +1,35 @@
+import random
+
+import main
+import slicing
+from tests.brute import assert_holds, assert_verdict, programs, random_inputs
+
+'''
+Random differential test of slicing.py against brute force: programs of benchmarks/generator.py
+are run by the compiled program (compiler.py) before and after slicing on the same inputs, and
+the verdicts of eval_file with and without the slicing pass are checked against those runs.
+
+Run from the repository root: python -m pytest tests
+'''
+
+
+def test_sliced_program_has_the_same_assert_on_every_input():
+    for seed, program, _ in programs():
+        sliced = slicing.slice_program(program)
+        for inputs in random_inputs(program, random.Random(seed)):
+            assert assert_holds(sliced, inputs) == assert_holds(program, inputs), seed
+
+
+def test_verdicts_agree_with_brute_force():
+    for seed, program, expected in programs():
+        verdicts = []
+        for slicing_pass in (True, False):
+            try:
+                verdicts.append(main.eval_file(program, slicing_pass=slicing_pass))
+            except AssertionError:
+                # the engine gave up, e.g. on x * y
+                verdicts.append(None)
+        for verdict in verdicts:
+            assert_verdict(verdict, program, seed, expected)
+        if None not in verdicts:
+            assert verdicts[0] == verdicts[1], seed
@@ -0,0 +1,32 @@
+import itertools
+
+import main
+import ssa
+from tests.brute import NONLINEAR_KNOBS, assert_verdict, programs
+
+'''
+Random differential test of the SSA engine (ssa.py) against brute force: its verdicts on linear
+and var * var programs of benchmarks/generator.py are checked against the runs of the compiled
+program, and against eval_file wherever both decide the program.
+
+Run from the repository root: python -m pytest tests
+'''
+
+
+def decide(check, program):
+    try:
+        return check(program)
+    except AssertionError:
+        # the engine gave up, e.g. on x * y
+        return None
+
+
+def test_ssa_verdicts_agree_with_brute_force():
+    decided = 0
+    for seed, program, expected in itertools.chain(programs(), programs(NONLINEAR_KNOBS)):
+        verdict = decide(ssa.ssa_check, program)
+        assert_verdict(verdict, program, seed, expected)
+        if verdict is not None:
+            decided += 1
+            assert decide(main.eval_file, program) in (verdict, None), seed
+    assert decided > 0
@@ -0,0 +1,197 @@
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import batch
+import main
+import parser.parser as parser
+import prefix
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+'''
+Watch mode: verifies the programs of a directory again whenever their files change.
+
+Changes are found by comparing the modification time and size of the files; with inotify_simple
+installed, the watcher sleeps on inotify events instead of polling every POLL_INTERVAL. Only the
+changed files are parsed again.
+
+Every file keeps a Session with snapshots of the states before every CHECKPOINT_INTERVAL-th
+command of the (pre-passed) program. After an edit, execution resumes from the last snapshot
+before the first changed command, so an edit near the end of a long program costs only the
+commands after that snapshot. States at a snapshot were merged with the live variables of the old
+program, so a snapshot is only used if those contained the live variables of the new program at
+every command before it (e.g. an edit of the assert can make more variables live).
+
+Every new verdict is printed and the results file is written again.
+'''
+
+POLL_INTERVAL = 0.05
+CHECKPOINT_INTERVAL = 8
+
+
+class Session:
+    def __init__(self, merge: bool = True, intervals: bool = True, fuzz_samples: int = 0,
+                 slicing_pass: bool = True, partition: bool = False) -> None:
+        self.merge = merge
+        self.options = {"intervals": intervals, "fuzz_samples": fuzz_samples, "slicing_pass": slicing_pass,
+                        "partition": partition}
+        # command keys of the program the snapshots were made for
+        self.keys: List[str] = []
+        # live variables the states were merged with after every command
+        self.live: List[Set[str]] = []
+        # index of a command -> states before it
+        self.checkpoints: Dict[int, List[main.State]] = {}
+        # commands executed by the last verify
+        self.executed = 0
+
+    # commands at the start whose snapshots are still valid for the new program
+    def common_prefix(self, keys: List[str], live: List[Set[str]]) -> int:
+        common = 0
+        for old_key, key, old_live, new_live in zip(self.keys, keys, self.live, live):
+            if old_key != key or (self.merge and not old_live >= new_live):
+                break
+            common += 1
+        return common
+
+    def verify(self, parsed: parser.Program) -> bool:
+        """eval_file(parsed), resuming from the snapshots of the previous version of the program."""
+        self.executed = 0
+        parsed, decided = main.pre_passes(parsed, **self.options)
+        if decided is not None:
+            return decided
+
+        keys = [prefix.command_key(command) for command in parsed.commands]
+        live = main.live_variables(parsed) if self.merge else [set() for _ in keys]
+        common = self.common_prefix(keys, live)
+        start = max((index for index in self.checkpoints if index <= common), default=0)
+        self.checkpoints = {index: states for index, states in self.checkpoints.items() if index <= start}
+        self.keys = keys
+        self.live = self.live[:start] + live[start:]
+
+        if start in self.checkpoints:
+            states = [state.copy() for state in self.checkpoints[start]]
+        else:
+            states = [main.State()]
+        for index in range(start, len(parsed.commands)):
+            if index % CHECKPOINT_INTERVAL == 0 and index not in self.checkpoints:
+                self.checkpoints[index] = [state.copy() for state in states]
+            states = main.execute_command(parsed.commands[index], states, live[index] if self.merge else None)
+            self.executed += 1
+        return main.assert_can_fail(parsed.postCondition, states)
+
+
+def _stamps(directory: str) -> Dict[str, Tuple[int, int]]:
+    result = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            status = os.stat(path)
+        except OSError:
+            continue
+        if os.path.isfile(path):
+            result[path] = (status.st_mtime_ns, status.st_size)
+    return result
+
+
+class Watcher:
+    """Yields the files that were created, changed or deleted in directory since the last time."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.stamps: Dict[str, Tuple[int, int]] = {}
+        self.inotify = None
+        if inotify_simple is not None:
+            flags = inotify_simple.flags
+            self.inotify = inotify_simple.INotify()
+            self.inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM
+                                   | flags.CREATE | flags.DELETE | flags.MODIFY)
+
+    def changes(self) -> Set[str]:
+        stamps = _stamps(self.directory)
+        changed = {path for path, stamp in stamps.items() if self.stamps.get(path) != stamp}
+        changed |= self.stamps.keys() - stamps.keys()
+        self.stamps = stamps
+        return changed
+
+    def wait(self) -> None:
+        if self.inotify is not None:
+            self.inotify.read(timeout=1000)
+            # let the editor finish writing before the file is read
+            time.sleep(0.01)
+        else:
+            time.sleep(POLL_INTERVAL)
+
+    def __iter__(self) -> Iterator[Set[str]]:
+        while True:
+            changed = self.changes()
+            if changed:
+                yield changed
+            self.wait()
+
+
+class WatchMode:
+    def __init__(self, directory: str, output: str, timeout: float = 10.0,
+                 eval_options: Optional[dict] = None) -> None:
+        options = dict(eval_options or {})
+        if options.pop("depth_first", False) or options.pop("ssa", False):
+            raise ValueError("watch mode needs the breadth-first engine")
+        self.output = output
+        self.timeout = timeout
+        self.options = options
+        self.watcher = Watcher(directory)
+        self.sessions: Dict[str, Session] = {}
+        self.contents: Dict[str, str] = {}
+        self.results: Dict[str, batch.Result] = {}
+
+    def update(self, path: str) -> Optional[batch.Result]:
+        try:
+            with open(path) as f:
+                text = f.read()
+        except OSError:
+            self.sessions.pop(path, None)
+            self.contents.pop(path, None)
+            self.results.pop(path, None)
+            return None
+        if self.contents.get(path) == text:
+            return None
+        self.contents[path] = text
+
+        start = time.perf_counter()
+        try:
+            parsed = parser.parse_string(text)
+        except batch.PARSE_ERRORS as e:
+            result = batch.invalid_result(path, e, time.perf_counter() - start)
+        else:
+            session = self.sessions.get(path)
+            if session is None:
+                session = self.sessions[path] = Session(**self.options)
+            try:
+                with batch.time_limit():
+                    outcome = session.verify(parsed)
+            except batch.ERRORS as e:
+                # snapshots are copies, so the ones made before the error stay valid
+                outcome = e
+            result = batch.outcome_result(path, outcome, time.perf_counter() - start)
+        self.results[path] = result
+        return result
+
+    def write_results(self) -> None:
+        with open(self.output, "w") as f:
+            for path in sorted(self.results):
+                f.write(str(self.results[path]) + "\n")
+
+    def run(self) -> None:
+        with batch.in_process(self.timeout):
+            for changed in self.watcher:
+                updated = False
+                for path in sorted(changed):
+                    result = self.update(path)
+                    if result is not None:
+                        print(f"{result}  ({result.elapsed * 1000:.1f}ms)", flush=True)
+                    updated = True
+                if updated:
+                    self.write_results()
@@ -0,0 +1,140 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+import compiler
+import concrete
+import fuzz
+import interval
+import lia
+import main
+import parser.parser as parser
+import slicing
+
+'''
+Concrete inputs for which the assert fails (a witness of a "false" verdict).
+
+First from the symbolic states: the (sliced) program is executed like eval_file does, and in the
+first state where the assert can be false, lia.check gives a model of the state's constraints
+together with the negated assert. Input values the model doesn't mention get a value from their
+range. The program is then replayed concretely, naming the input() calls the way
+main.eval_value names them on that path, which maps the model to input slots.
+
+The symbolic search gives up on the same programs eval_file does (x * y, no solver answer); then
+inputs are sampled: with NumPy by fuzz.find_witness, otherwise SAMPLES random inputs drawn around
+the constants of the program. Every witness is checked with the compiled program (compiler.py),
+so a returned witness is always real.
+'''
+
+SAMPLES = 2000
+
+Witness = List[Tuple[str, int]]
+
+
+# the value of an input value closest to 0
+def pick(value: main.Input_value) -> int:
+    return value.values.nearest(0)
+
+
+def _model(cond: parser.Comp, state: main.State) -> Optional[Dict[str, int]]:
+    terms, constant = main.condition_difference(cond, state)
+    negation = lia.make(terms, constant, interval.NEGATED[cond.op])
+    if negation is False:
+        return None
+    feasible, model = lia.check(state.constraints(terms) + [negation], state.model)
+    if not feasible or model is None:
+        return None
+    result = {name: pick(value) for name, value in state.values.items()}
+    result.update(model)
+    return result
+
+
+# inputs of every slot of program, for a run that gives the named input values of model
+def _replay(program: parser.Program, model: Dict[str, int]) -> List[int]:
+    slots = {id(node): index for index, (node, _) in enumerate(concrete.input_slots(program))}
+    inputs = [0] * len(slots)
+    env: Dict[str, int] = {}
+    seen = set()
+
+    def value(v, new_name: str = "") -> int:
+        if isinstance(v, parser.Input):
+            while new_name in seen:
+                new_name += "'"
+            seen.add(new_name)
+            inputs[slots[id(v)]] = model.get(new_name, 0)
+            return inputs[slots[id(v)]]
+        if isinstance(v, parser.Constant):
+            return v
+        return env[v]
+
+    def assign(assignment: parser.Assignment) -> None:
+        rhs = assignment.rhs
+        if isinstance(rhs, parser.Expr):
+            left = value(rhs.l)
+            env[assignment.lhs] = concrete.OPERATIONS[rhs.op](left, value(rhs.r))
+        else:
+            env[assignment.lhs] = value(rhs, assignment.lhs)
+
+    for command in program.commands:
+        if isinstance(command, parser.If):
+            condition = command.condition
+            if concrete.COMPARISONS[condition.op](value(condition.l), value(condition.r)):
+                for assignment in command.body:
+                    assign(assignment)
+        else:
+            assign(command)
+    return inputs
+
+
+def symbolic_witness(program: parser.Program) -> Optional[Witness]:
+    sliced = slicing.slice_program(program)
+    states = [main.State()]
+    live_after = main.live_variables(sliced)
+    for index, command in enumerate(sliced.commands):
+        states = main.execute_command(command, states, live_after[index])
+
+    slots = concrete.input_slots(program)
+    # the sliced program calls a subset of the same input() objects
+    positions = {id(node): index for index, (node, _) in enumerate(concrete.input_slots(sliced))}
+    run = compiler.compile_program(program)
+    for state in states:
+        if not state.is_valid():
+            continue
+        model = _model(sliced.postCondition, state)
+        if model is None:
+            continue
+        inputs = _replay(sliced, model)
+        values = [inputs[positions[id(node)]] if id(node) in positions else 0 for node, _ in slots]
+        if not run(values)[1]:
+            return [(label, value) for (_, label), value in zip(slots, values)]
+    return None
+
+
+def sampled_witness(program: parser.Program, samples: int = SAMPLES, seed: int = 0) -> Optional[Witness]:
+    if fuzz.reads_unassigned(program):
+        return None
+    if fuzz.available():
+        return fuzz.find_witness(program, samples, seed)
+    slots = concrete.input_slots(program)
+    values = sorted({sign * constant + delta for constant in fuzz.program_constants(program) | {0}
+                     for sign in (1, -1) for delta in (-1, 0, 1)})
+    rng = random.Random(seed)
+    run = compiler.compile_program(program)
+    for index in range(samples):
+        if index % 2 == 0:
+            inputs = [rng.choice(values) for _ in slots]
+        else:
+            inputs = [rng.randint(-1000, 1000) for _ in slots]
+        if not run(inputs)[1]:
+            return [(label, value) for (_, label), value in zip(slots, inputs)]
+    return None
+
+
+def find_witness(program: parser.Program, samples: int = SAMPLES) -> Optional[Witness]:
+    """(label, value) for every input slot, for which the assert fails, or None if none was found."""
+    try:
+        witness = symbolic_witness(program)
+    except AssertionError:
+        witness = None
+    if witness is None:
+        witness = sampled_witness(program, samples)
+    return witness